@@ -1,10 +1,27 @@
+from config import Config
 from lib.MyFlask import MyFlask
 from utils.bitget_client import BitgetClient
+from services.order_tracker import OrderTracker
+from services.leverage_cache import LeverageCache
+from services.account_cache import AccountCache
+from services.position_sizing import PositionSizer
+from services.market_data import MarketDataFeed
+from services.contract_specs import ContractSpecCache
+from services.signal_executor import SignalExecutor
+from services.signal_dedup import SignalDeduplicator, SignalCoalescer
+from services.signal_journal import SignalJournal, EVENT_COALESCED
+from services.trade_service import handle_contract_signal, resume_contract_signal
+from services.kline_signals import KlineSignalEngine
+from services.divergence_scanner import DivergenceScanner
+from services.kline_store import KlineStore
+from utils import tracing
+from utils.leader import LeaderLock
 
 from utils.register import (
     setup_blueprint,
     setup_cors,
     setup_home,
+    setup_metrics,
     setup_error_handlers,
     setup_logging,
 )
@@ -15,17 +32,78 @@ def create_app():
     setup_cors(app)
     setup_logging(app)
     setup_home(app)
+    setup_metrics(app)
     setup_error_handlers(app)
     setup_blueprint(app)
     
+    # 链路追踪（配置了导出目标时）
+    if tracing.configure(app.logger) is not None:
+        app.logger.info("✅ 链路追踪已开启")
+    
     # 初始化 Bitget 客户端
     try:
-        app.bitget_client = BitgetClient()
+        app.bitget_client = BitgetClient(logger=app.logger)
+        app.order_tracker = OrderTracker(app.bitget_client.async_client, app.logger)
+        app.leverage_cache = LeverageCache(app.bitget_client.async_client, app.logger)
+        app.account_cache = AccountCache(app.bitget_client.async_client, app.logger)
+        app.position_sizer = PositionSizer(app.logger)
         app.logger.info("✅ Bitget API 初始化成功")
     except Exception as e:
         app.logger.error(f"❌ Bitget API 初始化失败: {e}")
         raise
     
+    # 加载合约规格，失败时不影响启动，下单前会再次尝试刷新
+    app.contract_specs = ContractSpecCache(app.bitget_client, app.logger)
+    try:
+        app.contract_specs.load()
+    except Exception as e:
+        app.logger.warning(f"⚠️ 合约规格加载失败: {e}")
+    
+    # 初始化行情订阅（本地盘口）
+    app.market_data = MarketDataFeed(app.logger)
+    if Config.MARKET_DATA_ENABLED:
+        app.market_data.start()
+        for symbol in Config.MARKET_DATA_SYMBOLS:
+            app.market_data.subscribe(symbol)
+    
+    # 初始化信号执行引擎
+    app.signal_executor = SignalExecutor(app)
+    app.signal_dedup = SignalDeduplicator()
+    app.signal_journal = SignalJournal(logger=app.logger)
+    app.signal_journal.start()
+    app.signal_coalescer = SignalCoalescer(
+        app.signal_executor,
+        handle_contract_signal,
+        logger=app.logger,
+        on_discard=lambda ticker, signal: app.signal_journal.record(EVENT_COALESCED, signal[-1], ticker),
+    )
+    
+    # 接管已退出进程（上次运行或崩溃的 worker）未结束的信号，之后租约过期时自动接管
+    try:
+        app.signal_journal.recover(
+            replay_signal=app.signal_coalescer.submit,
+            resume_signal=lambda ticker, *args: app.signal_executor.submit(ticker, resume_contract_signal, ticker, *args),
+        )
+    except Exception as e:
+        app.logger.error(f"❌ 恢复未结束的信号失败: {e}")
+    
+    # 本地K线库（策略预热时只回补缺失的K线）
+    if Config.KLINE_STORE_DIR:
+        app.kline_store = KlineStore(logger=app.logger)
+    
+    # 自己产生信号的后台任务只在一个进程中运行（多个 gunicorn worker 时选主）
+    app.leader_lock = LeaderLock(logger=app.logger)
+    
+    # 服务端策略信号（订阅K线本地计算，不经过 TradingView）
+    if Config.STRATEGY_ENABLED:
+        app.kline_signals = KlineSignalEngine(app)
+        app.leader_lock.on_elected(app.kline_signals.start)
+    
+    # Ultimate RSI 背离扫描
+    if Config.DIVERGENCE_ENABLED:
+        app.divergence_scanner = DivergenceScanner(app)
+        app.leader_lock.on_elected(app.divergence_scanner.start)
+    
     return app
 
 
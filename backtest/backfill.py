@@ -0,0 +1,61 @@
+"""
+从 Bitget 下载历史K线到本地K线库（KLINE_STORE_DIR），已有的K线不会重复下载
+
+    python -m backtest.backfill BTCUSDT_UMCBL 5m --start 2024-01-01 --concurrency 8
+    python -m backtest.run BTCUSDT_UMCBL/5m --store
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Optional
+import pandas as pd
+from config import Config
+from services.kline_store import KlineStore
+from utils.async_bitget_client import AsyncBitgetClient
+
+
+def parse_time(value: Optional[str]) -> Optional[int]:
+    """日期（UTC）或毫秒时间戳转换为毫秒时间戳"""
+    if value is None:
+        return None
+    if value.isdigit():
+        return int(value)
+    return int(pd.Timestamp(value, tz="UTC").value // 1_000_000)
+
+
+async def backfill(store: KlineStore, symbol: str, interval: str, start: int, end: Optional[int], concurrency: int) -> int:
+    client = AsyncBitgetClient()
+    try:
+        return await store.backfill(client, symbol, interval, start, end, concurrency)
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回补历史K线到本地K线库")
+    parser.add_argument("symbol", help="合约符号，如 BTCUSDT_UMCBL")
+    parser.add_argument("interval", help="K线周期，如 1m / 5m / 1H")
+    parser.add_argument("--start", required=True, help="开始时间（UTC 日期或毫秒时间戳）")
+    parser.add_argument("--end", help="结束时间，不传则到最近一根已收盘K线")
+    parser.add_argument("--root", default=Config.KLINE_STORE_DIR, help="K线库目录")
+    parser.add_argument("--concurrency", type=int, default=Config.KLINE_BACKFILL_CONCURRENCY, help="并发请求数")
+    args = parser.parse_args()
+
+    store = KlineStore(args.root)
+    started = time.perf_counter()
+    added = asyncio.run(backfill(
+        store, args.symbol, args.interval, parse_time(args.start), parse_time(args.end), args.concurrency
+    ))
+    gaps = store.gaps(args.symbol, args.interval)
+    print(json.dumps({
+        "added": added,
+        "bars": store.count(args.symbol, args.interval),
+        "gaps": len(gaps),
+        "seconds": round(time.perf_counter() - started, 3),
+        "path": store.path(args.symbol, args.interval),
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
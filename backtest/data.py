@@ -0,0 +1,75 @@
+"""
+回测数据加载：本地 CSV / Parquet K线文件
+"""
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+
+# 时间列可能的列名，按顺序匹配
+TIME_COLUMNS = ("time", "timestamp", "datetime", "date", "open_time")
+
+
+@dataclass
+class Bars:
+    """K线数据，各列为等长的 NumPy 数组，time 为K线开盘时间（UTC 纳秒时间戳）"""
+
+    time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def local_time(self, tz: str) -> pd.DatetimeIndex:
+        """转换到指定时区的K线开盘时间"""
+        return pd.DatetimeIndex(self.time.astype("datetime64[ns]")).tz_localize("UTC").tz_convert(tz)
+
+
+def _parse_time(values: pd.Series, tz: str) -> pd.DatetimeIndex:
+    if pd.api.types.is_numeric_dtype(values):
+        # Unix 时间戳：毫秒或秒
+        unit = "ms" if values.abs().max() > 1e11 else "s"
+        return pd.DatetimeIndex(pd.to_datetime(values, unit=unit, utc=True))
+    if pd.Timestamp(values.iloc[0]).tz is not None:
+        # 带时区偏移（夏令时前后偏移不同），直接换算到 UTC
+        return pd.DatetimeIndex(pd.to_datetime(values, utc=True))
+    return pd.DatetimeIndex(pd.to_datetime(values)).tz_localize(tz).tz_convert("UTC")
+
+
+def load_bars(path: str, tz: str = "UTC", time_column: Optional[str] = None) -> Bars:
+    """
+    加载K线文件（.csv / .parquet），按时间排序
+
+    Args:
+        path: 文件路径
+        tz: 时间列不带时区时使用的时区（TradingView 导出的时间带时区偏移，不受影响）
+        time_column: 时间列名，不传则按 TIME_COLUMNS 自动匹配
+    """
+    if path.endswith(".parquet"):
+        try:
+            df = pd.read_parquet(path)
+        except ImportError as e:
+            raise ImportError("读取 Parquet 文件需要 pyarrow，请执行 pip install pyarrow（或 pip install -r requirements.txt）") from e
+    else:
+        df = pd.read_csv(path)
+    df.columns = [str(c).strip().lower() for c in df.columns]
+
+    if time_column is None:
+        time_column = next((c for c in TIME_COLUMNS if c in df.columns), None)
+        if time_column is None:
+            raise ValueError(f"K线文件缺少时间列，需要以下之一: {', '.join(TIME_COLUMNS)}")
+
+    times = _parse_time(df[time_column], tz).as_unit("ns")
+    order = np.argsort(times.asi8, kind="stable")
+    columns = {}
+    for name in ("open", "high", "low", "close", "volume"):
+        if name not in df.columns:
+            raise ValueError(f"K线文件缺少列: {name}")
+        columns[name] = df[name].to_numpy(dtype=np.float64)[order]
+
+    return Bars(time=times.asi8[order], **columns)
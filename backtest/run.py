@@ -0,0 +1,77 @@
+"""
+命令行回测
+
+    python -m backtest.run data/TSLL_5m.csv --set atr_mult_sl=2.0 --trades trades.csv
+"""
+import argparse
+import csv
+import dataclasses
+import json
+import time
+from typing import Any, Dict, List
+import pandas as pd
+from backtest.data import load_bars
+from backtest.supertrend_vsa import SupertrendVSAParams, Trade, parse_param_value, run_backtest
+from services.kline_store import KlineStore
+
+
+def parse_overrides(items: List[str]) -> Dict[str, Any]:
+    """解析 --set key=value，按参数默认值的类型转换"""
+    fields = {f.name: f for f in dataclasses.fields(SupertrendVSAParams)}
+    overrides = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        if key not in fields:
+            raise SystemExit(f"未知参数: {key}，可选: {', '.join(fields)}")
+        overrides[key] = parse_param_value(key, value)
+    return overrides
+
+
+def write_trades(path: str, trades: List[Trade], tz: str):
+    """导出交易列表，便于与 TradingView 的 List of Trades 逐笔对比"""
+    def fmt(ns):
+        return "" if ns is None else pd.Timestamp(ns, tz="UTC").tz_convert(tz).isoformat()
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            "direction", "entry_time", "entry_price", "entry_comment",
+            "exit_time", "exit_price", "exit_comment", "qty", "pnl",
+        ])
+        for t in trades:
+            writer.writerow([
+                "long" if t.direction > 0 else "short", fmt(t.entry_time), t.entry_price, t.entry_comment,
+                fmt(t.exit_time), t.exit_price, t.exit_comment, t.qty, t.pnl,
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supertrend + VSA 策略回测")
+    parser.add_argument("path", help="K线文件（.csv / .parquet），加 --store 时为K线库中的 标的/周期，如 BTCUSDT_UMCBL/5m")
+    parser.add_argument("--store", action="store_true", help="从本地K线库（KLINE_STORE_DIR）读取，零拷贝")
+    parser.add_argument("--tz", default="UTC", help="时间列不带时区时使用的时区")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="覆盖策略参数")
+    parser.add_argument("--trades", help="导出交易列表 CSV")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    bars = KlineStore().read(*args.path.split("/")) if args.store else load_bars(args.path, tz=args.tz)
+    loaded = time.perf_counter()
+    params = SupertrendVSAParams(**parse_overrides(args.set))
+    result = run_backtest(bars, params)
+    finished = time.perf_counter()
+
+    if args.trades:
+        trades = result.trades + ([result.open_trade] if result.open_trade else [])
+        write_trades(args.trades, trades, params.exchange_tz)
+
+    print(json.dumps({
+        "bars": len(bars),
+        "load_seconds": round(loaded - started, 3),
+        "backtest_seconds": round(finished - loaded, 3),
+        **result.stats(),
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Supertrend + VSA 日内策略回测，逐根K线复现 strategy/TSLL_5MIN_SUPERTREND.pine
+
+Pine 脚本的执行语义：
+- process_orders_on_close = true：每根K线收盘时执行一次脚本，本根K线发出的订单按收盘价成交
+- 脚本中读取的 strategy.position_size 是本根K线执行前的持仓，因此同一根K线不会既平仓又开仓
+- 止损止盈用 strategy.close（市价单），触发后同样按本根收盘价成交，而不是按止损价
+- 跳空过滤只在每天第一根K线生效（skip_today_due_to_gap 要求 new_day）
+- 下单数量为权益的 default_qty_value%，按 qty_step 向下取整
+未模拟保证金追缴（margin call）。
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import math
+import numpy as np
+from backtest.data import Bars
+from indicators.batch import atr, shift, sma, supertrend
+
+
+@dataclass(frozen=True)
+class SupertrendVSAParams:
+    """策略参数，默认值与 Pine 脚本的 input 相同"""
+
+    # ATR 止盈止损
+    atr_period: int = 10
+    atr_mult_sl: float = 2.6
+    atr_mult_tp: float = 3.5
+    # Supertrend 信号
+    st_atr_period: int = 18
+    st_factor: float = 3.5
+    # 日内交易控制
+    close_hour: int = 15
+    close_minute: int = 40
+    max_trades_per_day: int = 1
+    skip_gap_open: bool = True
+    gap_threshold: float = 4.0
+    # 信号过滤
+    exit_on_reverse_signal: bool = True
+    use_vsa_filter: bool = True
+    vol_ma_len: int = 12
+    vol_mult: float = 1.25
+    body_ratio_thr: float = 0.6
+    # strategy() 设置
+    initial_capital: float = 10000.0
+    qty_percent: float = 330.0
+    qty_step: float = 1.0
+    # 交易所时区（决定日期切换）与强平时间所用时区
+    exchange_tz: str = "America/New_York"
+    session_tz: str = "America/New_York"
+
+
+def parse_param_value(name: str, value: Any) -> Any:
+    """按参数默认值的类型转换命令行中的取值（布尔参数接受 1/true/yes，其余为 False）"""
+    default = getattr(SupertrendVSAParams, name)
+    if isinstance(default, bool):
+        return value.lower() in ("1", "true", "yes") if isinstance(value, str) else bool(value)
+    return type(default)(value)
+
+
+@dataclass
+class Trade:
+    direction: int  # 1 多，-1 空
+    entry_index: int
+    entry_time: int
+    entry_price: float
+    qty: float
+    entry_comment: str
+    exit_index: Optional[int] = None
+    exit_time: Optional[int] = None
+    exit_price: Optional[float] = None
+    exit_comment: Optional[str] = None
+    pnl: Optional[float] = None
+
+
+@dataclass
+class BacktestResult:
+    params: SupertrendVSAParams
+    trades: List[Trade] = field(default_factory=list)
+    open_trade: Optional[Trade] = None
+    final_equity: float = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """汇总统计（只统计已平仓交易）"""
+        pnl = np.array([t.pnl for t in self.trades], dtype=np.float64)
+        equity = self.params.initial_capital + np.concatenate(([0.0], np.cumsum(pnl)))
+        drawdown = np.maximum.accumulate(equity) - equity
+        gross_profit = float(pnl[pnl > 0].sum())
+        gross_loss = float(-pnl[pnl < 0].sum())
+        return {
+            "trades": len(pnl),
+            "net_profit": float(pnl.sum()),
+            "final_equity": self.final_equity,
+            "win_rate": float((pnl > 0).mean()) if len(pnl) else None,
+            "profit_factor": gross_profit / gross_loss if gross_loss else None,
+            "max_drawdown": float(drawdown.max()),
+        }
+
+
+def session_flags(bars: Bars, params: SupertrendVSAParams):
+    """
+    日期切换与强平时间标记
+
+    Returns:
+        (new_day, after_close_time)
+    """
+    local = bars.local_time(params.exchange_tz)
+    day = local.year.to_numpy() * 10000 + local.month.to_numpy() * 100 + local.day.to_numpy()
+    new_day = np.ones(len(day), dtype=bool)
+    new_day[1:] = day[1:] != day[:-1]
+
+    session = bars.local_time(params.session_tz)
+    hour, minute = session.hour.to_numpy(), session.minute.to_numpy()
+    after_close = (hour > params.close_hour) | ((hour == params.close_hour) & (minute >= params.close_minute))
+    return new_day, after_close
+
+
+def supertrend_signals(direction: np.ndarray):
+    """方向翻转：(long_signal, short_signal)"""
+    prev = np.empty(len(direction), dtype=np.int8)
+    prev[0] = 0
+    prev[1:] = direction[:-1]
+    return (prev > 0) & (direction < 0), (prev < 0) & (direction > 0)
+
+
+def vsa_filters(bars: Bars, params: SupertrendVSAParams, vol_ma: Optional[np.ndarray] = None):
+    """
+    VSA 量价过滤：(long_vol_ok, short_vol_ok)
+
+    Args:
+        vol_ma: 已经算好的 sma(volume, vol_ma_len)，参数扫描时可以复用
+    """
+    n = len(bars)
+    if not params.use_vsa_filter:
+        return np.ones(n, dtype=bool), np.ones(n, dtype=bool)
+    if vol_ma is None:
+        vol_ma = sma(bars.volume, params.vol_ma_len)
+    hl_range = bars.high - bars.low
+    body = np.abs(bars.close - bars.open)
+    is_strong_body = body / np.where(hl_range == 0, 1.0, hl_range) > params.body_ratio_thr
+    with np.errstate(invalid="ignore"):
+        is_high_volume = bars.volume > vol_ma * params.vol_mult
+    strong = is_strong_body & is_high_volume
+    return strong & (bars.close > bars.open), strong & (bars.close < bars.open)
+
+
+def gap_flags(bars: Bars, params: SupertrendVSAParams, new_day: np.ndarray) -> np.ndarray:
+    """skip_today_due_to_gap"""
+    if not params.skip_gap_open:
+        return np.zeros(len(bars), dtype=bool)
+    prev_close = shift(bars.close)
+    with np.errstate(invalid="ignore"):
+        is_big_gap = np.abs(bars.open - prev_close) / prev_close * 100 > params.gap_threshold
+    return new_day & is_big_gap
+
+
+class StrategyState:
+    """
+    Pine 脚本每根K线收盘时的开平仓决策（回测和实时信号共用）
+
+    on_bar 传入本根K线的数据和信号，返回 (开仓方向, 平仓备注)：
+    开仓方向 1 为开多、-1 为开空、0 为不开仓；平仓备注为 None 表示不平仓。
+    同一根K线多次调用 strategy.close 时，订单备注以最后一次为准。
+    """
+
+    def __init__(self, params: SupertrendVSAParams):
+        self.params = params
+        self.position = 0
+        self.trades_today = 0
+        self.long_sl = self.long_tp = self.short_sl = self.short_tp = float("nan")
+
+    def on_bar(
+        self,
+        close: float,
+        high: float,
+        low: float,
+        atr_value: float,
+        long_signal: bool,
+        short_signal: bool,
+        long_entry: bool,
+        short_entry: bool,
+        new_day: bool,
+        after_close: bool,
+        no_entry: bool,
+    ):
+        """
+        Args:
+            long_entry / short_entry: 方向信号且通过 VSA 过滤
+            no_entry: 强平时间之后或跳空当天第一根K线
+        """
+        params = self.params
+        if new_day:
+            self.trades_today = 0
+
+        entry = 0
+        if self.position == 0 and self.trades_today < params.max_trades_per_day and not no_entry:
+            if long_entry:
+                entry = 1
+                self.trades_today += 1
+                self.long_sl = close - atr_value * params.atr_mult_sl
+                self.long_tp = close + atr_value * params.atr_mult_tp
+            elif short_entry:
+                entry = -1
+                self.trades_today += 1
+                self.short_sl = close + atr_value * params.atr_mult_sl
+                self.short_tp = close - atr_value * params.atr_mult_tp
+
+        comment = None
+        if self.position > 0:
+            if low <= self.long_sl:
+                comment = "止损出场"
+            elif high >= self.long_tp:
+                comment = "止盈出场"
+            if params.exit_on_reverse_signal and short_signal:
+                comment = "反向信号平仓"
+        elif self.position < 0:
+            if high >= self.short_sl:
+                comment = "止损出场"
+            elif low <= self.short_tp:
+                comment = "止盈出场"
+            if params.exit_on_reverse_signal and long_signal:
+                comment = "反向信号平仓"
+        if self.position != 0 and after_close:
+            comment = "日内强平"
+
+        if comment is not None:
+            self.position = 0
+        if entry:
+            self.position = entry
+        return entry, comment
+
+
+def simulate(
+    bars: Bars,
+    params: SupertrendVSAParams,
+    long_signal: np.ndarray,
+    short_signal: np.ndarray,
+    long_vol_ok: np.ndarray,
+    short_vol_ok: np.ndarray,
+    new_day: np.ndarray,
+    after_close: np.ndarray,
+    skip_gap: np.ndarray,
+    atr_values: np.ndarray,
+) -> BacktestResult:
+    """
+    按已计算好的信号逐根K线撮合（持仓、每日次数、止损止盈依赖之前的状态，无法向量化）
+    """
+    close, high, low, times = bars.close.tolist(), bars.high.tolist(), bars.low.tolist(), bars.time.tolist()
+    long_entry = (long_signal & long_vol_ok).tolist()
+    short_entry = (short_signal & short_vol_ok).tolist()
+    long_sig, short_sig = long_signal.tolist(), short_signal.tolist()
+    # 强平时间之后和跳空当天第一根K线不能开仓
+    no_entry = (after_close | skip_gap).tolist()
+    new_day, after_close = new_day.tolist(), after_close.tolist()
+    atr_list = atr_values.tolist()
+
+    result = BacktestResult(params=params)
+    state = StrategyState(params)
+    on_bar = state.on_bar
+    equity = params.initial_capital
+    position: Optional[Trade] = None
+
+    for i in range(len(close)):
+        entry, comment = on_bar(
+            close[i], high[i], low[i], atr_list[i], long_sig[i], short_sig[i],
+            long_entry[i], short_entry[i], new_day[i], after_close[i], no_entry[i],
+        )
+
+        if comment is not None and position is not None:
+            position.exit_index, position.exit_time = i, times[i]
+            position.exit_price, position.exit_comment = close[i], comment
+            position.pnl = (close[i] - position.entry_price) * position.qty * position.direction
+            equity += position.pnl
+            result.trades.append(position)
+            position = None
+
+        if entry:
+            qty = equity * params.qty_percent / 100 / close[i]
+            if params.qty_step:
+                qty = math.floor(qty / params.qty_step + 1e-9) * params.qty_step
+            if qty > 0:
+                position = Trade(
+                    direction=entry,
+                    entry_index=i,
+                    entry_time=times[i],
+                    entry_price=close[i],
+                    qty=qty,
+                    entry_comment="Supertrend 多头" if entry > 0 else "Supertrend 空头",
+                )
+            else:
+                # 数量取整为 0 时 Pine 不会成交
+                state.position = 0
+
+    result.open_trade = position
+    result.final_equity = equity
+    return result
+
+
+def run_backtest(bars: Bars, params: SupertrendVSAParams = SupertrendVSAParams()) -> BacktestResult:
+    """计算指标并回测"""
+    _, direction = supertrend(bars.high, bars.low, bars.close, params.st_factor, params.st_atr_period)
+    long_signal, short_signal = supertrend_signals(direction)
+    long_vol_ok, short_vol_ok = vsa_filters(bars, params)
+    new_day, after_close = session_flags(bars, params)
+    skip_gap = gap_flags(bars, params, new_day)
+    atr_values = atr(bars.high, bars.low, bars.close, params.atr_period)
+    return simulate(
+        bars, params,
+        long_signal, short_signal, long_vol_ok, short_vol_ok,
+        new_day, after_close, skip_gap, atr_values,
+    )
@@ -0,0 +1,271 @@
+"""
+Supertrend + VSA 策略参数扫描（网格 / 随机）
+
+    python -m backtest.sweep data/TSLL_5m.csv \\
+        --param st_factor=2:5:0.5 --param st_atr_period=10,14,18 --param atr_mult_sl=1.5:3:0.5 \\
+        --workers 8 --out sweep.npz
+
+- K线数组和基础参数下的日期切换、强平时间标记放在共享内存中，子进程直接映射，不经过 pickle
+- 参数组合按 Supertrend 参数和时段参数分组后分发，同一组在同一个子进程中执行，
+  子进程内按单个参数缓存 ATR、成交量均线和 Supertrend 方向，
+  扫描时区或强平时间（exchange_tz / session_tz / close_hour / close_minute）时按取值缓存对应的标记
+- 结果按列保存为 .npz（每个参数、每个统计指标一列）
+"""
+import argparse
+import dataclasses
+import itertools
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from backtest.data import Bars, load_bars
+from backtest.supertrend_vsa import (
+    SupertrendVSAParams,
+    gap_flags,
+    parse_param_value,
+    session_flags,
+    simulate,
+    supertrend_signals,
+    vsa_filters,
+)
+from indicators.batch import atr, sma, supertrend
+from services.kline_store import KlineStore
+
+
+# 默认扫描的参数
+SWEEP_PARAMS = ("st_factor", "st_atr_period", "atr_mult_sl", "atr_mult_tp", "vol_mult", "body_ratio_thr")
+# 每组结果保存的统计指标
+STAT_COLUMNS = ("trades", "net_profit", "final_equity", "win_rate", "profit_factor", "max_drawdown")
+
+# 共享数组的描述：名称 -> (共享内存名, dtype, 长度)
+ArraySpec = Dict[str, Tuple[str, str, int]]
+
+
+def _share(arrays: Dict[str, np.ndarray]) -> Tuple[List[shared_memory.SharedMemory], ArraySpec]:
+    """把数组复制到共享内存，返回共享内存对象（由调用方释放）和描述"""
+    segments, spec = [], {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+        segments.append(shm)
+        spec[name] = (shm.name, array.dtype.str, len(array))
+    return segments, spec
+
+
+def _session_key(params: SupertrendVSAParams) -> Tuple[str, str, int, int]:
+    """决定日期切换和强平时间标记的参数"""
+    return params.exchange_tz, params.session_tz, params.close_hour, params.close_minute
+
+
+# ==================== 子进程 ====================
+
+_state: Dict[str, Any] = {}
+
+
+def _init_worker(spec: ArraySpec, base: SupertrendVSAParams):
+    arrays = {}
+    for name, (shm_name, dtype, length) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        # 保持引用，避免共享内存在进程存活期间被关闭
+        _state.setdefault("segments", []).append(shm)
+        arrays[name] = np.ndarray((length,), dtype=np.dtype(dtype), buffer=shm.buf)
+    _state["bars"] = Bars(**{k: arrays[k] for k in ("time", "open", "high", "low", "close", "volume")})
+    _state["new_day"] = arrays["new_day"]
+    _state["after_close"] = arrays["after_close"]
+    _state["base"] = base
+
+
+@lru_cache(maxsize=64)
+def _cached_atr(length: int) -> np.ndarray:
+    bars = _state["bars"]
+    return atr(bars.high, bars.low, bars.close, length)
+
+
+@lru_cache(maxsize=64)
+def _cached_vol_ma(length: int) -> np.ndarray:
+    return sma(_state["bars"].volume, length)
+
+
+@lru_cache(maxsize=16)
+def _cached_session_flags(exchange_tz: str, session_tz: str, close_hour: int, close_minute: int) -> Tuple[np.ndarray, np.ndarray]:
+    base = _state["base"]
+    if (exchange_tz, session_tz, close_hour, close_minute) == _session_key(base):
+        return _state["new_day"], _state["after_close"]
+    params = dataclasses.replace(
+        base, exchange_tz=exchange_tz, session_tz=session_tz, close_hour=close_hour, close_minute=close_minute,
+    )
+    return session_flags(_state["bars"], params)
+
+
+@lru_cache(maxsize=128)
+def _cached_signals(factor: float, atr_period: int) -> Tuple[np.ndarray, np.ndarray]:
+    bars = _state["bars"]
+    _, direction = supertrend(bars.high, bars.low, bars.close, factor, atr_period, _cached_atr(atr_period))
+    return supertrend_signals(direction)
+
+
+def _run_one(params: SupertrendVSAParams) -> Dict[str, Any]:
+    bars = _state["bars"]
+    long_signal, short_signal = _cached_signals(params.st_factor, params.st_atr_period)
+    long_vol_ok, short_vol_ok = vsa_filters(bars, params, _cached_vol_ma(params.vol_ma_len))
+    new_day, after_close = _cached_session_flags(*_session_key(params))
+    result = simulate(
+        bars, params,
+        long_signal, short_signal, long_vol_ok, short_vol_ok,
+        new_day, after_close, gap_flags(bars, params, new_day), _cached_atr(params.atr_period),
+    )
+    return result.stats()
+
+
+def _run_group(combos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    base = _state["base"]
+    return [_run_one(dataclasses.replace(base, **combo)) for combo in combos]
+
+
+# ==================== 参数空间 ====================
+
+def parse_space(items: List[str]) -> Dict[str, Any]:
+    """
+    解析参数空间
+
+    - name=a,b,c：取值列表
+    - name=start:stop:step：闭区间等步长取值（网格）
+    - name=low:high：随机扫描时在区间内均匀采样
+    """
+    fields = {f.name for f in dataclasses.fields(SupertrendVSAParams)}
+    space = {}
+    for item in items:
+        name, _, value = item.partition("=")
+        if name not in fields:
+            raise SystemExit(f"未知参数: {name}")
+        parts = value.split(":")
+        if len(parts) == 3:
+            start, stop, step = (float(p) for p in parts)
+            count = int(round((stop - start) / step)) + 1
+            space[name] = [parse_param_value(name, round(start + i * step, 10)) for i in range(count)]
+        elif len(parts) == 2:
+            space[name] = (parse_param_value(name, parts[0]), parse_param_value(name, parts[1]))
+        else:
+            space[name] = [parse_param_value(name, v) for v in value.split(",")]
+    return space
+
+
+def grid_combos(space: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """网格：所有取值列表的笛卡尔积"""
+    for name, values in space.items():
+        if isinstance(values, tuple):
+            raise SystemExit(f"网格扫描需要取值列表或 start:stop:step: {name}")
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def random_combos(space: Dict[str, Any], count: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """随机：列表中随机选取，区间内均匀采样（整数参数取整数）"""
+    rng = random.Random(seed)
+    combos = []
+    for _ in range(count):
+        combo = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                combo[name] = rng.randint(low, high) if isinstance(low, int) else rng.uniform(low, high)
+            else:
+                combo[name] = rng.choice(values)
+        combos.append(combo)
+    return combos
+
+
+# ==================== 执行 ====================
+
+def run_sweep(
+    bars: Bars,
+    combos: List[Dict[str, Any]],
+    base: SupertrendVSAParams = SupertrendVSAParams(),
+    workers: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    并行执行参数组合
+
+    Returns:
+        Dict[str, np.ndarray]: 按列的结果，参数列 + STAT_COLUMNS，行顺序与 combos 相同
+    """
+    new_day, after_close = session_flags(bars, base)
+    segments, spec = _share({
+        "time": bars.time, "open": bars.open, "high": bars.high, "low": bars.low,
+        "close": bars.close, "volume": bars.volume, "new_day": new_day, "after_close": after_close,
+    })
+
+    # 同一组 Supertrend 参数和时段参数尽量在同一个子进程中执行以复用缓存，大组再切分保证并行度
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, math.ceil(len(combos) / (workers * 4)))
+    groups: Dict[Tuple[Any, ...], List[int]] = {}
+    for i, combo in enumerate(combos):
+        params = dataclasses.replace(base, **combo)
+        key = (params.st_factor, params.st_atr_period, *_session_key(params))
+        groups.setdefault(key, []).append(i)
+    tasks = [indexes[i:i + chunk_size] for indexes in groups.values() for i in range(0, len(indexes), chunk_size)]
+
+    stats: List[Optional[Dict[str, Any]]] = [None] * len(combos)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(spec, base)) as pool:
+            futures = {
+                pool.submit(_run_group, [combos[i] for i in indexes]): indexes
+                for indexes in tasks
+            }
+            for future, indexes in futures.items():
+                for i, row in zip(indexes, future.result()):
+                    stats[i] = row
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+    names = sorted({name for combo in combos for name in combo})
+    columns = {name: np.array([combo.get(name, getattr(base, name)) for combo in combos]) for name in names}
+    for stat in STAT_COLUMNS:
+        columns[stat] = np.array([np.nan if row[stat] is None else row[stat] for row in stats], dtype=np.float64)
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supertrend + VSA 策略参数扫描")
+    parser.add_argument("path", help="K线文件（.csv / .parquet），加 --store 时为K线库中的 标的/周期，如 BTCUSDT_UMCBL/5m")
+    parser.add_argument("--store", action="store_true", help="从本地K线库（KLINE_STORE_DIR）读取，零拷贝")
+    parser.add_argument("--tz", default="UTC", help="时间列不带时区时使用的时区")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=SPACE",
+                        help=f"参数空间（可用参数: {', '.join(SWEEP_PARAMS)} 等）")
+    parser.add_argument("--random", type=int, metavar="N", help="随机扫描 N 组，不传则为网格扫描")
+    parser.add_argument("--seed", type=int, help="随机种子")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="进程数")
+    parser.add_argument("--out", default="sweep.npz", help="结果文件（.npz）")
+    parser.add_argument("--top", type=int, default=10, help="输出净利润最高的前 N 组")
+    args = parser.parse_args()
+
+    space = parse_space(args.param)
+    combos = random_combos(space, args.random, args.seed) if args.random else grid_combos(space)
+    bars = KlineStore().read(*args.path.split("/")) if args.store else load_bars(args.path, tz=args.tz)
+
+    started = time.perf_counter()
+    columns = run_sweep(bars, combos, workers=args.workers)
+    elapsed = time.perf_counter() - started
+    np.savez_compressed(args.out, **columns)
+
+    order = np.argsort(-np.nan_to_num(columns["net_profit"], nan=-np.inf))[:args.top]
+    top = [{name: columns[name][i].item() for name in columns} for i in order]
+    print(json.dumps({
+        "combos": len(combos),
+        "seconds": round(elapsed, 3),
+        "out": args.out,
+        "top": top,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+webhook → 下单 端到端延迟压测（基于模拟交易所）
+
+    python -m bench.webhook --signals 200 --concurrency 20 --modes sync,threads,async
+    python -m bench.webhook --save-baseline            # 保存为基线 bench/baseline.json
+    python -m bench.webhook --baseline bench/baseline.json --tolerance 0.2   # 与基线对比，退化时退出码为 1
+
+每种模式启动一个模拟交易所和一个 gunicorn 服务（各自独立的信号日志），并发向 /api/webhook 发送 N 个信号，
+等所有信号结束后从信号日志读取各阶段耗时（见 services.signal_timing），统计 p50 / p99 / max 和吞吐量：
+- sync:    gunicorn 同步 worker（多进程）
+- threads: gunicorn gthread worker（单进程多线程）
+- async:   gunicorn gevent worker（协程，需要 pip install gevent）
+
+信号按标的轮流发送，同一标的交替开多和平仓；信号带序号字段，不会被去重。
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+import numpy as np
+from services.signal_journal import EVENT_COMPLETED, EVENT_FAILED, EVENT_RECEIVED, TERMINAL_EVENTS
+from services.signal_timing import STAGES
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "bench", "baseline.json")
+TOKEN = "bench"
+
+# 各模式的 gunicorn 参数，{workers} / {threads} 由命令行参数替换
+MODES = {
+    "sync": ["--worker-class", "sync", "--workers", "{workers}"],
+    "threads": ["--worker-class", "gthread", "--workers", "1", "--threads", "{threads}"],
+    "async": ["--worker-class", "gevent", "--workers", "1", "--worker-connections", "1000"],
+}
+# 报告中的指标：HTTP 响应、各阶段、信号日志中接收到结束
+METRICS = ("http",) + STAGES + ("end_to_end",)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_http(url: str, timeout: float, proc: subprocess.Popen):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"进程已退出: {' '.join(proc.args)}")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"等待服务启动超时: {url}")
+
+
+def _stop(proc: Optional[subprocess.Popen]):
+    if proc is None or proc.poll() is not None:
+        return
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def _signals(count: int, symbols: List[str]) -> List[Dict[str, Any]]:
+    """按标的轮流，同一标的交替开多、平仓；仓位很小，BBO 限价单一档即可全部成交"""
+    payloads = []
+    for i in range(count):
+        opening = (i // len(symbols)) % 2 == 0
+        payloads.append({
+            "token": TOKEN,
+            "id": i,
+            "ticker": symbols[i % len(symbols)],
+            "action": "buy" if opening else "sell",
+            "sentiment": "long" if opening else "flat",
+            "position_ratio": 0.01,
+        })
+    return payloads
+
+
+async def _fire(url: str, payloads: List[Dict[str, Any]], concurrency: int) -> Tuple[List[float], Dict[int, int], float]:
+    """并发发送信号，返回 (HTTP 耗时列表, 状态码计数, 发送总耗时)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        async def send(payload):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(url, json=payload)
+                    code = response.status_code
+                except httpx.HTTPError:
+                    code = 0
+                latencies.append(time.perf_counter() - started)
+                statuses[code] = statuses.get(code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(p) for p in payloads))
+        return latencies, statuses, time.perf_counter() - started
+
+
+def _read_journal(path: str) -> Dict[str, Dict[str, Any]]:
+    """信号ID -> {received, finished, kind, timings}"""
+    signals: Dict[str, Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return signals
+    conn = sqlite3.connect(path, timeout=10)
+    try:
+        rows = conn.execute("SELECT signal_id, kind, data, ts FROM events ORDER BY seq").fetchall()
+    finally:
+        conn.close()
+    for signal_id, kind, data, ts in rows:
+        state = signals.setdefault(signal_id, {})
+        if kind == EVENT_RECEIVED:
+            state["received"] = ts
+        elif kind in TERMINAL_EVENTS:
+            state["finished"] = ts
+            state["kind"] = kind
+            state["timings"] = (json.loads(data) if data else {}).get("timings", {})
+    return signals
+
+
+def _wait_journal(path: str, expected: int, timeout: float) -> Dict[str, Dict[str, Any]]:
+    deadline = time.monotonic() + timeout
+    while True:
+        signals = _read_journal(path)
+        finished = sum(1 for s in signals.values() if "finished" in s)
+        if finished >= expected or time.monotonic() > deadline:
+            return signals
+        time.sleep(0.5)
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    ms = np.asarray(values) * 1000
+    return {
+        "count": len(values),
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "max": round(float(ms.max()), 3),
+    }
+
+
+def run_mode(mode: str, args) -> Dict[str, Any]:
+    """启动模拟交易所和服务，压测一种模式"""
+    rest_port, ws_port, app_port = _free_port(), _free_port(), _free_port()
+    workdir = tempfile.mkdtemp(prefix=f"bench-{mode}-")
+    journal_path = os.path.join(workdir, "journal.db")
+    symbols = [f"BENCH{i}USDT_UMCBL" for i in range(args.symbols)]
+
+    mock_cmd = [
+        sys.executable, "-m", "mock_exchange.server", "--port", str(rest_port), "--ws-port", str(ws_port),
+        "--balance", "10000", "--fill-delay-ms", str(args.fill_delay_ms),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--volatility", str(args.volatility), "--seed", "1",
+    ]
+    for symbol in symbols:
+        mock_cmd += ["--symbol", f"{symbol}=100:2:0.01"]
+
+    env = dict(
+        os.environ,
+        BITGET_BASE_URL=f"http://127.0.0.1:{rest_port}",
+        BITGET_WS_PUBLIC_URL=f"ws://127.0.0.1:{ws_port}",
+        WEBHOOK_EXPECTED_TOKEN=TOKEN,
+        MARKET_DATA_SYMBOLS=",".join(symbols),
+        SIGNAL_JOURNAL_PATH=journal_path,
+        PROMETHEUS_MULTIPROC_DIR=os.path.join(workdir, "metrics"),
+        SIGNAL_MAX_PENDING=str(max(args.signals, 200)),
+        ORDER_CHECK_INTERVAL=str(args.order_timeout),
+        MIN_PRICE_FILTER="1",
+        STRATEGY_ENABLED="false",
+        DIVERGENCE_ENABLED="false",
+        KLINE_STORE_DIR="",
+    )
+    gunicorn_args = [a.format(workers=args.workers, threads=args.threads) for a in MODES[mode]]
+    app_cmd = [
+        sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{app_port}", "--log-level", "warning",
+        *gunicorn_args, "wsgi:application",
+    ]
+
+    log = open(os.path.join(workdir, "output.log"), "w")
+    mock = app = None
+    try:
+        mock = subprocess.Popen(mock_cmd, cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+        _wait_http(f"http://127.0.0.1:{rest_port}/mock/stats", 30, mock)
+        app = subprocess.Popen(app_cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _wait_http(f"http://127.0.0.1:{app_port}/api/webhook/stats", 60, app)
+        # 等所有 worker 启动并收到第一份盘口
+        time.sleep(args.warmup)
+
+        payloads = _signals(args.signals, symbols)
+        latencies, statuses, send_time = asyncio.run(
+            _fire(f"http://127.0.0.1:{app_port}/api/webhook", payloads, args.concurrency)
+        )
+        signals = _wait_journal(journal_path, statuses.get(200, 0), args.order_timeout * 2 + 60)
+    finally:
+        _stop(app)
+        _stop(mock)
+        log.close()
+
+    finished = [s for s in signals.values() if "finished" in s and "received" in s]
+    metrics: Dict[str, List[float]] = {name: [] for name in METRICS}
+    metrics["http"] = latencies
+    for s in finished:
+        metrics["end_to_end"].append(s["finished"] - s["received"])
+        for stage, seconds in s["timings"].items():
+            if stage in metrics:
+                metrics[stage].append(seconds)
+
+    span = max(s["finished"] for s in finished) - min(s["received"] for s in finished) if finished else 0
+    return {
+        "mode": mode,
+        "signals": args.signals,
+        "concurrency": args.concurrency,
+        "statuses": {str(code): n for code, n in sorted(statuses.items())},
+        "completed": sum(1 for s in finished if s["kind"] == EVENT_COMPLETED),
+        "failed": sum(1 for s in finished if s["kind"] == EVENT_FAILED),
+        "unfinished": len(signals) - len(finished),
+        "accept_throughput": round(args.signals / send_time, 2) if send_time else 0,
+        "throughput": round(len(finished) / span, 2) if span else 0,
+        "stages": {name: _summary(values) for name, values in metrics.items()},
+        "workdir": workdir,
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_ms: float) -> List[str]:
+    """与基线对比，返回退化项：p50/p99 变慢超过 tolerance 且超过 min_ms 毫秒，或吞吐量下降超过 tolerance"""
+    regressions = []
+    for name, current in result["stages"].items():
+        base = baseline["stages"].get(name)
+        if not base or not base.get("count") or not current.get("count"):
+            continue
+        for key in ("p50", "p99"):
+            if current[key] > base[key] * (1 + tolerance) and current[key] - base[key] > min_ms:
+                regressions.append(f"{result['mode']}.{name}.{key}: {base[key]:.1f}ms -> {current[key]:.1f}ms")
+    for key in ("throughput", "accept_throughput"):
+        if baseline.get(key) and result[key] < baseline[key] * (1 - tolerance):
+            regressions.append(f"{result['mode']}.{key}: {baseline[key]}/s -> {result[key]}/s")
+    return regressions
+
+
+def print_report(result: Dict[str, Any]):
+    print(
+        f"\n== {result['mode']} | 信号: {result['signals']} | 并发: {result['concurrency']} | "
+        f"状态码: {result['statuses']} | 完成: {result['completed']} 失败: {result['failed']} "
+        f"未结束: {result['unfinished']} | 接收吞吐: {result['accept_throughput']}/s | "
+        f"执行吞吐: {result['throughput']}/s"
+    )
+    print(f"{'阶段':<12}{'次数':>8}{'p50(ms)':>12}{'p99(ms)':>12}{'max(ms)':>12}")
+    for name, s in result["stages"].items():
+        if s["count"]:
+            print(f"{name:<12}{s['count']:>8}{s['p50']:>12.1f}{s['p99']:>12.1f}{s['max']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="webhook → 下单 端到端延迟压测")
+    parser.add_argument("--modes", default="sync,threads,async", help=f"压测模式，逗号分隔: {', '.join(MODES)}")
+    parser.add_argument("--signals", type=int, default=200, help="每种模式发送的信号数")
+    parser.add_argument("--concurrency", type=int, default=20, help="同时发送的请求数")
+    parser.add_argument("--symbols", type=int, default=8, help="标的数")
+    parser.add_argument("--workers", type=int, default=4, help="sync 模式的 worker 进程数")
+    parser.add_argument("--threads", type=int, default=16, help="threads 模式的线程数")
+    parser.add_argument("--latency-ms", type=float, default=5, help="模拟交易所接口延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=5, help="模拟交易所接口延迟抖动（毫秒）")
+    parser.add_argument("--fill-delay-ms", type=float, default=100, help="订单提交后多久开始参与撮合（毫秒）")
+    parser.add_argument("--volatility", type=float, default=0, help="合成盘口波动，默认盘口不动，限价单都能成交")
+    parser.add_argument("--order-timeout", type=int, default=10, help="订单最长等待成交时间（秒）")
+    parser.add_argument("--warmup", type=float, default=3, help="服务启动后等待时间（秒）")
+    parser.add_argument("--out", help="结果保存为 JSON")
+    parser.add_argument("--baseline", help="与基线 JSON 对比，退化时退出码为 1")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, help="结果保存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的相对退化")
+    parser.add_argument("--min-ms", type=float, default=5, help="小于该毫秒数的变慢不算退化")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        try:
+            results[mode] = run_mode(mode, args)
+        except Exception as e:
+            print(f"\n== {mode} | 跳过: {e}")
+            continue
+        print_report(results[mode])
+
+    for path in filter(None, (args.out, args.save_baseline)):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = []
+        for mode, result in results.items():
+            if mode in baseline:
+                regressions += compare(result, baseline[mode], args.tolerance, args.min_ms)
+        if regressions:
+            print("\n❌ 相对基线退化:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\n✅ 未超出基线")
+
+
+if __name__ == "__main__":
+    main()
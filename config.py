@@ -24,8 +24,82 @@ class Config:
     BITGET_PASSPHRASE = os.getenv("BITGET_PASSPHRASE") # Bitget Passphrase
     BITGET_BASE_URL = os.getenv("BITGET_BASE_URL", "https://api.bitget.com") # Bitget API 基础地址
 
+    # ==================== HTTP 连接池 ====================
+    BITGET_POOL_SIZE = int(os.getenv("BITGET_POOL_SIZE", "20")) # 连接池最大连接数
+    BITGET_POOL_KEEPALIVE = int(os.getenv("BITGET_POOL_KEEPALIVE", "10")) # 连接池最多保留的空闲 keep-alive 连接数
+    BITGET_KEEPALIVE_EXPIRY = float(os.getenv("BITGET_KEEPALIVE_EXPIRY", "60")) # 空闲连接保持时间（秒）
+    BITGET_CONNECT_TIMEOUT = float(os.getenv("BITGET_CONNECT_TIMEOUT", "3")) # 建立连接超时（秒）
+    BITGET_READ_TIMEOUT = float(os.getenv("BITGET_READ_TIMEOUT", "10")) # 读取响应超时（秒）
+    BITGET_HTTP2 = format_bool(os.getenv("BITGET_HTTP2", "false")) # 是否启用 HTTP/2
+    BITGET_MAX_RETRIES = int(os.getenv("BITGET_MAX_RETRIES", "2")) # 网络错误/5xx 最大重试次数（下单通过 clientOid 保证幂等）
+    BITGET_RETRY_BASE_DELAY = float(os.getenv("BITGET_RETRY_BASE_DELAY", "0.2")) # 重试退避基础时间（秒），实际等待带随机抖动
+    BITGET_RETRY_MAX_DELAY = float(os.getenv("BITGET_RETRY_MAX_DELAY", "2")) # 重试退避最长时间（秒）
+
+    # ==================== 客户端限流（次/秒，<=0 不限流）====================
+    BITGET_RATE_LIMIT_MARKET = float(os.getenv("BITGET_RATE_LIMIT_MARKET", "20")) # 行情接口，按 IP 限频
+    BITGET_RATE_LIMIT_ACCOUNT = float(os.getenv("BITGET_RATE_LIMIT_ACCOUNT", "10")) # 账户/持仓接口，按 UID 限频
+    BITGET_RATE_LIMIT_TRADE = float(os.getenv("BITGET_RATE_LIMIT_TRADE", "10")) # 交易接口（下单、撤单、订单查询），按 UID 限频
+
+    # ==================== 行情订阅 ====================
+    MARKET_DATA_ENABLED = format_bool(os.getenv("MARKET_DATA_ENABLED", "true")) # 是否通过 websocket 维护本地盘口
+    BITGET_WS_PUBLIC_URL = os.getenv("BITGET_WS_PUBLIC_URL", "wss://ws.bitget.com/mix/v1/stream") # Bitget 公共 websocket 地址
+    MARKET_DATA_SYMBOLS = [s for s in format_list(os.getenv("MARKET_DATA_SYMBOLS", "")) if s] # 启动时预先订阅的标的，逗号分隔
+    MARKET_DATA_STALE_MS = int(os.getenv("MARKET_DATA_STALE_MS", "2000")) # 本地盘口超过该时间未更新视为过期，回退 REST
+
     # ==================== 交易相关 ====================
     MIN_PRICE_FILTER = float(os.getenv("MIN_PRICE_FILTER", "200")) # 最小开仓金额，小于此价格，便会全仓买入
-    ORDER_CHECK_INTERVAL = int(os.getenv("ORDER_CHECK_INTERVAL", "60")) # 订单检查时间 1 分钟
+    ORDER_CHECK_INTERVAL = int(os.getenv("ORDER_CHECK_INTERVAL", "60")) # 订单最长等待成交时间 1 分钟，超时未成交则撤单
+    ORDER_POLL_INITIAL_INTERVAL = float(os.getenv("ORDER_POLL_INITIAL_INTERVAL", "0.5")) # 订单状态首次轮询间隔（秒）
+    ORDER_POLL_MAX_INTERVAL = float(os.getenv("ORDER_POLL_MAX_INTERVAL", "5")) # 订单状态最大轮询间隔（秒）
+    ORDER_POLL_BACKOFF = float(os.getenv("ORDER_POLL_BACKOFF", "1.5")) # 状态不变时轮询间隔的放大倍数
     DEFAULT_LEVERAGE = os.getenv("DEFAULT_LEVERAGE", "2") # 默认杠杆倍数
-    DEFAULT_POSITION_RATIO = float(os.getenv("DEFAULT_POSITION_RATIO", "0.1")) # 默认逐仓比例，每笔交易占账户的 10%
\ No newline at end of file
+    DEFAULT_POSITION_RATIO = float(os.getenv("DEFAULT_POSITION_RATIO", "0.1")) # 默认逐仓比例，每笔交易占账户的 10%
+    CONTRACT_SPEC_TTL = int(os.getenv("CONTRACT_SPEC_TTL", "3600")) # 合约规格缓存有效期（秒）
+    ACCOUNT_CACHE_TTL_MS = int(os.getenv("ACCOUNT_CACHE_TTL_MS", "1000")) # 账户余额快照有效期（毫秒），自己的订单提交/成交后立即失效
+    SIZING_MODE = os.getenv("SIZING_MODE", "shadow") # 可开数量计算方式：remote 交易所接口 / shadow 接口为准并与本地对比 / local 本地计算
+    SIZING_SHADOW_TOLERANCE = float(os.getenv("SIZING_SHADOW_TOLERANCE", "0.001")) # shadow 对比允许的相对差异
+
+    # ==================== 信号执行 ====================
+    SIGNAL_WORKERS = int(os.getenv("SIGNAL_WORKERS", "8")) # 信号执行工作线程数
+    SIGNAL_MAX_PENDING = int(os.getenv("SIGNAL_MAX_PENDING", "200")) # 最多排队的信号数，超过则拒绝新信号
+    SIGNAL_DEDUP_TTL = float(os.getenv("SIGNAL_DEDUP_TTL", "10")) # 相同信号在该时间内（秒）重复出现视为重发，0 为关闭去重
+    SIGNAL_DEDUP_MAX_SIZE = int(os.getenv("SIGNAL_DEDUP_MAX_SIZE", "1024")) # 去重记录的最大指纹数
+    SIGNAL_COALESCE_MS = int(os.getenv("SIGNAL_COALESCE_MS", "0")) # 同一标的信号合并窗口（毫秒），0 为不合并
+    SIGNAL_JOURNAL_PATH = os.getenv("SIGNAL_JOURNAL_PATH", "data/signal_journal.db") # 信号日志（SQLite）路径，留空关闭
+    SIGNAL_JOURNAL_FLUSH_MS = int(os.getenv("SIGNAL_JOURNAL_FLUSH_MS", "20")) # 信号日志批量写盘间隔（毫秒）
+    SIGNAL_REPLAY_MAX_AGE = float(os.getenv("SIGNAL_REPLAY_MAX_AGE", "300")) # 重启后未执行的信号在该时间（秒）内才重放
+    SIGNAL_JOURNAL_LEASE = float(os.getenv("SIGNAL_JOURNAL_LEASE", "30")) # 进程心跳租约（秒），超过该时间没有心跳的进程的未结束信号由其他进程接管
+    SIGNAL_JOURNAL_RETENTION_DAYS = float(os.getenv("SIGNAL_JOURNAL_RETENTION_DAYS", "7")) # 已结束的信号保留天数，0 为不清理
+
+    # ==================== 服务端策略信号 ====================
+    LEADER_LOCK_PATH = os.getenv("LEADER_LOCK_PATH", "data/leader.lock") # 主进程文件锁，多个 gunicorn worker 中只有拿到锁的一个运行服务端策略和背离扫描
+    STRATEGY_ENABLED = format_bool(os.getenv("STRATEGY_ENABLED", "false")) # 是否订阅交易所K线在本地计算 Supertrend + VSA 策略信号（不经过 TradingView）
+    STRATEGY_SYMBOLS = [s for s in format_list(os.getenv("STRATEGY_SYMBOLS", "")) if s] # 运行策略的标的，逗号分隔
+    STRATEGY_INTERVAL = os.getenv("STRATEGY_INTERVAL", "5m") # K线周期，如 1m / 5m / 1H
+    STRATEGY_WARMUP_BARS = int(os.getenv("STRATEGY_WARMUP_BARS", "500")) # 启动时用于预热指标的历史K线数
+    STRATEGY_PARAMS = os.getenv("STRATEGY_PARAMS", "") # 覆盖策略参数（JSON），如 {"st_factor": 3.0, "atr_mult_sl": 2.0}
+
+    # ==================== K线库 ====================
+    KLINE_STORE_DIR = os.getenv("KLINE_STORE_DIR", "data/klines") # 本地K线库目录（按 标的/周期 分列存储），留空则策略预热直接请求 REST
+    KLINE_BACKFILL_CONCURRENCY = int(os.getenv("KLINE_BACKFILL_CONCURRENCY", "4")) # 回补K线时单个标的同时进行的请求数
+
+    # ==================== RSI 背离扫描 ====================
+    DIVERGENCE_ENABLED = format_bool(os.getenv("DIVERGENCE_ENABLED", "false")) # 是否订阅K线扫描 Ultimate RSI 背离
+    DIVERGENCE_SYMBOLS = [s for s in format_list(os.getenv("DIVERGENCE_SYMBOLS", "")) if s] # 扫描的标的，逗号分隔，留空扫描全部 USDT 永续合约
+    DIVERGENCE_INTERVAL = os.getenv("DIVERGENCE_INTERVAL", "5m") # K线周期
+    DIVERGENCE_LOOKBACK = int(os.getenv("DIVERGENCE_LOOKBACK", "0")) # 上一个枢轴点最多相隔的K线数，0 为不限制（与 Pine 脚本一致）
+    DIVERGENCE_WARMUP_BARS = int(os.getenv("DIVERGENCE_WARMUP_BARS", "300")) # 启动时用于预热指标的历史K线数
+    DIVERGENCE_WARMUP_CONCURRENCY = int(os.getenv("DIVERGENCE_WARMUP_CONCURRENCY", "10")) # 预热时并发拉取K线的标的数
+    DIVERGENCE_WEBHOOK_URL = os.getenv("DIVERGENCE_WEBHOOK_URL", "") # 背离信号以 webhook 格式 POST 到该地址
+    DIVERGENCE_EXECUTE = format_bool(os.getenv("DIVERGENCE_EXECUTE", "false")) # 未配置推送地址时是否把背离信号交给本地信号执行引擎实盘下单，false 只记录日志
+    DIVERGENCE_BEAR_SENTIMENT = os.getenv("DIVERGENCE_BEAR_SENTIMENT", "flat") # 看跌背离的 sentiment：flat 平掉当前持仓（止盈/减仓）/ short 开空
+
+    # ==================== 日志 ====================
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text") # 日志格式：text 文本 / json 每行一个 JSON（带信号ID、订单ID）
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000")) # 等待后台线程写出的最大日志条数，超过则丢弃，0 为不限制
+
+    # ==================== 链路追踪 ====================
+    TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "") # span 导出文件（OTLP/JSON，每行一批），留空不写文件
+    TRACE_EXPORT_URL = os.getenv("TRACE_EXPORT_URL", "") # OTLP/HTTP 导出地址，如 http://127.0.0.1:4318/v1/traces，留空不发送；两者都留空时关闭追踪
+    TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "trading-bitget") # 链路中的服务名
+    TRACE_FLUSH_MS = int(os.getenv("TRACE_FLUSH_MS", "1000")) # span 批量导出间隔（毫秒）
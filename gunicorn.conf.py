@@ -0,0 +1,22 @@
+# gunicorn.conf.py（gunicorn 启动时自动加载当前目录下的该文件，命令行参数优先）
+import os
+import shutil
+import tempfile
+
+# 多进程 Prometheus 指标：每个 worker 把指标写入该目录下的 mmap 文件，/metrics 汇总所有 worker
+# 必须在 worker 导入 prometheus_client 之前设置，worker 由主进程 fork，继承环境变量
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "trading-bitget-metrics")
+)
+
+
+def on_starting(server):
+    # 清理上次运行留下的指标文件
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # worker 退出后其 livesum 类型的仪表盘数据不再计入
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
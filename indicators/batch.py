@@ -0,0 +1,221 @@
+"""
+批量指标计算（NumPy），与 Pine Script 内置函数逐根K线一致
+
+na 用 NaN 表示；与 Pine 相同，NaN 参与比较时结果为 False。
+可以向量化的部分（真实波幅、均线窗口、最值、枢轴点）直接用数组运算，
+RMA / EMA 和 Supertrend 轨道依赖上一根K线的结果，用标量循环逐根计算。
+"""
+from typing import Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def shift(src: np.ndarray, n: int = 1) -> np.ndarray:
+    """src[n]：向后平移 n 根K线，前 n 个为 NaN"""
+    out = np.full(len(src), np.nan)
+    if n < len(src):
+        out[n:] = src[:len(src) - n]
+    return out
+
+
+def sma(src: np.ndarray, length: int) -> np.ndarray:
+    """ta.sma：窗口内有 NaN 时为 NaN"""
+    src = np.asarray(src, dtype=np.float64)
+    out = np.full(len(src), np.nan)
+    if length <= len(src):
+        out[length - 1:] = sliding_window_view(src, length).sum(axis=1) / length
+    return out
+
+
+def _ewm(src: np.ndarray, length: int, alpha: float) -> np.ndarray:
+    """指数均线，上一个值为 NaN 时以当前的 sma 作为初值，与 Pine 的实现相同"""
+    src = np.asarray(src, dtype=np.float64)
+    seed = sma(src, length).tolist()
+    out = np.empty(len(src))
+    prev = float("nan")
+    for i, x in enumerate(src.tolist()):
+        prev = seed[i] if prev != prev else alpha * x + (1 - alpha) * prev
+        out[i] = prev
+    return out
+
+
+def rma(src: np.ndarray, length: int) -> np.ndarray:
+    """ta.rma：alpha = 1 / length 的指数均线"""
+    return _ewm(src, length, 1.0 / length)
+
+
+def ema(src: np.ndarray, length: int) -> np.ndarray:
+    """ta.ema：alpha = 2 / (length + 1)，以 sma 为初值"""
+    return _ewm(src, length, 2.0 / (length + 1))
+
+
+def tma(src: np.ndarray, length: int) -> np.ndarray:
+    """三角均线：sma(sma(x, length), length)"""
+    return sma(sma(src, length), length)
+
+
+MA_TYPES = {"SMA": sma, "EMA": ema, "RMA": rma, "TMA": tma}
+
+
+def moving_average(src: np.ndarray, length: int, ma_type: str) -> np.ndarray:
+    """按 Pine 脚本中的均线类型名计算均线"""
+    return MA_TYPES[ma_type.upper()](src, length)
+
+
+def highest(src: np.ndarray, length: int) -> np.ndarray:
+    """ta.highest：窗口内有 NaN 时为 NaN"""
+    src = np.asarray(src, dtype=np.float64)
+    out = np.full(len(src), np.nan)
+    if length <= len(src):
+        out[length - 1:] = sliding_window_view(src, length).max(axis=1)
+    return out
+
+
+def lowest(src: np.ndarray, length: int) -> np.ndarray:
+    """ta.lowest：窗口内有 NaN 时为 NaN"""
+    src = np.asarray(src, dtype=np.float64)
+    out = np.full(len(src), np.nan)
+    if length <= len(src):
+        out[length - 1:] = sliding_window_view(src, length).min(axis=1)
+    return out
+
+
+def _pivot(src: np.ndarray, left: int, right: int, high: bool) -> np.ndarray:
+    src = np.asarray(src, dtype=np.float64)
+    width = left + right + 1
+    out = np.full(len(src), np.nan)
+    if width > len(src):
+        return out
+    window = sliding_window_view(src, width)
+    center = window[:, left]
+    # 中心之外的K线，NaN 会使 max / min 为 NaN，比较结果为 False
+    others = np.concatenate((window[:, :left], window[:, left + 1:]), axis=1)
+    with np.errstate(invalid="ignore"):
+        if high:
+            is_pivot = center > others.max(axis=1) if others.size else ~np.isnan(center)
+        else:
+            is_pivot = center < others.min(axis=1) if others.size else ~np.isnan(center)
+    # 在中心之后第 right 根K线确认
+    out[width - 1:] = np.where(is_pivot, center, np.nan)
+    return out
+
+
+def pivothigh(src: np.ndarray, left: int, right: int) -> np.ndarray:
+    """ta.pivothigh：中心严格高于左右各 left / right 根K线，在第 right 根后确认并返回中心值，否则为 NaN"""
+    return _pivot(src, left, right, high=True)
+
+
+def pivotlow(src: np.ndarray, left: int, right: int) -> np.ndarray:
+    """ta.pivotlow：中心严格低于左右各 left / right 根K线，在第 right 根后确认并返回中心值，否则为 NaN"""
+    return _pivot(src, left, right, high=False)
+
+
+def valuewhen(condition: np.ndarray, src: np.ndarray, occurrence: int = 0) -> np.ndarray:
+    """
+    ta.valuewhen：倒数第 occurrence 次（0 为最近一次，含当前K线）满足条件时的 src
+
+    与 Pine 相同，数值作为条件时 NaN 和 0 视为 False。
+    """
+    condition = np.asarray(condition)
+    if condition.dtype != bool:
+        condition = ~np.isnan(condition) & (condition != 0)
+    src = np.asarray(src, dtype=np.float64)
+    positions = np.flatnonzero(condition)
+    count = np.cumsum(condition)
+    index = count - 1 - occurrence
+    valid = index >= 0
+    out = np.full(len(src), np.nan)
+    out[valid] = src[positions[index[valid]]]
+    return out
+
+
+def ultimate_rsi(
+    src: np.ndarray,
+    length: int = 14,
+    method: str = "RMA",
+    smooth: int = 14,
+    signal_method: str = "EMA",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ultimate RSI（strategy/ANY_ANY_Ultimate_RSI.pine）
+
+    Returns:
+        (arsi, signal)
+    """
+    src = np.asarray(src, dtype=np.float64)
+    upper = highest(src, length)
+    lower = lowest(src, length)
+    r = upper - lower
+    with np.errstate(invalid="ignore"):
+        diff = np.where(upper > shift(upper), r, np.where(lower < shift(lower), -r, src - shift(src)))
+    num = moving_average(diff, length, method)
+    den = moving_average(np.abs(diff), length, method)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        arsi = np.where(den != 0, num / den * 50 + 50, np.nan)
+    return arsi, moving_average(arsi, smooth, signal_method)
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """ta.tr(true)：第一根K线为 high - low"""
+    prev_close = shift(close)
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return tr
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int) -> np.ndarray:
+    """ta.atr"""
+    return rma(true_range(high, low, close), length)
+
+
+def supertrend(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    factor: float,
+    atr_period: int,
+    atr_values: np.ndarray = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ta.supertrend
+
+    Args:
+        atr_values: 已经算好的 atr(atr_period)，参数扫描时可以复用
+
+    Returns:
+        (supertrend, direction)：direction 为 -1 表示上升趋势，1 表示下降趋势
+    """
+    if atr_values is None:
+        atr_values = atr(high, low, close, atr_period)
+    hl2 = (high + low) / 2
+    upper_raw = (hl2 + factor * atr_values).tolist()
+    lower_raw = (hl2 - factor * atr_values).tolist()
+    atr_list = atr_values.tolist()
+    close_list = close.tolist()
+
+    n = len(close_list)
+    st = np.empty(n)
+    direction = np.empty(n, dtype=np.int8)
+    nan = float("nan")
+    prev_lower = prev_upper = prev_close = prev_st = nan
+    for i in range(n):
+        # nz(band[1])
+        pl = 0.0 if prev_lower != prev_lower else prev_lower
+        pu = 0.0 if prev_upper != prev_upper else prev_upper
+        lower = lower_raw[i]
+        upper = upper_raw[i]
+        lower = lower if (lower > pl or prev_close < pl) else pl
+        upper = upper if (upper < pu or prev_close > pu) else pu
+
+        c = close_list[i]
+        if i == 0 or atr_list[i - 1] != atr_list[i - 1]:
+            d = 1
+        elif prev_st == pu:
+            d = -1 if c > upper else 1
+        else:
+            d = 1 if c < lower else -1
+
+        prev_st = lower if d == -1 else upper
+        st[i] = prev_st
+        direction[i] = d
+        prev_lower, prev_upper, prev_close = lower, upper, c
+    return st, direction
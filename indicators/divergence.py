@@ -0,0 +1,144 @@
+"""
+Ultimate RSI 背离（strategy/ANY_ANY_Ultimate_RSI.pine）
+
+    看跌背离：价格枢轴高点高于上一个价格枢轴高点，同一根K线的 RSI 枢轴高点低于上一个 RSI 枢轴高点
+    看涨背离：价格枢轴低点低于上一个价格枢轴低点，同一根K线的 RSI 枢轴低点高于上一个 RSI 枢轴低点
+
+「上一个」即 ta.valuewhen(pivot, pivot, 1)。背离在枢轴中心之后第 right_bars 根K线确认。
+Pine 脚本声明了 divLookback 但没有使用，lookback 为 0 时与脚本一致（不限制距离），
+大于 0 时要求上一个枢轴点在 lookback 根K线以内。
+
+divergence() 一次计算整段历史（NumPy），Divergence 逐根K线增量计算（固定大小的缓冲区），两者逐根一致。
+"""
+from dataclasses import dataclass
+from typing import Tuple
+import numpy as np
+from indicators import batch
+from indicators.streaming import NAN, PivotHigh, PivotLow, UltimateRsi, isnan
+
+
+@dataclass(frozen=True)
+class DivergenceParams:
+    """参数，默认值与 Pine 脚本的 input 相同"""
+
+    length: int = 14
+    method: str = "RMA"
+    smooth: int = 14
+    signal_method: str = "EMA"
+    left_bars: int = 2
+    right_bars: int = 2
+    lookback: int = 0
+
+
+def _is_true(value: float) -> bool:
+    # Pine 中数值作为条件时 na 和 0 为 False
+    return not isnan(value) and value != 0
+
+
+def _compare(current: np.ndarray, previous: np.ndarray, distance: np.ndarray, lookback: int, higher: bool):
+    with np.errstate(invalid="ignore"):
+        result = current > previous if higher else current < previous
+        if lookback > 0:
+            result &= distance <= lookback
+    return result
+
+
+def divergence(
+    high: np.ndarray,
+    low: np.ndarray,
+    src: np.ndarray,
+    params: DivergenceParams = DivergenceParams(),
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    批量计算背离
+
+    Returns:
+        (bull_div, bear_div)：布尔数组，为 True 的K线即 Pine 脚本触发背离告警的K线
+    """
+    arsi, _ = batch.ultimate_rsi(src, params.length, params.method, params.smooth, params.signal_method)
+    left, right = params.left_bars, params.right_bars
+    index = np.arange(len(arsi), dtype=np.float64)
+
+    def previous(pivot: np.ndarray):
+        """(上一个枢轴值, 与上一个枢轴的距离)"""
+        return batch.valuewhen(pivot, pivot, 1), index - batch.valuewhen(pivot, index, 1)
+
+    price_high = batch.pivothigh(high, left, right)
+    price_low = batch.pivotlow(low, left, right)
+    rsi_high = batch.pivothigh(arsi, left, right)
+    rsi_low = batch.pivotlow(arsi, left, right)
+
+    bear = (
+        _compare(price_high, *previous(price_high), params.lookback, higher=True)
+        & _compare(rsi_high, *previous(rsi_high), params.lookback, higher=False)
+    )
+    bull = (
+        _compare(price_low, *previous(price_low), params.lookback, higher=False)
+        & _compare(rsi_low, *previous(rsi_low), params.lookback, higher=True)
+    )
+    return bull, bear
+
+
+class _PivotHistory:
+    """记录最近一次枢轴点，返回当前枢轴与上一个枢轴比较所需的值"""
+
+    def __init__(self, pivot):
+        self.pivot = pivot
+        self._value = NAN
+        self._index = -1
+
+    def update(self, x: float, index: int) -> Tuple[float, float, float]:
+        """
+        Returns:
+            (当前枢轴值, 上一个枢轴值, 与上一个枢轴的距离)，不是枢轴时当前值为 NaN
+        """
+        value = self.pivot.update(x)
+        if not _is_true(value):
+            return value, NAN, NAN
+        previous, distance = self._value, (index - self._index if self._index >= 0 else NAN)
+        self._value, self._index = value, index
+        return value, previous, distance
+
+
+class Divergence:
+    """
+    增量计算背离，每根已收盘K线调用一次 update
+
+    只保存 Ultimate RSI 的窗口、枢轴窗口（left_bars + right_bars + 1 根）和上一个枢轴点，内存占用与历史长度无关。
+    """
+
+    def __init__(self, params: DivergenceParams = DivergenceParams()):
+        self.params = params
+        left, right = params.left_bars, params.right_bars
+        self.rsi = UltimateRsi(params.length, params.method, params.smooth, params.signal_method)
+        self._price_high = _PivotHistory(PivotHigh(left, right))
+        self._price_low = _PivotHistory(PivotLow(left, right))
+        self._rsi_high = _PivotHistory(PivotHigh(left, right))
+        self._rsi_low = _PivotHistory(PivotLow(left, right))
+        self._index = -1
+        self.bull = self.bear = False
+
+    def _within(self, distance: float) -> bool:
+        return self.params.lookback <= 0 or distance <= self.params.lookback
+
+    def update(self, high: float, low: float, src: float) -> Tuple[bool, bool]:
+        """
+        Returns:
+            (bull_div, bear_div)
+        """
+        self._index += 1
+        arsi, _ = self.rsi.update(src)
+        price_high, prev_price_high, price_high_distance = self._price_high.update(high, self._index)
+        price_low, prev_price_low, price_low_distance = self._price_low.update(low, self._index)
+        rsi_high, prev_rsi_high, rsi_high_distance = self._rsi_high.update(arsi, self._index)
+        rsi_low, prev_rsi_low, rsi_low_distance = self._rsi_low.update(arsi, self._index)
+
+        self.bear = (
+            price_high > prev_price_high and self._within(price_high_distance)
+            and rsi_high < prev_rsi_high and self._within(rsi_high_distance)
+        )
+        self.bull = (
+            price_low < prev_price_low and self._within(price_low_distance)
+            and rsi_low > prev_rsi_low and self._within(rsi_low_distance)
+        )
+        return self.bull, self.bear
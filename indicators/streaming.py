@@ -0,0 +1,303 @@
+"""
+增量指标（每根K线 O(1) 更新），用于实时K线流生成信号
+
+每个指标 update() 传入最新一根已收盘K线的数据，返回当前值；na 用 NaN 表示，
+与 indicators/batch.py 的批量计算逐根一致。
+"""
+import math
+from collections import deque
+from typing import Deque, Tuple
+
+
+NAN = float("nan")
+
+
+def isnan(x: float) -> bool:
+    return x != x
+
+
+class Sma:
+    """ta.sma：环形缓冲 + 滑动和，窗口内有 NaN 时为 NaN"""
+
+    def __init__(self, length: int):
+        self.length = length
+        self._buffer = [NAN] * length
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self._nans = 0
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        old = self._buffer[self._index]
+        if self._count >= self.length:
+            if isnan(old):
+                self._nans -= 1
+            else:
+                self._sum -= old
+        else:
+            self._count += 1
+        if isnan(x):
+            self._nans += 1
+        else:
+            self._sum += x
+        self._buffer[self._index] = x
+        self._index = (self._index + 1) % self.length
+        if self._index == 0 and self._nans == 0:
+            # 每轮重新求和一次，避免滑动和的浮点误差累积（均摊 O(1)）
+            self._sum = math.fsum(self._buffer)
+
+        full = self._count >= self.length and self._nans == 0
+        self.value = self._sum / self.length if full else NAN
+        return self.value
+
+
+class Rma:
+    """ta.rma：alpha = 1 / length，上一个值为 NaN 时以 sma 为初值"""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.alpha = self._alpha(length)
+        self._seed = Sma(length)
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        seed = self._seed.update(x)
+        if isnan(self.value):
+            self.value = seed
+        else:
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+    @staticmethod
+    def _alpha(length: int) -> float:
+        return 1.0 / length
+
+
+class Ema(Rma):
+    """ta.ema：alpha = 2 / (length + 1)，以 sma 为初值"""
+
+    @staticmethod
+    def _alpha(length: int) -> float:
+        return 2.0 / (length + 1)
+
+
+class Tma:
+    """三角均线：sma(sma(x, length), length)"""
+
+    def __init__(self, length: int):
+        self._inner = Sma(length)
+        self._outer = Sma(length)
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        self.value = self._outer.update(self._inner.update(x))
+        return self.value
+
+
+MA_TYPES = {"SMA": Sma, "EMA": Ema, "RMA": Rma, "TMA": Tma}
+
+
+def moving_average(ma_type: str, length: int):
+    """按 Pine 脚本中的均线类型名创建增量均线"""
+    return MA_TYPES[ma_type.upper()](length)
+
+
+class Atr:
+    """ta.atr：ta.rma(ta.tr(true), length)"""
+
+    def __init__(self, length: int):
+        self._rma = Rma(length)
+        self._prev_close = NAN
+        self.value = NAN
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if isnan(self._prev_close):
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self.value = self._rma.update(tr)
+        return self.value
+
+
+class Supertrend:
+    """ta.supertrend：返回 (supertrend, direction)，direction 为 -1 表示上升趋势"""
+
+    def __init__(self, factor: float, atr_period: int):
+        self.factor = factor
+        self._atr = Atr(atr_period)
+        self._prev_atr = NAN
+        self._prev_lower = NAN
+        self._prev_upper = NAN
+        self._prev_close = NAN
+        self._prev_st = NAN
+        self._first = True
+        self.value = NAN
+        self.direction = 1
+
+    def update(self, high: float, low: float, close: float) -> Tuple[float, int]:
+        atr = self._atr.update(high, low, close)
+        hl2 = (high + low) / 2
+        pl = 0.0 if isnan(self._prev_lower) else self._prev_lower
+        pu = 0.0 if isnan(self._prev_upper) else self._prev_upper
+        lower = hl2 - self.factor * atr
+        upper = hl2 + self.factor * atr
+        lower = lower if (lower > pl or self._prev_close < pl) else pl
+        upper = upper if (upper < pu or self._prev_close > pu) else pu
+
+        if self._first or isnan(self._prev_atr):
+            direction = 1
+        elif self._prev_st == pu:
+            direction = -1 if close > upper else 1
+        else:
+            direction = 1 if close < lower else -1
+
+        self.value = lower if direction == -1 else upper
+        self.direction = direction
+        self._first = False
+        self._prev_atr = atr
+        self._prev_lower, self._prev_upper, self._prev_close, self._prev_st = lower, upper, close, self.value
+        return self.value, direction
+
+
+class _Extreme:
+    """单调队列维护窗口最值，每根K线均摊 O(1)"""
+
+    def __init__(self, length: int, highest: bool):
+        self.length = length
+        self.highest = highest
+        self._window: Deque[Tuple[int, float]] = deque()
+        self._index = -1
+        self._nan_index = -1
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        self._index += 1
+        if isnan(x):
+            self._nan_index = self._index
+        else:
+            window = self._window
+            if self.highest:
+                while window and window[-1][1] <= x:
+                    window.pop()
+            else:
+                while window and window[-1][1] >= x:
+                    window.pop()
+            window.append((self._index, x))
+        while self._window and self._window[0][0] <= self._index - self.length:
+            self._window.popleft()
+
+        ready = self._index >= self.length - 1 and self._nan_index <= self._index - self.length
+        self.value = self._window[0][1] if ready and self._window else NAN
+        return self.value
+
+
+class Highest(_Extreme):
+    """ta.highest"""
+
+    def __init__(self, length: int):
+        super().__init__(length, highest=True)
+
+
+class Lowest(_Extreme):
+    """ta.lowest"""
+
+    def __init__(self, length: int):
+        super().__init__(length, highest=False)
+
+
+class _Pivot:
+    """
+    枢轴点：窗口为左 left 根 + 中心 + 右 right 根，中心严格高于（低于）其余所有K线时为枢轴
+
+    与 ta.pivothigh / ta.pivotlow 相同，结果在中心之后第 right 根K线确认，返回中心的值，否则为 NaN。
+    窗口长度固定，每根K线的计算量与数据长度无关。
+    """
+
+    def __init__(self, left: int, right: int, high: bool):
+        self.left = left
+        self.right = right
+        self.high = high
+        self._window: Deque[float] = deque(maxlen=left + right + 1)
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        self._window.append(x)
+        self.value = NAN
+        if len(self._window) == self._window.maxlen:
+            center = self._window[self.left]
+            others = (v for i, v in enumerate(self._window) if i != self.left)
+            if all(center > v for v in others) if self.high else all(center < v for v in others):
+                self.value = center
+        return self.value
+
+
+class PivotHigh(_Pivot):
+    """ta.pivothigh"""
+
+    def __init__(self, left: int, right: int):
+        super().__init__(left, right, high=True)
+
+
+class PivotLow(_Pivot):
+    """ta.pivotlow"""
+
+    def __init__(self, left: int, right: int):
+        super().__init__(left, right, high=False)
+
+
+class UltimateRsi:
+    """
+    Ultimate RSI（strategy/ANY_ANY_Ultimate_RSI.pine）
+
+    update() 返回 (arsi, signal)，同时更新 buy / sell / cross_up / cross_down 四个信号：
+    超卖上穿、超买下穿、上穿信号线、下穿信号线。
+    """
+
+    def __init__(
+        self,
+        length: int = 14,
+        method: str = "RMA",
+        smooth: int = 14,
+        signal_method: str = "EMA",
+        ob_value: float = 80.0,
+        os_value: float = 20.0,
+    ):
+        self.ob_value = ob_value
+        self.os_value = os_value
+        self._highest = Highest(length)
+        self._lowest = Lowest(length)
+        self._num = moving_average(method, length)
+        self._den = moving_average(method, length)
+        self._signal = moving_average(signal_method, smooth)
+        self._prev_src = NAN
+        self._prev_upper = NAN
+        self._prev_lower = NAN
+        self.value = NAN
+        self.signal = NAN
+        self.buy = self.sell = self.cross_up = self.cross_down = False
+
+    def update(self, src: float) -> Tuple[float, float]:
+        upper = self._highest.update(src)
+        lower = self._lowest.update(src)
+        if upper > self._prev_upper:
+            diff = upper - lower
+        elif lower < self._prev_lower:
+            diff = -(upper - lower)
+        else:
+            diff = src - self._prev_src
+        self._prev_src, self._prev_upper, self._prev_lower = src, upper, lower
+
+        num = self._num.update(diff)
+        den = self._den.update(abs(diff))
+        prev_value, prev_signal = self.value, self.signal
+        self.value = num / den * 50 + 50 if den else NAN
+        self.signal = self._signal.update(self.value)
+
+        # ta.crossover(a, b)：a > b 且 a[1] <= b[1]
+        self.buy = self.value > self.os_value and prev_value <= self.os_value
+        self.sell = self.value < self.ob_value and prev_value >= self.ob_value
+        self.cross_up = self.value > self.signal and prev_value <= prev_signal
+        self.cross_down = self.value < self.signal and prev_value >= prev_signal
+        return self.value, self.signal
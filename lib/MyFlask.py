@@ -4,6 +4,19 @@ from flask import current_app
 
 if TYPE_CHECKING:
     from utils.bitget_client import BitgetClient
+    from services.order_tracker import OrderTracker
+    from services.leverage_cache import LeverageCache
+    from services.account_cache import AccountCache
+    from services.position_sizing import PositionSizer
+    from services.market_data import MarketDataFeed
+    from services.contract_specs import ContractSpecCache
+    from services.signal_executor import SignalExecutor
+    from services.signal_dedup import SignalDeduplicator, SignalCoalescer
+    from services.signal_journal import SignalJournal
+    from services.kline_signals import KlineSignalEngine
+    from services.divergence_scanner import DivergenceScanner
+    from services.kline_store import KlineStore
+    from utils.leader import LeaderLock
 
 
 class MyFlask(Flask):
@@ -11,6 +24,20 @@ class MyFlask(Flask):
     自定义的 Flask 对象，用于保存全局变量
     """
     bitget_client: "BitgetClient" = None
+    order_tracker: "OrderTracker" = None
+    leverage_cache: "LeverageCache" = None
+    account_cache: "AccountCache" = None
+    position_sizer: "PositionSizer" = None
+    market_data: "MarketDataFeed" = None
+    contract_specs: "ContractSpecCache" = None
+    signal_executor: "SignalExecutor" = None
+    signal_dedup: "SignalDeduplicator" = None
+    signal_coalescer: "SignalCoalescer" = None
+    signal_journal: "SignalJournal" = None
+    kline_signals: "KlineSignalEngine" = None
+    divergence_scanner: "DivergenceScanner" = None
+    kline_store: "KlineStore" = None
+    leader_lock: "LeaderLock" = None
 
     def _get_current_object(self) -> "MyFlask":
         return (
@@ -0,0 +1,151 @@
+"""
+模拟交易所的盘口来源：回放录制的 websocket 订单簿，或生成随机游走盘口
+
+两者都产出与 Bitget 公共 websocket 相同格式的 books 推送，由服务端应用到撮合盘口后原样转发给订阅者。
+"""
+import asyncio
+import json
+import math
+import random
+import time
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from services.market_data import OrderBook, to_inst_id
+from mock_exchange.exchange import MockContract
+
+
+# publish(instId, 推送消息)
+Publisher = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+def books_message(inst_id: str, action: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {"action": action, "arg": {"instType": "mc", "channel": "books", "instId": inst_id}, "data": [data]}
+
+
+def snapshot_message(inst_id: str, book: OrderBook) -> Dict[str, Any]:
+    """当前盘口的全量快照（新订阅者从这里开始接收增量）"""
+    bids, asks = book.top(len(book.bids) + len(book.asks))
+    data = {
+        "bids": [list(level) for level in bids],
+        "asks": [list(level) for level in asks],
+        "ts": str(book.ts),
+        "checksum": book.checksum(),
+    }
+    if book.seq is not None:
+        data["seq"] = book.seq
+    return books_message(inst_id, "snapshot", data)
+
+
+def read_recording(path: str) -> Tuple[List[Dict[str, Any]], List[Tuple[int, Dict[str, Any]]]]:
+    """
+    读取录制文件（见 mock_exchange.record）
+
+    Returns:
+        (合约列表, [(接收时间毫秒, 推送消息)])
+    """
+    contracts, records = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if "contracts" in item:
+                contracts = item["contracts"]
+            else:
+                records.append((int(item["ts"]), item["message"]))
+    return contracts, records
+
+
+def infer_contract(symbol: str, records: List[Tuple[int, Dict[str, Any]]]) -> MockContract:
+    """录制文件中没有合约规格时，按盘口价格的小数位推断价格精度"""
+    inst_id = to_inst_id(symbol)
+    places = 0
+    for _, message in records[:100]:
+        if message["arg"]["instId"] != inst_id:
+            continue
+        for level in message["data"][0].get("bids", [])[:5]:
+            places = max(places, len(level[0].partition(".")[2]))
+    return MockContract(symbol=symbol, price_place=places)
+
+
+class ReplayBookSource:
+    """
+    按录制时的时间间隔回放订单簿推送
+
+    Args:
+        speed: 回放倍速，2 表示两倍速
+        loop: 回放结束后从头开始（从快照重新开始，序号不连续的客户端会自动重新订阅）
+    """
+
+    def __init__(self, records: List[Tuple[int, Dict[str, Any]]], speed: float = 1.0, loop: bool = True):
+        self.records = records
+        self.speed = speed
+        self.loop = loop
+
+    def symbols(self) -> List[str]:
+        return sorted({message["arg"]["instId"] for _, message in self.records})
+
+    async def run(self, publish: Publisher):
+        while True:
+            prev_ts: Optional[int] = None
+            for ts, message in self.records:
+                if prev_ts is not None and ts > prev_ts:
+                    await asyncio.sleep((ts - prev_ts) / 1000 / self.speed)
+                prev_ts = ts
+                await publish(message["arg"]["instId"], message)
+            if not self.loop:
+                return
+
+
+class SyntheticBookSource:
+    """
+    随机游走盘口：每个周期对每个标的生成一份新的全量快照
+
+    Args:
+        prices: 合约 -> 初始中间价
+        interval: 推送间隔（秒）
+        levels: 每边档位数
+        volatility: 每个周期中间价的对数收益标准差
+    """
+
+    def __init__(
+        self,
+        contracts: Dict[str, MockContract],
+        prices: Dict[str, float],
+        interval: float = 0.1,
+        levels: int = 25,
+        volatility: float = 0.0002,
+        seed: Optional[int] = None,
+    ):
+        self.contracts = contracts
+        self.mids = {to_inst_id(symbol): price for symbol, price in prices.items()}
+        self.interval = interval
+        self.levels = levels
+        self.volatility = volatility
+        self._random = random.Random(seed)
+
+    def _levels(self, contract: MockContract, mid: float) -> Tuple[List[List[str]], List[List[str]]]:
+        tick = Decimal(contract.price_end_step).scaleb(-contract.price_place)
+        best_bid = (Decimal(repr(mid)) / tick).to_integral_value() * tick - tick
+        step = contract.size_multiplier
+
+        def level(price: Decimal) -> List[str]:
+            size = (Decimal(self._random.randint(1, 2000)) * step).quantize(step)
+            return [str(price.quantize(tick)), str(size)]
+
+        bids = [level(best_bid - i * tick) for i in range(self.levels)]
+        asks = [level(best_bid + (i + 1) * tick) for i in range(self.levels)]
+        return bids, asks
+
+    async def run(self, publish: Publisher):
+        while True:
+            for symbol, contract in self.contracts.items():
+                inst_id = to_inst_id(symbol)
+                mid = self.mids[inst_id] = self.mids[inst_id] * math.exp(self._random.gauss(0, self.volatility))
+                bids, asks = self._levels(contract, mid)
+                book = OrderBook()
+                data = {"bids": bids, "asks": asks, "ts": str(int(time.time() * 1000))}
+                book.snapshot(data)
+                data["checksum"] = book.checksum()
+                await publish(inst_id, books_message(inst_id, "snapshot", data))
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,120 @@
+"""
+模拟交易所的K线：由盘口中间价实时生成，供 /api/mix/v1/market/candles 和 websocket candle 频道使用
+
+启动前没有真实的历史K线，某个 标的/周期 第一次被请求或订阅时，从当前中间价向前随机游走生成 history_bars 根历史K线，
+服务端策略和背离扫描可以离线预热；之后每次盘口推送用中间价更新当前K线（开高低收），成交量为随机数。
+"""
+import math
+import random
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from services.kline_signals import interval_ms
+
+
+# K线行：[开盘时间, 开, 高, 低, 收, 成交量（币）, 成交额（USDT）]，与 Bitget 接口相同均为字符串
+CandleRow = List[str]
+
+
+class _Series:
+    """单个 标的/周期 的K线：已收盘的K线 + 当前K线"""
+
+    def __init__(self, step: int, max_bars: int):
+        self.step = step
+        self.closed: Deque[List[float]] = deque(maxlen=max_bars)
+        # [开盘时间, 开, 高, 低, 收, 成交量]
+        self.current: Optional[List[float]] = None
+
+
+def _row(bar: List[float]) -> CandleRow:
+    ts, open_, high, low, close, volume = bar
+    return [str(int(ts)), repr(open_), repr(high), repr(low), repr(close), repr(volume), repr(volume * close)]
+
+
+class CandleBook:
+    """
+    按 (instId, 周期) 维护K线
+
+    Args:
+        history_bars: 第一次使用时生成的历史K线数，也是每个周期保留的最大K线数
+        volatility: 生成历史K线时每根K线收盘价的对数收益标准差
+    """
+
+    def __init__(self, history_bars: int = 1000, volatility: float = 0.003, seed: Optional[int] = None):
+        self.history_bars = history_bars
+        self.volatility = volatility
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        # instId -> 最新中间价
+        self._mids: Dict[str, float] = {}
+
+    def _random_volume(self) -> float:
+        return round(self._random.uniform(100, 1000), 3)
+
+    def _create(self, inst_id: str, interval: str, now_ms: int) -> Optional[_Series]:
+        mid = self._mids.get(inst_id)
+        if mid is None:
+            return None
+        step = interval_ms(interval)
+        series = self._series[(inst_id, interval)] = _Series(step, self.history_bars)
+        start = now_ms // step * step
+        # 从当前价格向前随机游走，最后一根已收盘K线的收盘价等于当前中间价
+        bars, close = [], mid
+        for i in range(1, self.history_bars + 1):
+            open_ = close * math.exp(-self._random.gauss(0, self.volatility))
+            wick = abs(self._random.gauss(0, self.volatility / 2))
+            high, low = max(open_, close) * (1 + wick), min(open_, close) * (1 - wick)
+            bars.append([start - i * step, open_, high, low, close, self._random_volume()])
+            close = open_
+        series.closed.extend(reversed(bars))
+        series.current = [start, mid, mid, mid, mid, 0.0]
+        return series
+
+    def _get(self, inst_id: str, interval: str, now_ms: int) -> Optional[_Series]:
+        series = self._series.get((inst_id, interval))
+        return series if series is not None else self._create(inst_id, interval, now_ms)
+
+    def update(self, inst_id: str, mid: float, ts_ms: int) -> List[Tuple[str, CandleRow]]:
+        """
+        用盘口中间价更新该标的全部周期的当前K线
+
+        Returns:
+            [(周期, 当前K线)]，只包含已经被请求或订阅过的周期
+        """
+        updated = []
+        with self._lock:
+            self._mids[inst_id] = mid
+            for (series_inst_id, interval), series in self._series.items():
+                if series_inst_id != inst_id:
+                    continue
+                start = ts_ms // series.step * series.step
+                bar = series.current
+                if start > bar[0]:
+                    # 当前K线收盘；中间没有盘口推送的周期用上一根收盘价补齐，避免K线缺口
+                    series.closed.append(bar)
+                    for missing in range(int(bar[0]) + series.step, start, series.step):
+                        close = bar[4]
+                        series.closed.append([missing, close, close, close, close, 0.0])
+                    bar = series.current = [start, mid, mid, mid, mid, 0.0]
+                bar[2], bar[3], bar[4] = max(bar[2], mid), min(bar[3], mid), mid
+                bar[5] = round(bar[5] + self._random_volume() / 100, 3)
+                updated.append((interval, _row(bar)))
+        return updated
+
+    def candles(self, inst_id: str, interval: str, start_ms: int, end_ms: int, limit: int, now_ms: int) -> List[CandleRow]:
+        """开盘时间在 [start_ms, end_ms] 内的K线（按时间升序，最多 limit 根，超过时取最新的），包括当前K线"""
+        with self._lock:
+            series = self._get(inst_id, interval, now_ms)
+            if series is None:
+                return []
+            bars = [bar for bar in list(series.closed) + [series.current] if start_ms <= bar[0] <= end_ms]
+            return [_row(bar) for bar in bars[-limit:]]
+
+    def snapshot(self, inst_id: str, interval: str, now_ms: int, count: int = 200) -> List[CandleRow]:
+        """订阅时推送的最近 count 根K线（最后一根为当前K线）"""
+        with self._lock:
+            series = self._get(inst_id, interval, now_ms)
+            if series is None:
+                return []
+            return [_row(bar) for bar in list(series.closed)[-(count - 1):] + [series.current]]
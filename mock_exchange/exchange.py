@@ -0,0 +1,460 @@
+"""
+模拟交易所的撮合与账户状态
+
+- 盘口来自回放的真实订单簿（或合成的随机游走盘口），只读，不会被模拟成交消耗
+- 限价单在对手价优于委托价时按盘口档位成交，单次撮合最多成交当前盘口可见的数量，剩余部分挂单等待后续盘口
+- 市价单立即按盘口逐档成交
+- 逐仓账户：开仓占用 价格 * 数量 / 杠杆 的保证金，平仓结算盈亏，开平仓都按 taker 费率扣手续费
+"""
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_DOWN
+from typing import Any, Dict, List, Optional, Tuple
+from services.market_data import OrderBook, to_inst_id
+
+
+ORDER_STATUS_NEW = "new"
+ORDER_STATUS_PARTIAL_FILLED = "partially_filled"
+ORDER_STATUS_FILLED = "filled"
+ORDER_STATUS_CANCELED = "canceled"
+
+DEFAULT_LEVERAGE = Decimal("20")
+ZERO = Decimal("0")
+
+
+class MockAPIError(Exception):
+    """模拟交易所的业务错误，以 Bitget 的 code/msg 格式返回"""
+
+    def __init__(self, code: str, msg: str):
+        super().__init__(msg)
+        self.code = code
+        self.msg = msg
+
+
+@dataclass
+class MockContract:
+    """合约规格，字段含义与 /api/mix/v1/market/contracts 相同"""
+
+    symbol: str
+    price_place: int = 1
+    price_end_step: int = 1
+    size_multiplier: Decimal = Decimal("0.001")
+    min_trade_num: Decimal = Decimal("0.001")
+    maker_fee_rate: Decimal = Decimal("0.0002")
+    taker_fee_rate: Decimal = Decimal("0.0006")
+
+    def to_api(self) -> Dict[str, Any]:
+        inst_id = to_inst_id(self.symbol)
+        return {
+            "symbol": self.symbol,
+            "baseCoin": inst_id[:-4],
+            "quoteCoin": "USDT",
+            "symbolType": "perpetual",
+            "pricePlace": str(self.price_place),
+            "priceEndStep": str(self.price_end_step),
+            "sizeMultiplier": str(self.size_multiplier),
+            "minTradeNum": str(self.min_trade_num),
+            "makerFeeRate": str(self.maker_fee_rate),
+            "takerFeeRate": str(self.taker_fee_rate),
+            "supportMarginCoins": ["USDT"],
+        }
+
+
+@dataclass
+class MockOrder:
+    order_id: str
+    client_oid: str
+    symbol: str
+    side: str  # open_long / open_short / close_long / close_short
+    order_type: str  # limit / market
+    size: Decimal
+    price: Optional[Decimal]
+    leverage: Decimal
+    created_at: float
+    filled: Decimal = ZERO
+    filled_value: Decimal = ZERO
+    fee: Decimal = ZERO
+    status: str = ORDER_STATUS_NEW
+
+    @property
+    def remaining(self) -> Decimal:
+        return self.size - self.filled
+
+    @property
+    def is_buy(self) -> bool:
+        return self.side in ("open_long", "close_short")
+
+    @property
+    def hold_side(self) -> str:
+        return self.side.split("_")[1]
+
+    @property
+    def is_open(self) -> bool:
+        return self.side.startswith("open")
+
+    def to_api(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "orderId": self.order_id,
+            "clientOid": self.client_oid,
+            "size": str(self.size),
+            "price": str(self.price) if self.price is not None else None,
+            "state": self.status,
+            "side": self.side,
+            "orderType": self.order_type,
+            "timeInForce": "normal",
+            "filledQty": str(self.filled),
+            "filledAmount": str(self.filled_value),
+            "priceAvg": str(self.filled_value / self.filled) if self.filled else None,
+            "fee": str(-self.fee),
+            "leverage": str(self.leverage),
+            "marginCoin": "USDT",
+            "marginMode": "fixed",
+            "cTime": str(int(self.created_at * 1000)),
+            "uTime": str(int(time.time() * 1000)),
+        }
+
+
+@dataclass
+class MockPosition:
+    total: Decimal = ZERO
+    average_price: Decimal = ZERO
+    leverage: Decimal = DEFAULT_LEVERAGE
+    # 平仓挂单占用的数量
+    locked: Decimal = ZERO
+
+    @property
+    def margin(self) -> Decimal:
+        return self.total * self.average_price / self.leverage
+
+
+@dataclass
+class MatchStats:
+    orders: int = 0
+    fills: int = 0
+    rejects: int = 0
+    cancels: int = 0
+    books: Dict[str, int] = field(default_factory=dict)
+
+
+class MockExchange:
+    """
+    模拟交易所状态（线程安全）：合约、盘口、订单、持仓和账户
+
+    Args:
+        balance: 初始 USDT 权益
+        fill_delay: 订单提交后经过该时间（秒）才参与撮合，模拟交易所撮合延迟
+    """
+
+    def __init__(self, balance: Decimal = Decimal("10000"), fill_delay: float = 0.0):
+        self.equity = balance
+        self.fill_delay = fill_delay
+        self.contracts: Dict[str, MockContract] = {}
+        self.books: Dict[str, OrderBook] = {}
+        self.orders: Dict[str, MockOrder] = {}
+        self.stats = MatchStats()
+
+        self._lock = threading.RLock()
+        self._client_oids: Dict[str, str] = {}
+        # (instId, holdSide) -> 持仓
+        self._positions: Dict[Tuple[str, str], MockPosition] = {}
+        self._order_ids = itertools.count(int(time.time() * 1000) * 1000)
+
+    # ==================== 合约与盘口 ====================
+
+    def add_contract(self, contract: MockContract):
+        with self._lock:
+            self.contracts[to_inst_id(contract.symbol)] = contract
+
+    def contract(self, symbol: str) -> MockContract:
+        contract = self.contracts.get(to_inst_id(symbol))
+        if contract is None:
+            raise MockAPIError("40034", f"Parameter {symbol} does not exist")
+        return contract
+
+    def update_book(self, inst_id: str, action: str, data: Dict[str, Any]) -> OrderBook:
+        """应用一条 websocket 盘口推送，并用新盘口撮合该标的的挂单"""
+        with self._lock:
+            book = self.books.get(inst_id)
+            if book is None or action == "snapshot":
+                book = self.books[inst_id] = OrderBook()
+                book.snapshot(data)
+            else:
+                book.update(data)
+            self.stats.books[inst_id] = self.stats.books.get(inst_id, 0) + 1
+            self._match_symbol(inst_id)
+            return book
+
+    def depth(self, symbol: str, limit: int) -> Dict[str, Any]:
+        inst_id = to_inst_id(self.contract(symbol).symbol)
+        with self._lock:
+            book = self.books.get(inst_id)
+            bids, asks = book.top(limit) if book else ([], [])
+            return {
+                "bids": [list(level) for level in bids],
+                "asks": [list(level) for level in asks],
+                "timestamp": str(book.ts if book else int(time.time() * 1000)),
+            }
+
+    def ticker(self, symbol: str) -> Dict[str, Any]:
+        depth = self.depth(symbol, 1)
+        bid = depth["bids"][0][0] if depth["bids"] else None
+        ask = depth["asks"][0][0] if depth["asks"] else None
+        return {"symbol": self.contract(symbol).symbol, "bestBid": bid, "bestAsk": ask, "last": bid or ask}
+
+    # ==================== 账户与持仓 ====================
+
+    def _position(self, symbol: str, hold_side: str) -> MockPosition:
+        return self._positions.setdefault((to_inst_id(symbol), hold_side), MockPosition())
+
+    def available(self) -> Decimal:
+        """可用保证金 = 权益 - 持仓保证金 - 开仓挂单占用的保证金"""
+        with self._lock:
+            used = sum((p.margin for p in self._positions.values()), ZERO)
+            for order in self.orders.values():
+                if order.is_open and order.status in (ORDER_STATUS_NEW, ORDER_STATUS_PARTIAL_FILLED):
+                    used += order.remaining * (order.price or ZERO) / order.leverage
+            return self.equity - used
+
+    def accounts(self) -> List[Dict[str, Any]]:
+        available = self.available()
+        with self._lock:
+            unrealized = sum(
+                (self._unrealized(inst_id, side, p) for (inst_id, side), p in self._positions.items()), ZERO
+            )
+            return [{
+                "marginCoin": "USDT",
+                "locked": str(self.equity - available),
+                "available": str(available),
+                "crossMaxAvailable": str(available),
+                "fixedMaxAvailable": str(available),
+                "maxTransferOut": str(available),
+                "equity": str(self.equity + unrealized),
+                "usdtEquity": str(self.equity + unrealized),
+                "unrealizedPL": str(unrealized),
+            }]
+
+    def single_account(self, symbol: str) -> Dict[str, Any]:
+        contract = self.contract(symbol)
+        with self._lock:
+            long, short = self._position(symbol, "long"), self._position(symbol, "short")
+            return {
+                **self.accounts()[0],
+                "symbol": contract.symbol,
+                "marginMode": "fixed",
+                "fixedLongLeverage": str(long.leverage),
+                "fixedShortLeverage": str(short.leverage),
+                "crossMarginLeverage": str(DEFAULT_LEVERAGE),
+                "holdMode": "double_hold",
+            }
+
+    def set_leverage(self, symbol: str, leverage: str, hold_side: Optional[str]) -> Dict[str, Any]:
+        contract = self.contract(symbol)
+        value = Decimal(leverage)
+        if not 1 <= value <= 125:
+            raise MockAPIError("40797", "Exceeded the maximum settable leverage")
+        with self._lock:
+            for side in [hold_side] if hold_side else ["long", "short"]:
+                self._position(symbol, side).leverage = value
+            long, short = self._position(symbol, "long"), self._position(symbol, "short")
+            return {
+                "symbol": contract.symbol,
+                "marginCoin": "USDT",
+                "longLeverage": str(long.leverage),
+                "shortLeverage": str(short.leverage),
+                "marginMode": "fixed",
+            }
+
+    def _unrealized(self, inst_id: str, hold_side: str, position: MockPosition) -> Decimal:
+        book = self.books.get(inst_id)
+        if not position.total or book is None or not book.bids or not book.asks:
+            return ZERO
+        mark = (max(book.bids) + min(book.asks)) / 2
+        diff = mark - position.average_price
+        return diff * position.total if hold_side == "long" else -diff * position.total
+
+    def positions(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            result = []
+            for (inst_id, hold_side), p in self._positions.items():
+                if symbol is not None and inst_id != to_inst_id(symbol):
+                    continue
+                if not p.total and symbol is None:
+                    continue
+                result.append({
+                    "symbol": self.contracts[inst_id].symbol,
+                    "marginCoin": "USDT",
+                    "holdSide": hold_side,
+                    "total": str(p.total),
+                    "available": str(p.total - p.locked),
+                    "locked": str(p.locked),
+                    "averageOpenPrice": str(p.average_price),
+                    "leverage": str(p.leverage),
+                    "marginMode": "fixed",
+                    "margin": str(p.margin),
+                    "unrealizedPL": str(self._unrealized(inst_id, hold_side, p)),
+                })
+            return result
+
+    def open_count(self, symbol: str, open_price: str, open_amount: str, leverage: Optional[str]) -> Dict[str, Any]:
+        """可开数量，按 保证金 = 数量 * 价格 / 杠杆 + 开平两次 taker 手续费 计算"""
+        contract = self.contract(symbol)
+        price, amount = Decimal(open_price), Decimal(open_amount)
+        lev = Decimal(leverage) if leverage else DEFAULT_LEVERAGE
+        if price <= 0:
+            raise MockAPIError("40020", "Parameter openPrice error")
+        count = amount / (price / lev + 2 * price * contract.taker_fee_rate)
+        steps = (count / contract.size_multiplier).to_integral_value(rounding=ROUND_DOWN)
+        return {"openCount": str((steps * contract.size_multiplier).normalize())}
+
+    # ==================== 订单 ====================
+
+    def place_order(self, symbol: str, data: Dict[str, Any]) -> MockOrder:
+        contract = self.contract(symbol)
+        side, order_type = data.get("side"), data.get("orderType")
+        if side not in ("open_long", "open_short", "close_long", "close_short"):
+            raise MockAPIError("40020", "Parameter side error")
+        if order_type not in ("limit", "market"):
+            raise MockAPIError("40020", "Parameter orderType error")
+        size = Decimal(str(data.get("size") or "0"))
+        if size < contract.min_trade_num or size % contract.size_multiplier:
+            raise MockAPIError("45110", f"less than the minimum order quantity or not a multiple of {contract.size_multiplier}")
+        price = Decimal(str(data["price"])) if order_type == "limit" and data.get("price") else None
+        if order_type == "limit" and price is None:
+            raise MockAPIError("40020", "Parameter price error")
+
+        with self._lock:
+            client_oid = data.get("clientOid") or f"mock{next(self._order_ids)}"
+            if client_oid in self._client_oids:
+                raise MockAPIError("40757", "Duplicate clientOid")
+            position = self._position(symbol, side.split("_")[1])
+            leverage = Decimal(str(data["leverage"])) if data.get("leverage") else position.leverage
+
+            if side.startswith("open"):
+                reference = price or self._best(to_inst_id(symbol), buy=side == "open_long")
+                if reference is None:
+                    raise MockAPIError("40808", "No liquidity")
+                required = size * reference / leverage + size * reference * contract.taker_fee_rate
+                if required > self.available():
+                    self.stats.rejects += 1
+                    raise MockAPIError("40762", "The order amount exceeds the balance")
+            elif size > position.total - position.locked:
+                self.stats.rejects += 1
+                raise MockAPIError("22002", "No position to close")
+
+            order = MockOrder(
+                order_id=str(next(self._order_ids)),
+                client_oid=client_oid,
+                symbol=contract.symbol,
+                side=side,
+                order_type=order_type,
+                size=size,
+                price=price,
+                leverage=leverage,
+                created_at=time.time(),
+            )
+            if not order.is_open:
+                position.locked += size
+            self.orders[order.order_id] = order
+            self._client_oids[client_oid] = order.order_id
+            self.stats.orders += 1
+            self._match(order)
+            return order
+
+    def get_order(self, symbol: str, order_id: Optional[str] = None, client_oid: Optional[str] = None) -> MockOrder:
+        with self._lock:
+            if order_id is None and client_oid is not None:
+                order_id = self._client_oids.get(client_oid)
+            order = self.orders.get(order_id or "")
+            if order is None or to_inst_id(order.symbol) != to_inst_id(symbol):
+                raise MockAPIError("40768", "Order does not exist")
+            # 查询时也尝试撮合（撮合延迟到期后不必等下一次盘口推送）
+            self._match(order)
+            return order
+
+    def current_orders(self, symbol: str) -> List[Dict[str, Any]]:
+        inst_id = to_inst_id(symbol)
+        with self._lock:
+            return [
+                o.to_api() for o in self.orders.values()
+                if to_inst_id(o.symbol) == inst_id and o.status in (ORDER_STATUS_NEW, ORDER_STATUS_PARTIAL_FILLED)
+            ]
+
+    def cancel_order(self, symbol: str, order_id: str) -> MockOrder:
+        with self._lock:
+            order = self.get_order(symbol, order_id)
+            if order.status not in (ORDER_STATUS_NEW, ORDER_STATUS_PARTIAL_FILLED):
+                raise MockAPIError("40768", "Order has been filled or canceled")
+            order.status = ORDER_STATUS_CANCELED
+            if not order.is_open:
+                self._position(order.symbol, order.hold_side).locked -= order.remaining
+            self.stats.cancels += 1
+            return order
+
+    # ==================== 撮合 ====================
+
+    def _best(self, inst_id: str, buy: bool) -> Optional[Decimal]:
+        book = self.books.get(inst_id)
+        if book is None:
+            return None
+        side = book.asks if buy else book.bids
+        if not side:
+            return None
+        return min(side) if buy else max(side)
+
+    def _match_symbol(self, inst_id: str):
+        for order in list(self.orders.values()):
+            if to_inst_id(order.symbol) == inst_id:
+                self._match(order)
+
+    def _match(self, order: MockOrder):
+        if order.status not in (ORDER_STATUS_NEW, ORDER_STATUS_PARTIAL_FILLED):
+            return
+        if time.time() - order.created_at < self.fill_delay:
+            return
+        book = self.books.get(to_inst_id(order.symbol))
+        if book is None:
+            return
+
+        levels = sorted(book.asks.items()) if order.is_buy else sorted(book.bids.items(), reverse=True)
+        for price, (_, size_str) in levels:
+            if order.remaining <= 0:
+                break
+            if order.price is not None and (price > order.price if order.is_buy else price < order.price):
+                break
+            self._fill(order, price, min(order.remaining, Decimal(size_str)))
+
+        if order.order_type == "market" and order.remaining > 0 and order.filled > 0:
+            # 盘口深度不足时市价单剩余部分撤销
+            self._finish(order, ORDER_STATUS_CANCELED)
+
+    def _fill(self, order: MockOrder, price: Decimal, quantity: Decimal):
+        contract = self.contracts[to_inst_id(order.symbol)]
+        fee = price * quantity * contract.taker_fee_rate
+        position = self._position(order.symbol, order.hold_side)
+        if order.is_open:
+            total = position.total + quantity
+            position.average_price = (position.average_price * position.total + price * quantity) / total
+            position.total = total
+            position.leverage = order.leverage
+        else:
+            diff = price - position.average_price
+            self.equity += (diff if order.hold_side == "long" else -diff) * quantity
+            position.total -= quantity
+            position.locked -= quantity
+            if not position.total:
+                position.average_price = ZERO
+
+        self.equity -= fee
+        order.fee += fee
+        order.filled += quantity
+        order.filled_value += price * quantity
+        order.status = ORDER_STATUS_FILLED if order.remaining <= 0 else ORDER_STATUS_PARTIAL_FILLED
+        self.stats.fills += 1
+
+    def _finish(self, order: MockOrder, status: str):
+        if not order.is_open:
+            self._position(order.symbol, order.hold_side).locked -= order.remaining
+        order.status = status
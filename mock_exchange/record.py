@@ -0,0 +1,69 @@
+"""
+录制 Bitget 公共 websocket 订单簿推送，供模拟交易所回放（不需要 API Key）
+
+    python -m mock_exchange.record BTCUSDT_UMCBL ETHUSDT_UMCBL --duration 600 --out data/books.jsonl
+
+文件每行一个 JSON：第一行为合约规格 {"contracts": [...]}，之后为 {"ts": 接收时间毫秒, "message": 原始推送}。
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import httpx
+import websockets
+from config import Config
+from services.market_data import to_inst_id
+
+
+async def record(symbols, out: str, duration: float, url: str):
+    inst_ids = [to_inst_id(s) for s in symbols]
+    # 合约列表是公共接口，直接请求，不经过签名客户端
+    async with httpx.AsyncClient(base_url=Config.BITGET_BASE_URL, timeout=Config.BITGET_READ_TIMEOUT) as http:
+        response = await http.get("/api/mix/v1/market/contracts", params={"productType": "umcbl"})
+        response.raise_for_status()
+        contracts = [c for c in response.json().get("data") or [] if to_inst_id(c["symbol"]) in inst_ids]
+
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    count = 0
+    deadline = time.monotonic() + duration
+    with open(out, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"contracts": contracts}) + "\n")
+        async with websockets.connect(url, ping_interval=None) as ws:
+            await ws.send(json.dumps({
+                "op": "subscribe",
+                "args": [{"instType": "mc", "channel": "books", "instId": inst_id} for inst_id in inst_ids],
+            }))
+            last_ping = time.monotonic()
+            while time.monotonic() < deadline:
+                if time.monotonic() - last_ping > 25:
+                    await ws.send("ping")
+                    last_ping = time.monotonic()
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=min(5, max(deadline - time.monotonic(), 0.01)))
+                except asyncio.TimeoutError:
+                    continue
+                if raw == "pong":
+                    continue
+                message = json.loads(raw)
+                if message.get("arg", {}).get("channel") != "books" or not message.get("data"):
+                    continue
+                f.write(json.dumps({"ts": int(time.time() * 1000), "message": message}, separators=(",", ":")) + "\n")
+                count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制 Bitget 订单簿推送")
+    parser.add_argument("symbols", nargs="+", help="合约符号，如 BTCUSDT_UMCBL")
+    parser.add_argument("--duration", type=float, default=300, help="录制时长（秒）")
+    parser.add_argument("--out", default="data/books.jsonl", help="输出文件")
+    parser.add_argument("--url", default=Config.BITGET_WS_PUBLIC_URL, help="websocket 地址")
+    args = parser.parse_args()
+
+    count = asyncio.run(record(args.symbols, args.out, args.duration, args.url))
+    print(json.dumps({"messages": count, "out": args.out}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+模拟 Bitget 交易所：实现 BitgetClient 用到的 REST 接口和公共 websocket 订单簿、K线推送，用于离线压测和稳定性测试
+
+    # 合成盘口
+    python -m mock_exchange.server --symbol BTCUSDT_UMCBL=60000 --symbol ETHUSDT_UMCBL=3000 \\
+        --latency-ms 30 --jitter-ms 20 --error-rate 0.01 --fill-delay-ms 200
+    # 回放录制的盘口（见 mock_exchange.record）
+    python -m mock_exchange.server --replay data/books.jsonl --speed 2
+
+然后让服务指向模拟交易所（地址为本机时不需要真实 API Key）：
+
+    BITGET_BASE_URL=http://127.0.0.1:8090 BITGET_WS_PUBLIC_URL=ws://127.0.0.1:8091 python app.py
+
+K线由盘口中间价实时生成，启动前的历史K线为随机游走（见 mock_exchange.candles），
+STRATEGY_ENABLED / DIVERGENCE_ENABLED 可以离线预热和运行，但信号不代表真实行情。
+
+额外接口：GET /mock/stats 查看撮合统计，POST /mock/faults 在运行中调整延迟和错误注入。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, fields
+from decimal import Decimal
+from typing import Any, Dict, List, Set, Tuple
+from flask import Flask, jsonify, request
+from websockets.asyncio.server import ServerConnection, broadcast, serve
+from werkzeug.serving import make_server
+from services.kline_signals import interval_ms
+from services.market_data import to_inst_id
+from mock_exchange.books import (
+    ReplayBookSource,
+    SyntheticBookSource,
+    infer_contract,
+    read_recording,
+    snapshot_message,
+)
+from mock_exchange.candles import CandleBook
+from mock_exchange.exchange import MockAPIError, MockContract, MockExchange
+
+
+@dataclass
+class FaultConfig:
+    """故障注入配置，每个 REST 请求都按此执行"""
+
+    latency_ms: float = 0.0  # 固定延迟
+    jitter_ms: float = 0.0  # 在固定延迟上叠加的随机延迟（指数分布的均值，产生长尾）
+    error_rate: float = 0.0  # 返回 503 的概率（客户端会重试）
+    rate_limit_rate: float = 0.0  # 返回 429 的概率
+    reject_rate: float = 0.0  # 下单被业务拒绝的概率
+
+    def update(self, values: Dict[str, Any]):
+        for f in fields(self):
+            if f.name in values:
+                setattr(self, f.name, float(values[f.name]))
+
+
+def success(data: Any):
+    return jsonify({"code": "00000", "msg": "success", "requestTime": int(time.time() * 1000), "data": data})
+
+
+def failure(code: str, msg: str, status: int = 400):
+    return jsonify({"code": code, "msg": msg, "requestTime": int(time.time() * 1000), "data": None}), status
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def create_mock_app(exchange: MockExchange, faults: FaultConfig, candles: CandleBook) -> Flask:
+    """模拟 REST 接口，返回格式与 Bitget v1 合约接口相同"""
+    app = Flask(__name__)
+    counters = {"requests": 0, "injected_errors": 0, "injected_rejects": 0}
+    counters_lock = threading.Lock()
+
+    def args() -> Dict[str, Any]:
+        return request.args if request.method == "GET" else (request.get_json(silent=True) or {})
+
+    @app.before_request
+    def inject_faults():
+        if request.path.startswith("/mock/"):
+            return None
+        with counters_lock:
+            counters["requests"] += 1
+        delay = faults.latency_ms + (random.expovariate(1 / faults.jitter_ms) if faults.jitter_ms > 0 else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        roll = random.random()
+        if roll < faults.error_rate:
+            with counters_lock:
+                counters["injected_errors"] += 1
+            return failure("50000", "Service temporarily unavailable (injected)", 503)
+        if roll < faults.error_rate + faults.rate_limit_rate:
+            with counters_lock:
+                counters["injected_errors"] += 1
+            return failure("429", "Too Many Requests (injected)", 429)
+        return None
+
+    @app.errorhandler(MockAPIError)
+    def api_error(e: MockAPIError):
+        return failure(e.code, e.msg)
+
+    @app.errorhandler(KeyError)
+    def missing_param(e: KeyError):
+        return failure("40019", f"Parameter {e.args[0]} cannot be empty")
+
+    # ==================== 行情 ====================
+
+    @app.get("/api/mix/v1/market/contracts")
+    def contracts():
+        return success([c.to_api() for c in exchange.contracts.values()])
+
+    @app.get("/api/mix/v1/market/depth")
+    def depth():
+        return success(exchange.depth(args()["symbol"], int(args().get("limit", 100))))
+
+    @app.get("/api/mix/v1/market/ticker")
+    def ticker():
+        return success(exchange.ticker(args()["symbol"]))
+
+    @app.get("/api/mix/v1/market/candles")
+    def market_candles():
+        data = args()
+        inst_id = to_inst_id(exchange.contract(data["symbol"]).symbol)
+        granularity = data["granularity"]
+        try:
+            return success(candles.candles(
+                inst_id, granularity, int(data["startTime"]), int(data["endTime"]), int(data.get("limit", 100)), now_ms(),
+            ))
+        except (KeyError, ValueError, IndexError):
+            raise MockAPIError("40019", f"Parameter granularity {granularity} is invalid")
+
+    # ==================== 账户与持仓 ====================
+
+    @app.get("/api/mix/v1/account/accounts")
+    def accounts():
+        return success(exchange.accounts())
+
+    @app.get("/api/mix/v1/account/account")
+    def single_account():
+        return success(exchange.single_account(args()["symbol"]))
+
+    @app.post("/api/mix/v1/account/open-count")
+    def open_count():
+        data = args()
+        return success(exchange.open_count(data["symbol"], data["openPrice"], data["openAmount"], data.get("leverage")))
+
+    @app.post("/api/mix/v1/account/setLeverage")
+    def set_leverage():
+        data = args()
+        return success(exchange.set_leverage(data["symbol"], data["leverage"], data.get("holdSide")))
+
+    @app.get("/api/mix/v1/position/allPosition-v2")
+    def all_positions():
+        return success(exchange.positions())
+
+    @app.get("/api/mix/v1/position/singlePosition-v2")
+    def single_position():
+        return success(exchange.positions(args()["symbol"]))
+
+    # ==================== 交易 ====================
+
+    def place(symbol: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        if faults.reject_rate and random.random() < faults.reject_rate:
+            with counters_lock:
+                counters["injected_rejects"] += 1
+            raise MockAPIError("40762", "The order amount exceeds the balance (injected)")
+        order = exchange.place_order(symbol, data)
+        return {"orderId": order.order_id, "clientOid": order.client_oid}
+
+    @app.post("/api/mix/v1/order/placeOrder")
+    def place_order():
+        data = args()
+        return success(place(data["symbol"], data))
+
+    @app.post("/api/mix/v1/order/batch-orders")
+    def batch_orders():
+        data = args()
+        order_info, failures = [], []
+        for item in data["orderDataList"]:
+            try:
+                order_info.append(place(data["symbol"], item))
+            except MockAPIError as e:
+                failures.append({"orderId": "", "clientOid": item.get("clientOid"), "errorMsg": e.msg, "errorCode": e.code})
+        return success({"orderInfo": order_info, "failure": failures})
+
+    @app.post("/api/mix/v1/order/cancel-order")
+    def cancel_order():
+        data = args()
+        order = exchange.cancel_order(data["symbol"], data["orderId"])
+        return success({"orderId": order.order_id, "clientOid": order.client_oid})
+
+    @app.post("/api/mix/v1/order/cancel-batch-orders")
+    def cancel_batch_orders():
+        data = args()
+        order_ids, fail_infos = [], []
+        for order_id in data["orderIds"]:
+            try:
+                order_ids.append(exchange.cancel_order(data["symbol"], order_id).order_id)
+            except MockAPIError as e:
+                fail_infos.append({"order_id": order_id, "err_code": e.code, "err_msg": e.msg})
+        return success({"symbol": data["symbol"], "order_ids": order_ids, "fail_infos": fail_infos})
+
+    @app.get("/api/mix/v1/order/detail")
+    def order_detail():
+        data = args()
+        return success(exchange.get_order(data["symbol"], data.get("orderId"), data.get("clientOid")).to_api())
+
+    @app.get("/api/mix/v1/order/current")
+    def current_orders():
+        return success(exchange.current_orders(args()["symbol"]))
+
+    # ==================== 模拟交易所管理 ====================
+
+    @app.get("/mock/stats")
+    def mock_stats():
+        with counters_lock:
+            requests = dict(counters)
+        return jsonify({
+            **requests,
+            **asdict(exchange.stats),
+            "equity": str(exchange.equity),
+            "available": str(exchange.available()),
+            "positions": exchange.positions(),
+            "faults": asdict(faults),
+        })
+
+    @app.post("/mock/faults")
+    def mock_faults():
+        faults.update(request.get_json(silent=True) or {})
+        return jsonify(asdict(faults))
+
+    return app
+
+
+class MockWebsocketServer:
+    """
+    模拟公共 websocket：支持 books、candle{周期} 频道的订阅/退订和字符串 ping/pong
+
+    新订阅者先收到当前盘口的全量快照（K线为最近的K线），之后收到与盘口来源相同的推送；
+    每次盘口推送后用中间价更新K线，并把当前K线推送给该周期的订阅者。
+    """
+
+    def __init__(self, exchange: MockExchange, candles: CandleBook, logger: logging.Logger):
+        self.exchange = exchange
+        self.candles = candles
+        self.logger = logger
+        # (instId, 频道) -> 订阅的连接
+        self._subscribers: Dict[Tuple[str, str], Set[ServerConnection]] = {}
+
+    async def publish(self, inst_id: str, message: Dict[str, Any]):
+        """应用到撮合盘口后转发给订阅者，并更新K线"""
+        book = self.exchange.update_book(inst_id, message.get("action", "update"), message["data"][0])
+        subscribers = self._subscribers.get((inst_id, "books"))
+        if subscribers:
+            broadcast(subscribers, json.dumps(message))
+        if not (book.bids and book.asks):
+            return
+        mid = float((max(book.bids) + min(book.asks)) / 2)
+        for interval, row in self.candles.update(inst_id, mid, now_ms()):
+            channel = f"candle{interval}"
+            subscribers = self._subscribers.get((inst_id, channel))
+            if subscribers:
+                broadcast(subscribers, json.dumps(candle_message(inst_id, channel, "update", [row])))
+
+    async def handle(self, ws: ServerConnection):
+        try:
+            async for raw in ws:
+                if raw == "ping":
+                    await ws.send("pong")
+                    continue
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    await ws.send(json.dumps({"event": "error", "code": 30001, "msg": "invalid request"}))
+                    continue
+                for arg in message.get("args") or []:
+                    await self._handle_arg(ws, message.get("op"), arg)
+        finally:
+            for subscribers in self._subscribers.values():
+                subscribers.discard(ws)
+
+    async def _handle_arg(self, ws: ServerConnection, op: str, arg: Dict[str, Any]):
+        inst_id, channel = arg.get("instId", ""), str(arg.get("channel", ""))
+        interval = channel[len("candle"):] if channel.startswith("candle") else None
+        if interval is not None:
+            try:
+                interval_ms(interval)
+            except (KeyError, ValueError, IndexError):
+                interval = None
+        if (channel != "books" and interval is None) or op not in ("subscribe", "unsubscribe"):
+            await ws.send(json.dumps({"event": "error", "arg": arg, "code": 30016, "msg": "channel not supported by mock"}))
+            return
+        if op == "unsubscribe":
+            self._subscribers.get((inst_id, channel), set()).discard(ws)
+            await ws.send(json.dumps({"event": "unsubscribe", "arg": arg}))
+            return
+        self._subscribers.setdefault((inst_id, channel), set()).add(ws)
+        await ws.send(json.dumps({"event": "subscribe", "arg": arg}))
+        if interval is not None:
+            rows = self.candles.snapshot(inst_id, interval, now_ms())
+            if rows:
+                await ws.send(json.dumps(candle_message(inst_id, channel, "snapshot", rows)))
+            return
+        book = self.exchange.books.get(inst_id)
+        if book is not None:
+            await ws.send(json.dumps(snapshot_message(inst_id, book)))
+
+
+def parse_symbols(items):
+    """解析 --symbol BTCUSDT_UMCBL=60000[:pricePlace[:sizeMultiplier]]"""
+    contracts, prices = {}, {}
+    for item in items:
+        symbol, _, spec = item.partition("=")
+        price, _, rest = spec.partition(":")
+        price_place, _, size_multiplier = rest.partition(":")
+        contracts[symbol] = MockContract(
+            symbol=symbol,
+            price_place=int(price_place or 1),
+            size_multiplier=Decimal(size_multiplier or "0.001"),
+            min_trade_num=Decimal(size_multiplier or "0.001"),
+        )
+        prices[symbol] = float(price or 100)
+    return contracts, prices
+
+
+def candle_message(inst_id: str, channel: str, action: str, rows: List[List[str]]) -> Dict[str, Any]:
+    return {"action": action, "arg": {"instType": "mc", "channel": channel, "instId": inst_id}, "data": rows}
+
+
+async def serve_forever(args, exchange: MockExchange, candles: CandleBook, source, logger: logging.Logger):
+    ws_server = MockWebsocketServer(exchange, candles, logger)
+    async with serve(ws_server.handle, args.host, args.ws_port, ping_interval=None):
+        await source.run(ws_server.publish)
+        # 回放结束（--no-loop）后继续提供最后的盘口
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟 Bitget 交易所（REST + 公共 websocket）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090, help="REST 端口")
+    parser.add_argument("--ws-port", type=int, default=8091, help="websocket 端口")
+    parser.add_argument("--symbol", action="append", default=[], metavar="SYMBOL=PRICE[:PLACE[:STEP]]",
+                        help="合成盘口的合约、初始价格、价格小数位和数量步长")
+    parser.add_argument("--replay", help="回放录制的订单簿文件（.jsonl）")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速")
+    parser.add_argument("--no-loop", action="store_true", help="回放结束后不再从头开始")
+    parser.add_argument("--book-interval-ms", type=float, default=100, help="合成盘口推送间隔（毫秒）")
+    parser.add_argument("--volatility", type=float, default=0.0002, help="合成盘口每次推送中间价的对数收益标准差，0 为盘口不动")
+    parser.add_argument("--seed", type=int, help="随机种子")
+    parser.add_argument("--balance", default="10000", help="初始 USDT 权益")
+    parser.add_argument("--fill-delay-ms", type=float, default=0, help="订单提交后多久开始参与撮合（毫秒）")
+    parser.add_argument("--candle-history", type=int, default=1000, help="每个 标的/周期 生成的历史K线数（策略预热用）")
+    for f in fields(FaultConfig):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", type=float, default=f.default)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s : %(message)s")
+    logger = logging.getLogger("mock_exchange")
+    random.seed(args.seed)
+
+    exchange = MockExchange(Decimal(args.balance), args.fill_delay_ms / 1000)
+    if args.replay:
+        contracts, records = read_recording(args.replay)
+        source = ReplayBookSource(records, args.speed, loop=not args.no_loop)
+        specs = {to_inst_id(item["symbol"]): item for item in contracts}
+        for inst_id in source.symbols():
+            item = specs.get(inst_id)
+            symbol = item["symbol"] if item else f"{inst_id}_UMCBL"
+            exchange.add_contract(MockContract(
+                symbol=symbol,
+                price_place=int(item.get("pricePlace", 1)),
+                price_end_step=int(item.get("priceEndStep", 1)),
+                size_multiplier=Decimal(str(item.get("sizeMultiplier") or "0.001")),
+                min_trade_num=Decimal(str(item.get("minTradeNum") or "0.001")),
+                maker_fee_rate=Decimal(str(item.get("makerFeeRate") or "0.0002")),
+                taker_fee_rate=Decimal(str(item.get("takerFeeRate") or "0.0006")),
+            ) if item else infer_contract(symbol, records))
+    else:
+        contracts, prices = parse_symbols(args.symbol or ["BTCUSDT_UMCBL=60000"])
+        for contract in contracts.values():
+            exchange.add_contract(contract)
+        source = SyntheticBookSource(
+            contracts, prices, args.book_interval_ms / 1000, volatility=args.volatility, seed=args.seed
+        )
+
+    candles = CandleBook(args.candle_history, seed=args.seed)
+    faults = FaultConfig()
+    faults.update(vars(args))
+    http_server = make_server(args.host, args.port, create_mock_app(exchange, faults, candles), threaded=True)
+    threading.Thread(target=http_server.serve_forever, name="mock-rest", daemon=True).start()
+    # werkzeug 每个请求一行访问日志，压测时关闭
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    logger.info(
+        f"✅ 模拟交易所已启动 | 合约: {', '.join(c.symbol for c in exchange.contracts.values())} | "
+        f"BITGET_BASE_URL=http://{args.host}:{args.port} BITGET_WS_PUBLIC_URL=ws://{args.host}:{args.ws_port}"
+    )
+    try:
+        asyncio.run(serve_forever(args, exchange, candles, source, logger))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
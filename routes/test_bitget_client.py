@@ -1,5 +1,4 @@
 from flask import Blueprint, request, jsonify
-from utils.bitget_client import BitgetClient
 from lib.MyFlask import get_current_app
 
 test_bitget_bp = Blueprint("test_bitget", __name__)
@@ -20,7 +19,7 @@ def test_get_account_info():
         product_type = payload.get("product_type", "umcbl")
         logger.info(f"🧪 测试获取账户信息 | product_type: {product_type}")
         
-        client = BitgetClient()
+        client = get_current_app().bitget_client
         result = client.get_account_info(product_type)
         
         return jsonify({
@@ -53,7 +52,7 @@ def test_get_position():
         margin_coin = payload.get("margin_coin", "USDT")
         logger.info(f"🧪 测试获取单个仓位 | symbol: {symbol} | margin_coin: {margin_coin}")
         
-        client = BitgetClient()
+        client = get_current_app().bitget_client
         result = client.get_position(symbol, margin_coin)
         
         return jsonify({
@@ -84,7 +83,7 @@ def test_get_all_positions():
         margin_coin = payload.get("margin_coin", "USDT")
         logger.info(f"🧪 测试获取全部仓位 | product_type: {product_type} | margin_coin: {margin_coin}")
         
-        client = BitgetClient()
+        client = get_current_app().bitget_client
         result = client.get_all_positions(product_type, margin_coin)
         
         return jsonify({
@@ -116,7 +115,7 @@ def test_get_ticker():
         symbol = payload.get("symbol", "").upper()
         logger.info(f"🧪 测试获取Ticker行情 | symbol: {symbol}")
         
-        client = BitgetClient()
+        client = get_current_app().bitget_client
         result = client.get_ticker(symbol)
         
         return jsonify({
@@ -149,7 +148,7 @@ def test_get_depth():
         limit = int(payload.get("limit", 5))
         logger.info(f"🧪 测试获取深度行情 | symbol: {symbol} | limit: {limit}")
         
-        client = BitgetClient()
+        client = get_current_app().bitget_client
         result = client.get_depth(symbol, limit)
         
         return jsonify({
@@ -215,7 +214,7 @@ def test_place_order():
             f"size: {size} | price: {price} | leverage: {leverage}"
         )
         
-        client = BitgetClient()
+        client = get_current_app().bitget_client
         result = client.place_order(
             symbol=symbol,
             side=side,
@@ -276,7 +275,7 @@ def test_cancel_order():
         
         logger.info(f"🧪 测试撤单 | symbol: {symbol} | order_id: {order_id}")
         
-        client = BitgetClient()
+        client = get_current_app().bitget_client
         result = client.cancel_order(symbol, order_id, product_type)
         
         return jsonify({
@@ -311,7 +310,7 @@ def test_get_current_orders():
         
         logger.info(f"🧪 测试获取当前委托 | symbol: {symbol}")
         
-        client = BitgetClient()
+        client = get_current_app().bitget_client
         result = client.get_current_orders(symbol, product_type)
         
         return jsonify({
@@ -355,7 +354,7 @@ def test_get_order_detail():
         
         logger.info(f"🧪 测试获取订单详情 | symbol: {symbol} | order_id: {order_id}")
         
-        client = BitgetClient()
+        client = get_current_app().bitget_client
         result = client.get_order_detail(symbol, order_id, product_type)
         
         return jsonify({
@@ -407,7 +406,7 @@ def test_get_openable_size():
             f"open_price: {open_price} | open_amount: {open_amount} | leverage: {leverage}"
         )
         
-        client = BitgetClient()
+        client = get_current_app().bitget_client
         result = client.get_openable_size(
             symbol=symbol,
             margin_coin=margin_coin,
@@ -463,7 +462,7 @@ def test_set_leverage():
         
         logger.info(f"🧪 测试设置杠杆 | symbol: {symbol} | leverage: {leverage}x | margin_coin: {margin_coin}")
         
-        client = BitgetClient()
+        client = get_current_app().bitget_client
         result = client.set_leverage(symbol, leverage, margin_coin)
         
         return jsonify({
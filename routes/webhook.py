@@ -1,12 +1,14 @@
+import contextvars
+import time
 from flask import Blueprint, request, jsonify
-import threading
 
 from config import Config
 from lib.MyFlask import get_current_app
-from services.trade_service import (
-    estimate_max_purchase_quantity,
-    handle_contract_signal,
-)
+from services.signal_dedup import signal_fingerprint
+from services.signal_journal import EVENT_FAILED, current_signal_id
+from services.signal_timing import STAGE_PARSE, start_timing
+from services.trade_service import estimate_max_purchase_quantity
+from utils import tracing
 
 webhook_bp = Blueprint("webhook", __name__)
 
@@ -24,6 +26,19 @@ def receive_webhook():
         - leverage: 杠杆倍数（可选，默认 2）
         - position_ratio: 逐仓比例（可选，默认 0.1 即 10%）
     """
+    # 信号ID、阶段计时等上下文变量只在本次请求中有效，不会带到该线程处理的下一个请求
+    return contextvars.copy_context().run(_traced_receive_webhook)
+
+
+def _traced_receive_webhook():
+    # 每个信号一条链路：根 span 覆盖 webhook 请求，排队、执行、Bitget 请求都是它的子 span
+    parent = tracing.parse_traceparent(request.headers.get("traceparent"))
+    with tracing.span("POST /api/webhook", tracing.SPAN_KIND_SERVER, parent=parent):
+        return _receive_webhook()
+
+
+def _receive_webhook():
+    started = time.perf_counter()
     logger = get_current_app().logger
     logger.info("📨 收到来自 TradingView 的信号")
     
@@ -40,6 +55,7 @@ def receive_webhook():
         return jsonify({"status": "error", "message": "token 不匹配"}), 401
 
     # 解析必要字段
+    fingerprint = None
     try:
         action = payload.get("action", "").lower()
         sentiment = payload.get("sentiment", "").lower()
@@ -64,19 +80,32 @@ def receive_webhook():
             f"leverage: {leverage}x | position_ratio: {position_ratio*100}%"
         )
 
-        app = get_current_app()._get_current_object()
-        app_context = app.app_context()
+        # TradingView 重发的告警直接忽略，不产生任何交易所请求
+        # 指纹在信号被接收前先占位，并发到达的重发请求也会被拦下；没有被接收时删除，客户端可以重试
+        app = get_current_app()
+        fingerprint = signal_fingerprint(ticker, payload)
+        if app.signal_dedup.check(fingerprint):
+            logger.info(f"♻️ 重复信号，已忽略 | ticker: {ticker} | action: {action} | sentiment: {sentiment}")
+            return jsonify({"status": "success", "message": "重复信号，已忽略"})
 
-        # 在后台线程处理交易逻辑，避免阻塞 HTTP 响应
-        def background_task():
-            with app_context:
-                try:
-                    handle_contract_signal(ticker, action, sentiment, leverage, position_ratio)
-                except Exception as e:
-                    logger.error(f"❌ 后台任务执行失败: {e}", exc_info=True)
+        # 先写入信号日志（异步批量落盘），进程重启后可以恢复
+        journal = app.signal_journal
+        signal_id = journal.record_signal(ticker, action, sentiment, leverage, position_ratio)
+        current_signal_id.set(signal_id)
+        tracing.set_attribute("signal.id", signal_id)
+        tracing.set_attribute("symbol", ticker)
+        tracing.set_attribute("signal.action", f"{action}/{sentiment}")
 
-        thread = threading.Thread(target=background_task)
-        thread.start()
+        # 各阶段耗时随上下文传到执行信号的工作线程，信号结束时写入信号日志
+        start_timing().add(STAGE_PARSE, time.perf_counter() - started)
+
+        # 按标的合并窗口内的信号后交给信号执行引擎：同一标的按顺序执行，不同标的并行执行
+        accepted = app.signal_coalescer.submit(ticker, action, sentiment, leverage, position_ratio, signal_id)
+        if not accepted:
+            app.signal_dedup.forget(fingerprint)
+            journal.record(EVENT_FAILED, signal_id, ticker, {"error": "信号队列已满"})
+            logger.warning(f"⚠️ 信号队列已满，拒绝信号 | ticker: {ticker}")
+            return jsonify({"status": "error", "message": "信号队列已满，请稍后重试"}), 429
 
         return jsonify({
             "status": "success", 
@@ -91,10 +120,36 @@ def receive_webhook():
         })
 
     except Exception as e:
+        if fingerprint is not None:
+            get_current_app().signal_dedup.forget(fingerprint)
         logger.error(f"❌ 解析信号失败: {e}")
         return jsonify({"status": "error", "message": str(e)}), 400
 
 
+@webhook_bp.route("/webhook/stats", methods=["GET"])
+def webhook_stats():
+    """
+    查询信号执行引擎的队列深度与执行统计，以及去重、合并、服务端策略、背离扫描统计
+    """
+    app = get_current_app()
+    data = app.signal_executor.stats()
+    data["dedup"] = app.signal_dedup.stats()
+    data["coalesce"] = app.signal_coalescer.stats()
+    if app.kline_signals is not None:
+        data["strategy"] = app.kline_signals.stats()
+    if app.divergence_scanner is not None:
+        data["divergence"] = app.divergence_scanner.stats()
+    return jsonify({"status": "success", "data": data})
+
+
+@webhook_bp.route("/sizing/stats", methods=["GET"])
+def sizing_stats():
+    """
+    查询本地仓位计算与 open-count 接口的对比统计（shadow 模式）
+    """
+    return jsonify({"status": "success", "data": get_current_app().position_sizer.stats()})
+
+
 @webhook_bp.route("/test_estimate_max_purchase_quantity", methods=["POST"])
 def test_estimate_max_purchase_quantity():
     """
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Optional
+from config import Config
+from utils.async_bitget_client import AsyncBitgetClient
+
+
+class AccountCache:
+    """
+    账户余额快照缓存
+
+    - 快照在短 TTL 内直接复用，同一根 K 线收盘时的多个信号只请求一次账户接口
+    - single-flight：缓存过期时并发的调用方共享同一个进行中的请求
+    - 自己的订单提交或成交后调用 invalidate，保证下一次仓位计算使用最新余额
+    """
+
+    def __init__(
+        self,
+        client: AsyncBitgetClient,
+        logger: Optional[logging.Logger] = None,
+        ttl: float = Config.ACCOUNT_CACHE_TTL_MS / 1000,
+        product_type: str = "umcbl",
+    ):
+        self.client = client
+        self.logger = logger or logging.getLogger(__name__)
+        self.ttl = ttl
+        self.product_type = product_type
+
+        self._lock = threading.Lock()
+        # 每次失效递增，失效前发起的请求结果不会写入缓存，也不会被之后的调用方复用
+        self._generation = 0
+        self._snapshot: Any = None
+        self._fetched_at = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+        self._inflight_generation = -1
+
+    def invalidate(self):
+        """使缓存失效（线程安全）"""
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    async def get(self) -> Any:
+        """获取账户信息快照，返回值与 get_account_info 相同"""
+        with self._lock:
+            generation = self._generation
+            if self._snapshot is not None and time.monotonic() - self._fetched_at < self.ttl:
+                return self._snapshot
+
+            if self._inflight is None or self._inflight_generation != generation:
+                self._inflight = asyncio.ensure_future(self._fetch(generation))
+                self._inflight_generation = generation
+            inflight = self._inflight
+
+        # shield 避免某个调用方被取消时连带取消共享的请求
+        return await asyncio.shield(inflight)
+
+    async def _fetch(self, generation: int) -> Any:
+        try:
+            account_info = await self.client.get_account_info(self.product_type)
+        finally:
+            with self._lock:
+                if self._inflight_generation == generation:
+                    self._inflight = None
+
+        with self._lock:
+            if generation == self._generation:
+                self._snapshot = account_info
+                self._fetched_at = time.monotonic()
+        return account_info
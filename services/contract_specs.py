@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional
+from config import Config
+from utils.bitget_client import BitgetClient
+
+
+@dataclass(frozen=True)
+class ContractSpec:
+    """合约规格：价格最小变动、数量步长、最小下单数量、手续费率"""
+
+    symbol: str
+    price_tick: Decimal
+    size_step: Decimal
+    min_size: Decimal
+    maker_fee_rate: Decimal
+    taker_fee_rate: Decimal
+
+    @classmethod
+    def from_api(cls, item: Dict[str, Any]) -> "ContractSpec":
+        """从 /api/mix/v1/market/contracts 的返回项构建"""
+        price_place = int(item.get("pricePlace", 0))
+        price_end_step = Decimal(str(item.get("priceEndStep", "1")))
+        return cls(
+            symbol=item["symbol"],
+            # 价格精度为 pricePlace 位小数，末位步长为 priceEndStep
+            price_tick=price_end_step.scaleb(-price_place),
+            size_step=Decimal(str(item.get("sizeMultiplier") or "1")),
+            min_size=Decimal(str(item.get("minTradeNum") or "1")),
+            maker_fee_rate=Decimal(str(item.get("makerFeeRate") or "0")),
+            taker_fee_rate=Decimal(str(item.get("takerFeeRate") or "0")),
+        )
+
+    def round_size(self, quantity: Decimal) -> Decimal:
+        """数量按步长向下取整，避免超出可开数量"""
+        steps = (quantity / self.size_step).to_integral_value(rounding=ROUND_DOWN)
+        return (steps * self.size_step).quantize(self.size_step)
+
+    def round_price(self, price: Decimal) -> Decimal:
+        """价格按最小变动单位取整到最近的有效价格"""
+        ticks = (price / self.price_tick).to_integral_value(rounding=ROUND_HALF_UP)
+        return (ticks * self.price_tick).quantize(self.price_tick)
+
+
+class ContractSpecCache:
+    """
+    合约规格缓存
+
+    启动时从交易所合约列表接口全量加载，超过 TTL 后在下一次查询时整体刷新；
+    刷新失败时继续使用旧数据，下单的数量和价格都在本地按规格取整。
+    """
+
+    def __init__(
+        self,
+        client: BitgetClient,
+        logger: Optional[logging.Logger] = None,
+        ttl: float = Config.CONTRACT_SPEC_TTL,
+        product_type: str = "umcbl",
+    ):
+        self.client = client
+        self.logger = logger or logging.getLogger(__name__)
+        self.ttl = ttl
+        self.product_type = product_type
+
+        self._lock = threading.Lock()
+        self._specs: Dict[str, ContractSpec] = {}
+        self._loaded_at = 0.0
+
+    def load(self):
+        """从交易所加载全部合约规格"""
+        contracts = self.client.get_contracts(self.product_type)
+        specs = {}
+        for item in contracts or []:
+            try:
+                spec = ContractSpec.from_api(item)
+            except Exception as e:
+                self.logger.warning(f"⚠️ 解析合约规格失败 | {item.get('symbol')}: {e}")
+                continue
+            specs[spec.symbol] = spec
+
+        with self._lock:
+            self._specs = specs
+            self._loaded_at = time.monotonic()
+        self.logger.info(f"✅ 合约规格已加载 | {len(specs)} 个合约")
+
+    def get(self, symbol: str) -> Optional[ContractSpec]:
+        """获取合约规格，缓存过期时先刷新，没有该合约时返回 None"""
+        if time.monotonic() - self._loaded_at > self.ttl:
+            with self._lock:
+                expired = time.monotonic() - self._loaded_at > self.ttl
+                if expired:
+                    # 先更新时间，避免刷新失败时每次查询都重试
+                    self._loaded_at = time.monotonic()
+            if expired:
+                try:
+                    self.load()
+                except Exception as e:
+                    self.logger.warning(f"⚠️ 刷新合约规格失败，继续使用旧数据: {e}")
+        return self._specs.get(symbol)
+
+    def symbols(self) -> List[str]:
+        """已加载的全部合约符号"""
+        return sorted(self._specs)
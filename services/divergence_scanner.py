@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import httpx
+from config import Config
+from indicators.divergence import Divergence, DivergenceParams
+from services.kline_signals import fetch_closed_klines, interval_ms, is_stale, submit_signal
+from services.market_data import Kline
+from utils.event_loop import run_coroutine
+
+if TYPE_CHECKING:
+    from lib.MyFlask import MyFlask
+
+
+class DivergenceScanner:
+    """
+    多标的 Ultimate RSI 背离扫描
+
+    - 未指定标的时扫描全部 USDT 永续合约（合约规格缓存中的合约）
+    - 启动时并发拉取历史K线预热（受 REST 限流约束），之后订阅 websocket K线
+    - 每根K线收盘时每个标的只做一次 O(1) 的增量计算，几百个标的的耗时远小于一个K线周期
+    - 结果为 webhook 信号格式：配置了 webhook_url 时 POST 到该地址；否则 execute 为 True 时进入本地信号执行链路实盘下单，
+      默认只记录日志
+    - 看涨背离为 buy / long；看跌背离默认为 sell / flat（平掉当前持仓，对应告警中的止盈/减仓），bear_sentiment 为 short 时开空
+    """
+
+    def __init__(
+        self,
+        app: "MyFlask",
+        symbols: List[str] = Config.DIVERGENCE_SYMBOLS,
+        interval: str = Config.DIVERGENCE_INTERVAL,
+        params: DivergenceParams = DivergenceParams(lookback=Config.DIVERGENCE_LOOKBACK),
+        warmup_bars: int = Config.DIVERGENCE_WARMUP_BARS,
+        webhook_url: str = Config.DIVERGENCE_WEBHOOK_URL,
+        concurrency: int = Config.DIVERGENCE_WARMUP_CONCURRENCY,
+        execute: bool = Config.DIVERGENCE_EXECUTE,
+        bear_sentiment: str = Config.DIVERGENCE_BEAR_SENTIMENT,
+    ):
+        if bear_sentiment not in ("flat", "short"):
+            raise ValueError(f"无效的 DIVERGENCE_BEAR_SENTIMENT: {bear_sentiment}，必须是 'flat' 或 'short'")
+        self.app = app
+        self.logger: logging.Logger = app.logger
+        self.symbols = symbols
+        self.interval = interval
+        self.interval_ms = interval_ms(interval)
+        self.params = params
+        self.warmup_bars = warmup_bars
+        self.webhook_url = webhook_url
+        self.concurrency = concurrency
+        self.execute = execute
+        self.bear_sentiment = bear_sentiment
+        self._running = False
+
+        self._streams: Dict[str, Divergence] = {}
+        self._http: Optional[httpx.AsyncClient] = None
+        self._signals = 0
+        # 最近一根K线的扫描情况：开盘时间、已处理标的数、累计计算耗时、最后一个标的处理完时距收盘的延迟
+        self._bar_ts = 0
+        self._bar_symbols = 0
+        self._bar_compute = 0.0
+        self._bar_lag = 0.0
+
+    def start(self):
+        """预热并订阅全部标的，在后台线程中执行，不阻塞启动"""
+        self._running = True
+        threading.Thread(target=self._start, name="divergence-scanner", daemon=True).start()
+
+    def _start(self):
+        symbols = self.symbols or self.app.contract_specs.symbols()
+        self.app.market_data.start()
+        started = time.perf_counter()
+        histories = run_coroutine(self._warmup(symbols))
+        for symbol, klines in histories.items():
+            stream = Divergence(self.params)
+            for kline in klines:
+                stream.update(kline[2], kline[3], kline[4])
+            self._streams[symbol] = stream
+            last = klines[-1][0] if klines else 0
+            self.app.market_data.subscribe_klines(symbol, self.interval, self._on_kline, after=last)
+        self.logger.info(
+            f"✅ 背离扫描已启动 | 标的: {len(histories)}/{len(symbols)} | 周期: {self.interval} | "
+            f"预热耗时: {time.perf_counter() - started:.1f}s"
+        )
+
+    async def _warmup(self, symbols: List[str]) -> Dict[str, List[Kline]]:
+        """并发拉取历史K线，失败的标的跳过"""
+        client = self.app.bitget_client.async_client
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        store = self.app.kline_store
+
+        async def fetch(symbol: str):
+            async with semaphore:
+                if store is not None:
+                    return await store.warmup_klines(client, symbol, self.interval, self.warmup_bars)
+                return await fetch_closed_klines(client, symbol, self.interval, self.warmup_bars)
+
+        results = await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+        histories = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                self.logger.warning(f"⚠️ 背离扫描预热失败，跳过 | {symbol} | {result}")
+            else:
+                histories[symbol] = result
+        return histories
+
+    def _on_kline(self, symbol: str, kline: Kline):
+        stream = self._streams.get(symbol)
+        if stream is None:
+            return
+        started = time.perf_counter()
+        bull, bear = stream.update(kline[2], kline[3], kline[4])
+        elapsed = time.perf_counter() - started
+
+        if kline[0] != self._bar_ts:
+            self._bar_ts, self._bar_symbols, self._bar_compute = kline[0], 0, 0.0
+        self._bar_symbols += 1
+        self._bar_compute += elapsed
+        self._bar_lag = time.time() - (kline[0] + self.interval_ms) / 1000
+
+        if not (bull or bear) or is_stale(kline, self.interval_ms):
+            return
+        if bull:
+            self._publish(symbol, "buy", "long", f"{symbol} 出现 RSI 看涨背离, 可考虑低吸，参考价格:{kline[4]}")
+        if bear:
+            self._publish(symbol, "sell", self.bear_sentiment, f"{symbol} 出现 RSI 看跌背离, 可考虑止盈/减仓，参考价格:{kline[4]}")
+
+    def build_payload(self, symbol: str, action: str, sentiment: str, desc: str) -> Dict[str, Any]:
+        """webhook 信号格式（与 TradingView 告警的 JSON 相同，多出的 desc 字段会被忽略）"""
+        return {
+            "token": Config.WEBHOOK_EXPECTED_TOKEN,
+            "ticker": symbol,
+            "action": action,
+            "sentiment": sentiment,
+            "leverage": Config.DEFAULT_LEVERAGE,
+            "position_ratio": Config.DEFAULT_POSITION_RATIO,
+            "desc": desc,
+        }
+
+    def _publish(self, symbol: str, action: str, sentiment: str, desc: str):
+        self.logger.info(f"📡 {desc}")
+        self._signals += 1
+        if self.webhook_url:
+            # K线回调在事件循环线程中执行，发送不阻塞其他标的的计算
+            asyncio.ensure_future(self._post(self.build_payload(symbol, action, sentiment, desc)))
+        elif self.execute:
+            submit_signal(self.app, symbol, action, sentiment)
+
+    async def _post(self, payload: Dict[str, Any]):
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=Config.BITGET_READ_TIMEOUT)
+        try:
+            response = await self._http.post(self.webhook_url, json=payload)
+            response.raise_for_status()
+        except Exception as e:
+            self.logger.error(f"❌ 背离信号推送失败 | {payload['ticker']} | {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            # 多个 worker 时只有主进程在运行，其他进程为 False
+            "running": self._running,
+            "mode": "webhook" if self.webhook_url else "execute" if self.execute else "log",
+            "symbols": len(self._streams),
+            "interval": self.interval,
+            "signals": self._signals,
+            "last_bar": {
+                "ts": self._bar_ts,
+                "symbols": self._bar_symbols,
+                "compute_ms": round(self._bar_compute * 1000, 3),
+                "lag_ms": round(self._bar_lag * 1000, 1),
+            },
+        }
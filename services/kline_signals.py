@@ -0,0 +1,253 @@
+import copy
+import json
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from config import Config
+from utils.async_bitget_client import AsyncBitgetClient
+from utils.event_loop import run_coroutine
+from backtest.supertrend_vsa import StrategyState, SupertrendVSAParams
+from indicators.streaming import NAN, Atr, Sma, Supertrend, isnan
+from services.market_data import Kline
+from services.signal_journal import EVENT_FAILED
+
+if TYPE_CHECKING:
+    from lib.MyFlask import MyFlask
+
+
+# K线周期单位 -> 毫秒
+INTERVAL_UNITS = {"m": 60_000, "H": 3_600_000, "D": 86_400_000, "W": 604_800_000}
+# 单次 REST 请求最多返回的K线数
+CANDLES_PAGE_LIMIT = 1000
+
+# (action, sentiment)，与 TradingView 策略告警中的 {{strategy.order.action}} / {{strategy.market_position}} 相同
+Signal = Tuple[str, str]
+
+
+def interval_ms(interval: str) -> int:
+    """K线周期转换为毫秒，如 "5m" -> 300000"""
+    return int(interval[:-1]) * INTERVAL_UNITS[interval[-1]]
+
+
+async def fetch_closed_klines(client: AsyncBitgetClient, symbol: str, interval: str, count: int) -> List[Kline]:
+    """分页拉取最近 count 根已收盘K线（按时间升序，不含当前未收盘的K线）"""
+    step = interval_ms(interval)
+    # 当前未收盘K线的开盘时间
+    current = int(time.time() * 1000) // step * step
+    klines: Dict[int, Kline] = {}
+    end = current - 1
+    for _ in range(math.ceil(count / CANDLES_PAGE_LIMIT)):
+        start = end - CANDLES_PAGE_LIMIT * step
+        rows = await client.get_candles(symbol, interval, start, end, CANDLES_PAGE_LIMIT)
+        if not rows:
+            break
+        for r in rows:
+            ts = int(r[0])
+            if ts < current:
+                klines[ts] = (ts, float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5]))
+        end = min(int(r[0]) for r in rows) - 1
+    return [klines[ts] for ts in sorted(klines)[-count:]]
+
+
+def is_stale(kline: Kline, step: int) -> bool:
+    """K线收盘已超过一个周期（断线重连后补发的K线），只更新指标，不再发出信号"""
+    return time.time() * 1000 - (kline[0] + step) > step
+
+
+def submit_signal(app: "MyFlask", symbol: str, action: str, sentiment: str) -> bool:
+    """把服务端生成的信号交给信号执行引擎（与 webhook 相同的链路：信号日志 -> 按标的合并 -> 执行）"""
+    leverage, position_ratio = Config.DEFAULT_LEVERAGE, Config.DEFAULT_POSITION_RATIO
+    signal_id = app.signal_journal.record_signal(symbol, action, sentiment, leverage, position_ratio)
+    if not app.signal_coalescer.submit(symbol, action, sentiment, leverage, position_ratio, signal_id):
+        app.signal_journal.record(EVENT_FAILED, signal_id, symbol, {"error": "信号队列已满"})
+        app.logger.warning(f"⚠️ 信号队列已满，丢弃服务端信号 | {symbol}")
+        return False
+    return True
+
+
+class SupertrendVSAStream:
+    """
+    Supertrend + VSA 策略的实时版本，每根已收盘K线调用一次 update
+
+    指标全部增量计算，开平仓规则与回测共用 StrategyState，同一段K线产生的信号与 backtest 完全一致。
+    信号没有实际提交（已过期、队列已满）时调用 rollback 撤销持仓状态的变化，策略状态与交易所保持一致。
+    """
+
+    def __init__(self, params: SupertrendVSAParams = SupertrendVSAParams()):
+        self.params = params
+        self.state = StrategyState(params)
+        self._supertrend = Supertrend(params.st_factor, params.st_atr_period)
+        self._atr = Atr(params.atr_period)
+        self._vol_ma = Sma(params.vol_ma_len)
+        self._exchange_tz = ZoneInfo(params.exchange_tz)
+        self._session_tz = ZoneInfo(params.session_tz)
+        self._prev_direction = 0
+        self._prev_close = NAN
+        self._prev_day = None
+        # 最近一次产生信号前的策略状态，以及那根K线是否是新的一天
+        self._undo: Optional[Tuple[StrategyState, bool]] = None
+
+    def update(self, kline: Kline) -> Optional[Signal]:
+        """
+        处理一根已收盘K线
+
+        Returns:
+            Optional[Signal]: 本根K线收盘时要执行的 (action, sentiment)，无信号返回 None
+        """
+        ts, open_, high, low, close, volume = kline
+        params = self.params
+
+        # 日期切换与强平时间（按K线开盘时间，与 TradingView 的 time 相同）
+        local = datetime.fromtimestamp(ts / 1000, self._exchange_tz)
+        day = (local.year, local.month, local.day)
+        new_day = day != self._prev_day
+        self._prev_day = day
+        session = datetime.fromtimestamp(ts / 1000, self._session_tz)
+        after_close = (session.hour, session.minute) >= (params.close_hour, params.close_minute)
+
+        # 跳空过滤
+        skip_gap = False
+        if params.skip_gap_open and new_day and not isnan(self._prev_close):
+            skip_gap = abs(open_ - self._prev_close) / self._prev_close * 100 > params.gap_threshold
+        self._prev_close = close
+
+        # Supertrend 方向翻转
+        _, direction = self._supertrend.update(high, low, close)
+        long_signal = self._prev_direction > 0 and direction < 0
+        short_signal = self._prev_direction < 0 and direction > 0
+        self._prev_direction = direction
+
+        # VSA 量价过滤
+        vol_ma = self._vol_ma.update(volume)
+        long_vol_ok = short_vol_ok = True
+        if params.use_vsa_filter:
+            hl_range = high - low
+            is_strong_body = abs(close - open_) / (hl_range or 1.0) > params.body_ratio_thr
+            strong = is_strong_body and volume > vol_ma * params.vol_mult
+            long_vol_ok = strong and close > open_
+            short_vol_ok = strong and close < open_
+
+        atr_value = self._atr.update(high, low, close)
+        position = self.state.position
+        snapshot = copy.copy(self.state)
+        entry, comment = self.state.on_bar(
+            close, high, low, atr_value, long_signal, short_signal,
+            long_signal and long_vol_ok, short_signal and short_vol_ok,
+            new_day, after_close, after_close or skip_gap,
+        )
+
+        signal: Optional[Signal] = None
+        if comment is not None:
+            signal = ("sell", "flat") if position > 0 else ("buy", "flat")
+        elif entry > 0:
+            signal = ("buy", "long")
+        elif entry < 0:
+            signal = ("sell", "short")
+        self._undo = (snapshot, new_day) if signal is not None else None
+        return signal
+
+    def rollback(self):
+        """撤销最近一次 update 产生的开平仓（持仓方向、止损止盈、当日开仓次数），指标不受影响"""
+        if self._undo is None:
+            return
+        snapshot, new_day = self._undo
+        if new_day:
+            # 日期切换已经发生，当日开仓次数仍然要清零
+            snapshot.trades_today = 0
+        self.state = snapshot
+        self._undo = None
+
+
+class KlineSignalEngine:
+    """
+    服务端信号生成：订阅交易所K线，本地计算策略信号后直接交给信号执行引擎，不再经过 TradingView
+
+    - 启动时先通过 REST 拉取历史K线预热指标（不含未收盘的K线），再订阅 websocket K线
+    - 信号与 webhook 信号走同一条链路：写入信号日志 -> 按标的合并 -> 信号执行引擎
+    - 断线重连后补发的K线只更新指标，收盘超过一个周期的K线不再发出信号
+    """
+
+    def __init__(
+        self,
+        app: "MyFlask",
+        symbols: List[str] = Config.STRATEGY_SYMBOLS,
+        interval: str = Config.STRATEGY_INTERVAL,
+        params: Optional[SupertrendVSAParams] = None,
+        warmup_bars: int = Config.STRATEGY_WARMUP_BARS,
+    ):
+        self.app = app
+        self.logger: logging.Logger = app.logger
+        self.symbols = symbols
+        self.interval = interval
+        self.interval_ms = interval_ms(interval)
+        self.params = params or SupertrendVSAParams(**json.loads(Config.STRATEGY_PARAMS or "{}"))
+        self.warmup_bars = warmup_bars
+        self._streams: Dict[str, SupertrendVSAStream] = {}
+        self._emitted = 0
+        self._running = False
+
+    def start(self):
+        """预热并订阅全部标的，在后台线程中执行，不阻塞启动"""
+        self._running = True
+        threading.Thread(target=self._start, name="kline-signals", daemon=True).start()
+
+    def _start(self):
+        self.app.market_data.start()
+        for symbol in self.symbols:
+            try:
+                self.add_symbol(symbol)
+            except Exception as e:
+                self.logger.error(f"❌ 策略预热失败 | {symbol} | {e}")
+
+    def add_symbol(self, symbol: str):
+        """预热指标后订阅标的的K线"""
+        stream = SupertrendVSAStream(self.params)
+        klines = self._fetch_history(symbol)
+        for kline in klines:
+            stream.update(kline)
+        self._streams[symbol] = stream
+        last = klines[-1][0] if klines else 0
+        self.app.market_data.subscribe_klines(symbol, self.interval, self._on_kline, after=last)
+        self.logger.info(
+            f"✅ 策略已启动 | {symbol} | 周期: {self.interval} | 预热K线: {len(klines)} 根 | "
+            f"当前持仓方向: {stream.state.position}"
+        )
+
+    def _fetch_history(self, symbol: str) -> List[Kline]:
+        client = self.app.bitget_client.async_client
+        if self.app.kline_store is not None:
+            return run_coroutine(self.app.kline_store.warmup_klines(client, symbol, self.interval, self.warmup_bars))
+        return run_coroutine(fetch_closed_klines(client, symbol, self.interval, self.warmup_bars))
+
+    def _on_kline(self, symbol: str, kline: Kline):
+        stream = self._streams.get(symbol)
+        if stream is None:
+            return
+        signal = stream.update(kline)
+        if signal is None:
+            return
+
+        action, sentiment = signal
+        if is_stale(kline, self.interval_ms):
+            self.logger.warning(f"⚠️ 策略信号已过期，忽略 | {symbol} | {action} {sentiment} | K线: {kline[0]}")
+            stream.rollback()
+            return
+        self.logger.info(f"📡 策略信号 | {symbol} | action: {action} | sentiment: {sentiment}")
+        if submit_signal(self.app, symbol, action, sentiment):
+            self._emitted += 1
+        else:
+            # 信号没有进入执行引擎，交易所不会开平仓
+            stream.rollback()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            # 多个 worker 时只有主进程在运行，其他进程为 False
+            "running": self._running,
+            "symbols": {symbol: stream.state.position for symbol, stream in self._streams.items()},
+            "interval": self.interval,
+            "emitted": self._emitted,
+        }
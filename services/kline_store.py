@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from config import Config
+from backtest.data import Bars
+from services.kline_signals import CANDLES_PAGE_LIMIT, interval_ms
+from services.market_data import Kline
+from utils.async_bitget_client import AsyncBitgetClient
+
+
+# 列名 -> 磁盘格式（小端定宽），time 为K线开盘时间（UTC 纳秒时间戳，与 backtest.data.Bars 相同）
+COLUMNS = (
+    ("time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+)
+ROW_BYTES = 8
+NS_PER_MS = 1_000_000
+
+# 缺失的K线区间：(第一根缺失K线开盘时间, 最后一根缺失K线开盘时间)，毫秒，闭区间
+Gap = Tuple[int, int]
+
+
+class KlineStore:
+    """
+    本地K线库：每个 标的/周期 一个目录，每列一个定宽二进制文件（root/BTCUSDT_UMCBL/5m/close.f8）
+
+    - 只追加：新K线晚于已有最后一根时直接追加到各列文件末尾；补历史或补缺口时重写到新目录后整体替换，
+      已经打开的 memmap 仍然指向旧文件，读取不受影响
+    - 读取用 numpy.memmap，返回的 Bars 各列是文件的只读视图，不复制数据，可直接交给回测和批量指标计算
+    - 写入顺序为先写数据列、最后写 time 列，行数以 time 列为准；进程中途退出时多写的行在下次写入前截掉
+    """
+
+    def __init__(self, root: str = Config.KLINE_STORE_DIR, logger: Optional[logging.Logger] = None):
+        self.root = root
+        self.logger = logger or logging.getLogger(__name__)
+        self._locks: Dict[Tuple[str, str], threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol, interval)
+
+    def _column_path(self, directory: str, name: str, dtype: str) -> str:
+        return os.path.join(directory, f"{name}.{dtype[1:]}")
+
+    def _lock(self, symbol: str, interval: str) -> threading.RLock:
+        """同一个 标的/周期 的写入与目录替换互斥"""
+        with self._locks_guard:
+            return self._locks.setdefault((symbol, interval), threading.RLock())
+
+    def _recover(self, directory: str):
+        """上次重写在替换目录的中途退出：恢复旧目录"""
+        if not os.path.isdir(directory) and os.path.isdir(directory + ".old"):
+            os.replace(directory + ".old", directory)
+
+    def count(self, symbol: str, interval: str) -> int:
+        """已保存的K线数"""
+        directory = self.path(symbol, interval)
+        with self._lock(symbol, interval):
+            self._recover(directory)
+            try:
+                return os.path.getsize(self._column_path(directory, *COLUMNS[0])) // ROW_BYTES
+            except FileNotFoundError:
+                return 0
+
+    # ==================== 读取 ====================
+
+    def read(self, symbol: str, interval: str, start: Optional[int] = None, end: Optional[int] = None) -> Bars:
+        """
+        读取K线（零拷贝，各列为只读 np.memmap 的切片）
+
+        Args:
+            start / end: 开盘时间范围（毫秒时间戳，闭区间），不传则不限制
+        """
+        directory = self.path(symbol, interval)
+        with self._lock(symbol, interval):
+            n = self.count(symbol, interval)
+            if n == 0:
+                return Bars(**{name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS})
+            columns = {
+                name: np.memmap(self._column_path(directory, name, dtype), dtype=dtype, mode="r", shape=(n,))
+                for name, dtype in COLUMNS
+            }
+        times = columns["time"]
+        lo = 0 if start is None else int(np.searchsorted(times, start * NS_PER_MS, side="left"))
+        hi = n if end is None else int(np.searchsorted(times, end * NS_PER_MS, side="right"))
+        return Bars(**{name: column[lo:hi] for name, column in columns.items()})
+
+    def klines(self, symbol: str, interval: str, count: int) -> List[Kline]:
+        """最近 count 根K线（按时间升序），格式与 websocket K线回调相同，用于预热增量指标"""
+        bars = self.read(symbol, interval)
+        lo = max(0, len(bars) - count)
+        return [
+            (int(t) // NS_PER_MS, float(o), float(h), float(l), float(c), float(v))
+            for t, o, h, l, c, v in zip(
+                bars.time[lo:], bars.open[lo:], bars.high[lo:], bars.low[lo:], bars.close[lo:], bars.volume[lo:]
+            )
+        ]
+
+    def gaps(self, symbol: str, interval: str, start: Optional[int] = None, end: Optional[int] = None) -> List[Gap]:
+        """
+        缺失的K线区间（毫秒，闭区间）
+
+        Args:
+            start / end: 检查范围（毫秒时间戳），传入时范围内、已有数据之前/之后的部分也算缺失
+        """
+        step = interval_ms(interval)
+        times = self.read(symbol, interval, start, end).time
+        if start is not None:
+            start = -(-start // step) * step
+        if end is not None:
+            end = end // step * step
+        if len(times) == 0:
+            return [(start, end)] if start is not None and end is not None and start <= end else []
+
+        gaps: List[Gap] = []
+        first, last = int(times[0]) // NS_PER_MS, int(times[-1]) // NS_PER_MS
+        if start is not None and start < first:
+            gaps.append((start, first - step))
+        breaks = np.flatnonzero(np.diff(times) != step * NS_PER_MS)
+        for i in breaks:
+            gaps.append((int(times[i]) // NS_PER_MS + step, int(times[i + 1]) // NS_PER_MS - step))
+        if end is not None and end > last:
+            gaps.append((last + step, end))
+        return gaps
+
+    # ==================== 写入 ====================
+
+    def append(self, symbol: str, interval: str, klines: Iterable[Kline]) -> int:
+        """
+        写入K线，已存在的开盘时间忽略
+
+        Returns:
+            int: 新增的K线数
+        """
+        rows = {}
+        for kline in klines:
+            rows.setdefault(kline[0], kline)
+        if not rows:
+            return 0
+        new = np.array([rows[ts] for ts in sorted(rows)], dtype=np.float64)
+        new_time = np.array(sorted(rows), dtype=np.int64) * NS_PER_MS
+
+        with self._lock(symbol, interval):
+            directory = self.path(symbol, interval)
+            current = self.read(symbol, interval)
+            if len(current) and new_time[0] <= current.time[-1]:
+                return self._merge(directory, current, new_time, new)
+            self._append(directory, len(current), new_time, new)
+            return len(new_time)
+
+    def _append(self, directory: str, n: int, new_time: np.ndarray, new: np.ndarray):
+        os.makedirs(directory, exist_ok=True)
+        for i, (name, dtype) in enumerate(COLUMNS[1:], start=1):
+            with open(self._column_path(directory, name, dtype), "ab") as f:
+                # 截掉上次中途退出时多写的行
+                f.truncate(n * ROW_BYTES)
+                f.write(np.ascontiguousarray(new[:, i], dtype=dtype).tobytes())
+        with open(self._column_path(directory, *COLUMNS[0]), "ab") as f:
+            # time 列也可能留下写了一半的行，不截掉的话之后追加的时间戳全部错位
+            f.truncate(n * ROW_BYTES)
+            f.write(new_time.astype(COLUMNS[0][1]).tobytes())
+
+    def _merge(self, directory: str, current: Bars, new_time: np.ndarray, new: np.ndarray) -> int:
+        """新K线插入到已有数据之间（补历史、补缺口）：合并后写入新目录再整体替换"""
+        keep = ~np.isin(new_time, current.time)
+        if not keep.any():
+            return 0
+        new_time, new = new_time[keep], new[keep]
+        times = np.concatenate((current.time, new_time))
+        order = np.argsort(times, kind="stable")
+
+        staging = directory + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for i, (name, dtype) in enumerate(COLUMNS):
+            values = times if i == 0 else np.concatenate((getattr(current, name), new[:, i]))
+            values[order].astype(dtype).tofile(self._column_path(staging, name, dtype))
+
+        shutil.rmtree(directory + ".old", ignore_errors=True)
+        os.replace(directory, directory + ".old")
+        os.replace(staging, directory)
+        shutil.rmtree(directory + ".old", ignore_errors=True)
+        return int(keep.sum())
+
+    # ==================== 回补 ====================
+
+    async def backfill(
+        self,
+        client: AsyncBitgetClient,
+        symbol: str,
+        interval: str,
+        start: int,
+        end: Optional[int] = None,
+        concurrency: int = Config.KLINE_BACKFILL_CONCURRENCY,
+    ) -> int:
+        """
+        从 REST K线接口补齐 [start, end] 内缺失的K线（毫秒时间戳），缺口按每页 CANDLES_PAGE_LIMIT 根切分后并发下载
+
+        Args:
+            end: 不传则补到最近一根已收盘K线（不含当前未收盘的K线）
+            concurrency: 同时进行的请求数（另受客户端限流约束）
+
+        Returns:
+            int: 新增的K线数（交易所本身缺失的K线，如上线之前、停盘期间，补不回来）
+        """
+        step = interval_ms(interval)
+        current = int(time.time() * 1000) // step * step
+        end = current - step if end is None else min(end, current - step)
+
+        pages = []
+        for gap_start, gap_end in self.gaps(symbol, interval, start, end):
+            for page_start in range(gap_start, gap_end + 1, CANDLES_PAGE_LIMIT * step):
+                pages.append((page_start, min(gap_end, page_start + (CANDLES_PAGE_LIMIT - 1) * step)))
+        if not pages:
+            return 0
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(page_start: int, page_end: int) -> List[Kline]:
+            async with semaphore:
+                rows = await client.get_candles(symbol, interval, page_start, page_end, CANDLES_PAGE_LIMIT)
+            return [
+                (int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5]))
+                for r in rows or []
+                if page_start <= int(r[0]) <= page_end
+            ]
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(fetch(*page) for page in pages))
+        # 写盘放到线程池，不阻塞事件循环
+        added = await asyncio.to_thread(self.append, symbol, interval, [k for rows in results for k in rows])
+        self.logger.info(
+            f"📥 K线回补完成 | {symbol} | {interval} | 请求: {len(pages)} 页 | 新增: {added} 根 | "
+            f"耗时: {time.perf_counter() - started:.2f}s"
+        )
+        return added
+
+    async def warmup_klines(self, client: AsyncBitgetClient, symbol: str, interval: str, count: int) -> List[Kline]:
+        """补齐最近 count 根已收盘K线后从本地读取，重启时只需下载上次退出之后的K线"""
+        step = interval_ms(interval)
+        current = int(time.time() * 1000) // step * step
+        await self.backfill(client, symbol, interval, current - count * step)
+        return await asyncio.to_thread(self.klines, symbol, interval, count)
@@ -0,0 +1,97 @@
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from utils.async_bitget_client import AsyncBitgetClient
+
+
+# Bitget v1 保证金模式：fixed 为逐仓，crossed 为全仓
+MARGIN_MODE_FIXED = "fixed"
+MARGIN_MODE_CROSSED = "crossed"
+
+
+class LeverageCache:
+    """
+    杠杆与保证金模式状态缓存，按 (symbol, marginCoin) 维护
+
+    首次使用时从单币种账户接口加载，持仓接口返回的数据也会写入缓存，
+    设置成功后同步更新；只有目标杠杆与当前杠杆不同时才调用 setLeverage。
+    """
+
+    def __init__(self, client: AsyncBitgetClient, logger: Optional[logging.Logger] = None):
+        self.client = client
+        self.logger = logger or logging.getLogger(__name__)
+        # (symbol, marginCoin) -> {"marginMode": ..., "long": ..., "short": ..., "crossed": ...}
+        self._states: Dict[Tuple[str, str], Dict[str, Optional[Decimal]]] = {}
+
+    @staticmethod
+    def _to_decimal(value: Any) -> Optional[Decimal]:
+        return None if value in (None, "") else Decimal(str(value))
+
+    def get(self, symbol: str, margin_coin: str = "USDT") -> Optional[Dict[str, Any]]:
+        """获取缓存的杠杆状态，未缓存时返回 None"""
+        return self._states.get((symbol, margin_coin))
+
+    def invalidate(self, symbol: str, margin_coin: str = "USDT"):
+        """清除缓存，下次使用时重新从交易所加载"""
+        self._states.pop((symbol, margin_coin), None)
+
+    def update_from_positions(self, positions: List[Dict[str, Any]]):
+        """用持仓接口返回的数据更新缓存（每个持仓带有 leverage、holdSide、marginMode）"""
+        for pos in positions or []:
+            symbol, hold_side = pos.get("symbol"), pos.get("holdSide")
+            if not symbol or hold_side not in ("long", "short") or pos.get("leverage") is None:
+                continue
+            state = self._states.setdefault((symbol, pos.get("marginCoin") or "USDT"), {})
+            if pos.get("marginMode"):
+                state["marginMode"] = pos["marginMode"]
+            leverage = self._to_decimal(pos["leverage"])
+            if state.get("marginMode") == MARGIN_MODE_CROSSED:
+                state["crossed"] = leverage
+            else:
+                state[hold_side] = leverage
+
+    async def load(self, symbol: str, margin_coin: str = "USDT") -> Dict[str, Any]:
+        """从单币种账户接口加载杠杆与保证金模式"""
+        account = await self.client.get_single_account(symbol, margin_coin)
+        state = {
+            "marginMode": account.get("marginMode"),
+            "long": self._to_decimal(account.get("fixedLongLeverage")),
+            "short": self._to_decimal(account.get("fixedShortLeverage")),
+            "crossed": self._to_decimal(account.get("crossMarginLeverage")),
+        }
+        self._states[(symbol, margin_coin)] = state
+        return state
+
+    async def ensure(self, symbol: str, leverage: str, hold_side: str, margin_coin: str = "USDT") -> bool:
+        """
+        确保该方向的杠杆为目标值，已是目标值时不请求交易所
+
+        Args:
+            symbol: 合约交易对符号
+            leverage: 目标杠杆倍数
+            hold_side: 持仓方向 "long" 或 "short"（全仓模式下忽略）
+            margin_coin: 保证金币种
+
+        Returns:
+            bool: True 表示调用了 setLeverage，False 表示已是目标杠杆
+        """
+        state = self.get(symbol, margin_coin)
+        if state is None:
+            state = await self.load(symbol, margin_coin)
+
+        crossed = state.get("marginMode") == MARGIN_MODE_CROSSED
+        key = "crossed" if crossed else hold_side
+        target = Decimal(str(leverage))
+        if state.get(key) == target:
+            return False
+
+        try:
+            await self.client.set_leverage(symbol, leverage, margin_coin, hold_side=None if crossed else hold_side)
+        except Exception:
+            # 状态未知，下次重新加载
+            self.invalidate(symbol, margin_coin)
+            raise
+
+        state[key] = target
+        self.logger.info(f"✅ 杠杆已更新 | {symbol} | {hold_side} | {leverage}x")
+        return True
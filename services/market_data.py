@@ -0,0 +1,321 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import zlib
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import websockets
+from config import Config
+from utils.event_loop import get_event_loop
+
+
+# Bitget 校验和只计算前 25 档
+CHECKSUM_DEPTH = 25
+# 每条订阅消息最多包含的频道数（Bitget 限制每个连接每秒发送的消息数，多个频道合并成一条消息发送）
+SUBSCRIBE_BATCH = 50
+
+# 已收盘K线：(开盘时间毫秒, 开, 高, 低, 收, 成交量)
+Kline = Tuple[int, float, float, float, float, float]
+KlineCallback = Callable[[str, Kline], None]
+
+
+def to_inst_id(symbol: str) -> str:
+    """REST 合约符号转换为 websocket instId，如 BTCUSDT_UMCBL -> BTCUSDT"""
+    return symbol.upper().split("_")[0]
+
+
+class OrderBook:
+    """单个标的的本地订单簿，维护全量档位并校验 checksum"""
+
+    def __init__(self):
+        # 价格 -> (价格原始字符串, 数量原始字符串)，原始字符串用于计算 checksum
+        self.bids: Dict[Decimal, Tuple[str, str]] = {}
+        self.asks: Dict[Decimal, Tuple[str, str]] = {}
+        self.ts = 0
+        self.seq: Optional[int] = None
+
+    def apply(self, levels: List[List[str]], book: Dict[Decimal, Tuple[str, str]]):
+        for level in levels:
+            price_str, size_str = level[0], level[1]
+            price = Decimal(price_str)
+            if Decimal(size_str) == 0:
+                book.pop(price, None)
+            else:
+                book[price] = (price_str, size_str)
+
+    def snapshot(self, data: Dict[str, Any]):
+        self.bids.clear()
+        self.asks.clear()
+        self.update(data)
+
+    def update(self, data: Dict[str, Any]):
+        self.apply(data.get("bids", []), self.bids)
+        self.apply(data.get("asks", []), self.asks)
+        self.ts = int(data.get("ts", 0))
+        if data.get("seq") is not None:
+            self.seq = int(data["seq"])
+
+    def top(self, depth: int) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """前 depth 档买卖盘（买盘价格从高到低，卖盘价格从低到高）"""
+        bids = [self.bids[p] for p in sorted(self.bids, reverse=True)[:depth]]
+        asks = [self.asks[p] for p in sorted(self.asks)[:depth]]
+        return bids, asks
+
+    def checksum(self) -> int:
+        """按 Bitget 规则计算 crc32 校验和：买卖盘交替拼接 price:size，结果为有符号 32 位整数"""
+        bids, asks = self.top(CHECKSUM_DEPTH)
+        parts = []
+        for i in range(CHECKSUM_DEPTH):
+            if i < len(bids):
+                parts.extend(bids[i])
+            if i < len(asks):
+                parts.extend(asks[i])
+        crc = zlib.crc32(":".join(parts).encode())
+        return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+
+class MarketDataFeed:
+    """
+    行情订阅：通过 Bitget 公共 websocket 订阅订单簿，在内存中维护每个标的的买一/卖一
+
+    - 每条增量推送都校验 checksum 与序号/时间戳，不一致时重新订阅获取快照
+    - get_bbo 只做一次字典查询，不产生网络请求；数据过期时返回 None，由调用方回退 REST
+    - 订阅K线时只回调已收盘的K线：收到更新的开盘时间时，上一根即已收盘
+    """
+
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        url: str = Config.BITGET_WS_PUBLIC_URL,
+        stale_after: float = Config.MARKET_DATA_STALE_MS / 1000,
+    ):
+        self.logger = logger or logging.getLogger(__name__)
+        self.url = url
+        self.stale_after = stale_after
+
+        self._lock = threading.Lock()
+        self._symbols: Dict[str, str] = {}  # instId -> 合约符号
+        self._books: Dict[str, OrderBook] = {}
+        # 合约符号 -> (买一价, 卖一价, 更新时间)
+        self._bbo: Dict[str, Tuple[Decimal, Decimal, float]] = {}
+        # (instId, 频道) -> K线订阅
+        self._klines: Dict[Tuple[str, str], "_KlineSubscription"] = {}
+        # 等待发送的K线订阅，同一轮事件循环中的订阅合并成一条消息
+        self._pending_klines: List[Tuple[str, str]] = []
+        self._ws = None
+        self._task: Optional[asyncio.Future] = None
+
+    def start(self):
+        """在共享事件循环中启动订阅任务"""
+        if self._task is None:
+            self._task = asyncio.run_coroutine_threadsafe(self._run(), get_event_loop())
+
+    def subscribe(self, symbol: str):
+        """订阅标的（线程安全，可重复调用）"""
+        inst_id = to_inst_id(symbol)
+        with self._lock:
+            if inst_id in self._symbols:
+                return
+            self._symbols[inst_id] = symbol
+        get_event_loop().call_soon_threadsafe(
+            lambda: asyncio.ensure_future(self._send_subscribe("subscribe", [inst_id]))
+        )
+
+    def subscribe_klines(self, symbol: str, interval: str, callback: KlineCallback, after: int = 0):
+        """
+        订阅K线，每根K线收盘后在事件循环线程中调用 callback(symbol, kline)
+
+        Args:
+            interval: K线周期，如 "1m", "5m", "1H"
+            after: 只回调开盘时间晚于该时间（毫秒）的K线，用于衔接 REST 预热的历史K线
+        """
+        inst_id = to_inst_id(symbol)
+        channel = f"candle{interval}"
+        with self._lock:
+            subscription = self._klines.get((inst_id, channel))
+            if subscription is not None:
+                subscription.callbacks.append(callback)
+                return
+            subscription = self._klines[(inst_id, channel)] = _KlineSubscription(symbol, after)
+            subscription.callbacks.append(callback)
+            self._pending_klines.append((inst_id, channel))
+            if len(self._pending_klines) > 1:
+                # 已经安排了发送
+                return
+        get_event_loop().call_soon_threadsafe(lambda: asyncio.ensure_future(self._flush_klines()))
+
+    async def _flush_klines(self):
+        with self._lock:
+            pending, self._pending_klines = self._pending_klines, []
+        await self._subscribe_klines(pending)
+
+    async def _subscribe_klines(self, keys: List[Tuple[str, str]]):
+        channels: Dict[str, List[str]] = {}
+        for inst_id, channel in keys:
+            channels.setdefault(channel, []).append(inst_id)
+        for channel, inst_ids in channels.items():
+            await self._send_subscribe("subscribe", inst_ids, channel)
+
+    def get_bbo(self, symbol: str) -> Optional[Tuple[Decimal, Decimal]]:
+        """
+        获取买一/卖一价，数据过期或未订阅时返回 None
+
+        首次查询会自动订阅该标的，之后的查询即可命中本地缓存。
+        """
+        bbo = self._bbo.get(symbol)
+        if bbo is None or time.monotonic() - bbo[2] > self.stale_after:
+            if self._task is not None:
+                self.subscribe(symbol)
+            return None
+        return bbo[0], bbo[1]
+
+    async def _send_subscribe(self, op: str, inst_ids: List[str], channel: str = "books"):
+        if self._ws is None or not inst_ids:
+            # 尚未连接，连接建立后会统一订阅
+            return
+        for i in range(0, len(inst_ids), SUBSCRIBE_BATCH):
+            await self._ws.send(json.dumps({
+                "op": op,
+                "args": [
+                    {"instType": "mc", "channel": channel, "instId": inst_id}
+                    for inst_id in inst_ids[i:i + SUBSCRIBE_BATCH]
+                ],
+            }))
+
+    async def _resync(self, inst_id: str, reason: str):
+        """订单簿不一致，重新订阅以获取新的快照"""
+        self.logger.warning(f"⚠️ 订单簿校验失败，重新订阅 | {inst_id} | {reason}")
+        self._books.pop(inst_id, None)
+        symbol = self._symbols.get(inst_id)
+        if symbol:
+            self._bbo.pop(symbol, None)
+        await self._send_subscribe("unsubscribe", [inst_id])
+        await self._send_subscribe("subscribe", [inst_id])
+
+    async def _handle_message(self, message: Dict[str, Any]):
+        arg = message.get("arg") or {}
+        action = message.get("action")
+        inst_id = arg.get("instId")
+        if str(arg.get("channel", "")).startswith("candle") and message.get("data"):
+            self._handle_candles(inst_id, arg["channel"], action, message["data"])
+            return
+        if arg.get("channel") != "books" or action not in ("snapshot", "update") or not message.get("data"):
+            if message.get("event") == "error":
+                self.logger.error(f"❌ 行情订阅错误: {message}")
+            return
+
+        data = message["data"][0]
+        book = self._books.get(inst_id)
+        if action == "snapshot":
+            book = self._books[inst_id] = OrderBook()
+            book.snapshot(data)
+        else:
+            if book is None:
+                # 还没收到快照的增量无法使用
+                return
+            # 序号必须连续（v2 推送带 seq/pseq），否则时间戳不能倒退
+            if data.get("pseq") is not None and book.seq is not None and int(data["pseq"]) != book.seq:
+                await self._resync(inst_id, f"序号不连续 {book.seq} -> {data['pseq']}")
+                return
+            if int(data.get("ts", 0)) < book.ts:
+                await self._resync(inst_id, f"时间戳倒退 {book.ts} -> {data.get('ts')}")
+                return
+            book.update(data)
+
+        if data.get("checksum") is not None and book.checksum() != int(data["checksum"]):
+            await self._resync(inst_id, "checksum 不一致")
+            return
+
+        symbol = self._symbols.get(inst_id)
+        if symbol and book.bids and book.asks:
+            self._bbo[symbol] = (max(book.bids), min(book.asks), time.monotonic())
+
+    def _handle_candles(self, inst_id: str, channel: str, action: Optional[str], rows: List[List[str]]):
+        subscription = self._klines.get((inst_id, channel))
+        if subscription is None:
+            return
+        for kline in subscription.push(rows, snapshot=action == "snapshot"):
+            for callback in subscription.callbacks:
+                try:
+                    callback(subscription.symbol, kline)
+                except Exception as e:
+                    self.logger.error(f"❌ K线回调失败 | {subscription.symbol} | {channel} | {e}")
+
+    async def _keepalive(self, ws):
+        # Bitget 要求每 30 秒发送字符串 ping，否则会断开连接
+        while True:
+            await asyncio.sleep(25)
+            await ws.send("ping")
+
+    async def _run(self):
+        retry_delay = 1
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=None) as ws:
+                    self._ws = ws
+                    self._books.clear()
+                    with self._lock:
+                        inst_ids = list(self._symbols)
+                    await self._send_subscribe("subscribe", inst_ids)
+                    with self._lock:
+                        klines = list(self._klines)
+                    await self._subscribe_klines(klines)
+                    self.logger.info(
+                        f"✅ 行情 websocket 已连接 | 订阅: {len(inst_ids)} 个标的 | K线: {len(klines)} 个"
+                    )
+                    retry_delay = 1
+
+                    keepalive = asyncio.ensure_future(self._keepalive(ws))
+                    try:
+                        async for raw in ws:
+                            if raw == "pong":
+                                continue
+                            await self._handle_message(json.loads(raw))
+                    finally:
+                        keepalive.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"⚠️ 行情 websocket 断开，{retry_delay} 秒后重连: {e}")
+            finally:
+                self._ws = None
+                self._bbo.clear()
+
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 30)
+
+
+class _KlineSubscription:
+    """
+    单个标的、单个周期的K线订阅状态
+
+    推送中最新的一根K线尚未收盘，只缓存；出现更新的开盘时间时缓存的K线即已收盘。
+    重连后的快照中已收盘且未回调过的K线会补发，断线期间不会漏掉K线。
+    """
+
+    def __init__(self, symbol: str, after: int = 0):
+        self.symbol = symbol
+        self.callbacks: List[KlineCallback] = []
+        self.last_closed = after
+        self._pending: Optional[Kline] = None
+
+    def push(self, rows: List[List[str]], snapshot: bool = False) -> List[Kline]:
+        """处理一次推送，返回新收盘的K线（按时间升序）"""
+        klines = sorted(
+            (int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5])) for r in rows
+        )
+        if snapshot:
+            self._pending = None
+        closed = []
+        for kline in klines:
+            if self._pending is not None and kline[0] > self._pending[0]:
+                closed.append(self._pending)
+            if self._pending is None or kline[0] >= self._pending[0]:
+                self._pending = kline
+
+        result = [k for k in closed if k[0] > self.last_closed]
+        if result:
+            self.last_closed = result[-1][0]
+        return result
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from typing import Callable, Optional
+from config import Config
+from utils.async_bitget_client import AsyncBitgetClient
+
+
+# 终态：到达后订单状态不会再变化，可以立即返回
+ORDER_FINAL_STATUSES = ("filled", "canceled")
+# 已有成交的状态
+ORDER_FILL_STATUSES = ("partially_filled", "filled")
+
+
+class OrderTracker:
+    """
+    订单成交跟踪器
+
+    在共享事件循环中用自适应退避的方式轮询 get_order_detail：
+    刚下单和状态变化后高频查询，状态不变时逐渐拉长间隔，
+    订单到达终态（全部成交 / 已撤销）时立即返回。
+    轮询在事件循环中进行，但调用方（信号工作线程）通过 run_coroutine 同步等待结果，
+    等待期间该线程和所在标的的执行槽位仍被占用，同一标的的后续信号要等订单处理完才开始。
+    """
+
+    def __init__(
+        self,
+        client: AsyncBitgetClient,
+        logger: Optional[logging.Logger] = None,
+        initial_interval: float = Config.ORDER_POLL_INITIAL_INTERVAL,
+        max_interval: float = Config.ORDER_POLL_MAX_INTERVAL,
+        backoff: float = Config.ORDER_POLL_BACKOFF,
+    ):
+        self.client = client
+        self.logger = logger or logging.getLogger(__name__)
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+
+    async def get_status(self, symbol: str, order_id: str) -> str:
+        """查询一次订单状态"""
+        detail = await self.client.get_order_detail(symbol, order_id)
+        # v1 接口返回 state 字段，兼容 status
+        return detail.get("status") or detail.get("state") or ""
+
+    async def wait_for_final_status(
+        self,
+        symbol: str,
+        order_id: str,
+        timeout: float,
+        on_fill: Optional[Callable[[], None]] = None,
+    ) -> str:
+        """
+        等待订单到达终态，超时则返回最后一次查询到的状态
+
+        部分成交不是终态，会继续等待剩余部分成交，直到超时再交给调用方处理。
+
+        Args:
+            symbol: 合约交易对符号
+            order_id: 订单ID
+            timeout: 最长等待时间（秒）
+            on_fill: 第一次查询到成交（部分或全部）时的回调，在事件循环线程中调用
+
+        Returns:
+            str: 订单状态
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        interval = self.initial_interval
+        last_status = ""
+
+        while True:
+            try:
+                status = await self.get_status(symbol, order_id)
+            except Exception as e:
+                # 单次查询失败不影响跟踪，等待下一次轮询
+                self.logger.warning(f"⚠️ 查询订单状态失败 | 订单ID: {order_id} | {symbol} | {e}")
+                status = last_status
+
+            if on_fill is not None and status in ORDER_FILL_STATUSES:
+                on_fill()
+                on_fill = None
+
+            if status in ORDER_FINAL_STATUSES:
+                return status
+
+            if status != last_status:
+                # 状态发生变化（如开始部分成交），恢复高频轮询
+                self.logger.debug("📊 订单状态变化 | 订单ID: %s | %s -> %s", order_id, last_status or "-", status)
+                interval = self.initial_interval
+                last_status = status
+            else:
+                interval = min(interval * self.backoff, self.max_interval)
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return last_status
+            await asyncio.sleep(min(interval, remaining))
@@ -0,0 +1,107 @@
+import logging
+import threading
+from decimal import Decimal
+from typing import Any, Dict, Optional
+from config import Config
+from services.contract_specs import ContractSpec
+
+
+# 仓位计算方式
+SIZING_MODE_REMOTE = "remote"  # 使用交易所 open-count 接口
+SIZING_MODE_SHADOW = "shadow"  # 使用交易所接口，同时本地计算并对比
+SIZING_MODE_LOCAL = "local"    # 只使用本地计算，省去一次网络请求
+
+
+class PositionSizer:
+    """
+    本地仓位计算引擎
+
+    根据保证金、杠杆、价格和合约手续费率在本地计算可开数量，
+    保证金需要覆盖初始保证金和开平仓两次 taker 手续费：
+        margin = size * price / leverage + 2 * size * price * takerFeeRate
+    shadow 模式下与 open-count 接口的结果按数量步长取整后对比，统计一致率。
+    """
+
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        mode: str = Config.SIZING_MODE,
+        tolerance: Decimal = Decimal(str(Config.SIZING_SHADOW_TOLERANCE)),
+    ):
+        self.logger = logger or logging.getLogger(__name__)
+        self.mode = mode
+        self.tolerance = tolerance
+
+        self._lock = threading.Lock()
+        self._compared = 0
+        self._matched = 0
+        self._max_diff = Decimal("0")
+
+    def openable_size(
+        self,
+        margin: Decimal,
+        price: Decimal,
+        leverage: str,
+        spec: Optional[ContractSpec] = None,
+    ) -> Decimal:
+        """
+        计算可开数量（未按步长取整）
+
+        Args:
+            margin: 使用的保证金
+            price: 开仓价格
+            leverage: 杠杆倍数
+            spec: 合约规格，用于获取 taker 手续费率
+        """
+        if margin <= 0 or price <= 0:
+            return Decimal("0")
+        taker_fee_rate = spec.taker_fee_rate if spec else Decimal("0")
+        cost_per_unit = price / Decimal(str(leverage)) + 2 * price * taker_fee_rate
+        return margin / cost_per_unit
+
+    def compare(
+        self,
+        symbol: str,
+        local_size: Decimal,
+        remote_size: Decimal,
+        spec: Optional[ContractSpec] = None,
+    ) -> bool:
+        """
+        对比本地与交易所计算结果（shadow 模式），差异在容差内视为一致
+
+        Returns:
+            bool: 是否一致
+        """
+        if spec is not None:
+            local_size, remote_size = spec.round_size(local_size), spec.round_size(remote_size)
+        else:
+            local_size, remote_size = Decimal(int(local_size)), Decimal(int(remote_size))
+
+        diff = abs(local_size - remote_size)
+        relative_diff = diff / remote_size if remote_size else diff
+        matched = relative_diff <= self.tolerance
+
+        with self._lock:
+            self._compared += 1
+            self._matched += int(matched)
+            self._max_diff = max(self._max_diff, relative_diff)
+
+        if matched:
+            self.logger.debug("📐 仓位计算一致 | %s | 本地: %s | 接口: %s", symbol, local_size, remote_size)
+        else:
+            self.logger.warning(
+                f"⚠️ 仓位计算不一致 | {symbol} | 本地: {local_size} | 接口: {remote_size} | "
+                f"相对差异: {relative_diff:.4%}"
+            )
+        return matched
+
+    def stats(self) -> Dict[str, Any]:
+        """shadow 对比统计"""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "compared": self._compared,
+                "matched": self._matched,
+                "match_rate": self._matched / self._compared if self._compared else None,
+                "max_relative_diff": float(self._max_diff),
+            }
@@ -0,0 +1,190 @@
+import contextvars
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import Config
+from services.signal_executor import SignalExecutor
+
+
+# 信号：(action, sentiment, leverage, position_ratio, signal_id)
+Signal = Tuple[str, str, str, float, Optional[str]]
+
+
+def signal_fingerprint(ticker: str, payload: Dict[str, Any]) -> str:
+    """
+    信号指纹：除 token 外的全部字段
+
+    TradingView 重发的告警请求体完全相同；如果告警消息中带有 {{timenow}} 等时间字段，
+    不同 K 线的同一信号指纹不同，不会被误判为重复。
+    """
+    fields = {k: v for k, v in payload.items() if k != "token"}
+    fields["ticker"] = ticker
+    canonical = json.dumps(fields, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+class SignalDeduplicator:
+    """
+    信号去重：有界 LRU 记录最近出现过的信号指纹
+
+    指纹在 ttl 秒内再次出现视为重复；超过 max_size 时淘汰最久未出现的指纹。
+    """
+
+    def __init__(
+        self,
+        ttl: float = Config.SIGNAL_DEDUP_TTL,
+        max_size: int = Config.SIGNAL_DEDUP_MAX_SIZE,
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        # 指纹 -> 过期时间
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._duplicates = 0
+
+    def check(self, fingerprint: str) -> bool:
+        """
+        记录指纹并判断是否重复
+
+        Returns:
+            bool: True 表示 ttl 内已出现过（重复信号）
+        """
+        if self.ttl <= 0:
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            expires_at = self._seen.get(fingerprint)
+            if expires_at is not None and expires_at > now:
+                self._duplicates += 1
+                return True
+
+            self._seen[fingerprint] = now + self.ttl
+            self._seen.move_to_end(fingerprint)
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+        return False
+
+    def forget(self, fingerprint: str):
+        """删除指纹（信号没有被接收，如队列已满），重试时不会被当作重复信号"""
+        with self._lock:
+            self._seen.pop(fingerprint, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "size": len(self._seen),
+                "max_size": self.max_size,
+                "duplicates": self._duplicates,
+            }
+
+
+class SignalCoalescer:
+    """
+    按标的合并时间窗口内的信号
+
+    窗口内的信号先缓存，窗口结束时合并后再提交到信号执行引擎：
+    - flat 会平掉之前的开仓，窗口内在它之前的开仓信号直接丢弃，多个 flat 只保留一个
+    - 同方向的开仓信号只保留最后一个（参数以最新的为准）
+    窗口为 0 时不合并，信号直接提交。
+    """
+
+    def __init__(
+        self,
+        executor: SignalExecutor,
+        handler: Callable[..., Any],
+        window: float = Config.SIGNAL_COALESCE_MS / 1000,
+        logger: Optional[logging.Logger] = None,
+        on_discard: Optional[Callable[[str, Signal], Any]] = None,
+    ):
+        self.executor = executor
+        self.handler = handler
+        self.window = window
+        self.logger = logger or logging.getLogger(__name__)
+        # 信号被合并或因队列已满丢弃时的回调 (ticker, signal)
+        self.on_discard = on_discard
+
+        self._lock = threading.Lock()
+        self._buffers: Dict[str, List[Signal]] = {}
+        # 缓存信号提交时的上下文，窗口结束时在原上下文中提交，阶段计时不中断
+        self._contexts: Dict[int, contextvars.Context] = {}
+        self._coalesced = 0
+        self._dropped = 0
+
+    def submit(
+        self,
+        ticker: str,
+        action: str,
+        sentiment: str,
+        leverage: str,
+        position_ratio: float,
+        signal_id: Optional[str] = None,
+    ) -> bool:
+        """
+        提交信号，处理函数以 (ticker, action, sentiment, leverage, position_ratio, signal_id) 调用
+
+        Returns:
+            bool: False 表示信号执行引擎队列已满（只在不合并时同步返回）
+        """
+        signal = (action, sentiment, leverage, position_ratio, signal_id)
+        if self.window <= 0:
+            return self.executor.submit(ticker, self.handler, ticker, *signal)
+
+        with self._lock:
+            buffer = self._buffers.get(ticker)
+            if buffer is None:
+                buffer = self._buffers[ticker] = []
+                timer = threading.Timer(self.window, self._flush, args=(ticker,))
+                timer.daemon = True
+                timer.start()
+            self._contexts[id(signal)] = contextvars.copy_context()
+            discarded = self._merge(buffer, signal)
+            self._coalesced += len(discarded)
+            for item in discarded:
+                self._contexts.pop(id(item), None)
+
+        if self.on_discard is not None:
+            for item in discarded:
+                self.on_discard(ticker, item)
+        return True
+
+    @staticmethod
+    def _merge(buffer: List[Signal], signal: Signal) -> List[Signal]:
+        """合并到缓存中，返回被丢弃的信号"""
+        if signal[1] == "flat":
+            kept = [s for s in buffer if s[1] == "flat"][:1] or [signal]
+        else:
+            kept = [s for s in buffer if s[:2] != signal[:2]] + [signal]
+        discarded = [s for s in buffer + [signal] if not any(s is k for k in kept)]
+        buffer[:] = kept
+        return discarded
+
+    def _flush(self, ticker: str):
+        with self._lock:
+            signals = self._buffers.pop(ticker, [])
+            contexts = [self._contexts.pop(id(signal)) for signal in signals]
+
+        for signal, context in zip(signals, contexts):
+            if not context.run(self.executor.submit, ticker, self.handler, ticker, *signal):
+                with self._lock:
+                    self._dropped += 1
+                if self.on_discard is not None:
+                    self.on_discard(ticker, signal)
+                self.logger.warning(f"⚠️ 信号队列已满，合并后的信号被丢弃 | {ticker} | {signal[0]} {signal[1]}")
+        if signals:
+            self.logger.info(f"📦 合并窗口结束 | {ticker} | 提交 {len(signals)} 个信号")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "window_ms": int(self.window * 1000),
+                "buffered": {ticker: len(signals) for ticker, signals in self._buffers.items()},
+                "coalesced": self._coalesced,
+                "dropped": self._dropped,
+            }
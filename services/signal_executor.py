@@ -0,0 +1,145 @@
+import contextvars
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Set, Tuple
+from config import Config
+from lib.MyFlask import MyFlask
+from services.signal_timing import STAGE_QUEUE, record_stage
+from utils.metrics import SIGNALS_IN_FLIGHT, SIGNALS_TOTAL
+from utils import tracing
+
+
+class SignalExecutor:
+    """
+    信号执行引擎
+
+    固定数量的工作线程 + 每个标的一个 FIFO 队列：
+    - 同一标的的信号严格按到达顺序逐个执行，开仓和平仓不会交错
+    - 不同标的的信号由多个工作线程并行执行
+    - 排队信号总数超过上限时拒绝新信号（背压），避免突发信号无限堆积
+    """
+
+    def __init__(
+        self,
+        app: MyFlask,
+        workers: int = Config.SIGNAL_WORKERS,
+        max_pending: int = Config.SIGNAL_MAX_PENDING,
+    ):
+        self.app = app
+        self.logger = app.logger
+        self.workers = workers
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        # 每个标的的待执行队列：(入队时间, 提交时的上下文, 函数, 参数)
+        self._queues: Dict[str, Deque[Tuple[float, contextvars.Context, Callable[..., Any], tuple]]] = {}
+        # 已在就绪队列中或正在执行的标的，保证同一标的同时只有一个工作线程处理
+        self._scheduled: Set[str] = set()
+        self._ready: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._pending = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._max_queue_wait = 0.0
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"signal-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, symbol: str, func: Callable[..., Any], *args: Any) -> bool:
+        """
+        提交信号到该标的的队列，函数在提交时的上下文（信号 ID、阶段计时等上下文变量）中执行
+
+        Returns:
+            bool: True 表示已入队，False 表示队列已满被拒绝
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                SIGNALS_TOTAL.labels("rejected").inc()
+                return False
+
+            self._queues.setdefault(symbol, deque()).append((time.monotonic(), contextvars.copy_context(), func, args))
+            self._pending += 1
+            self._submitted += 1
+            SIGNALS_IN_FLIGHT.inc()
+
+            if symbol not in self._scheduled:
+                self._scheduled.add(symbol)
+                self._ready.put(symbol)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """队列深度与执行统计"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "queue_depth": {symbol: len(jobs) for symbol, jobs in self._queues.items() if jobs},
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "max_queue_wait": round(self._max_queue_wait, 3),
+            }
+
+    def shutdown(self, wait: bool = True):
+        """停止工作线程，已入队但未开始的信号不再执行"""
+        for _ in self._threads:
+            self._ready.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _worker(self):
+        while True:
+            symbol = self._ready.get()
+            if symbol is None:
+                return
+
+            with self._lock:
+                enqueued_at, context, func, args = self._queues[symbol].popleft()
+                self._pending -= 1
+                self._running += 1
+                queue_wait = time.monotonic() - enqueued_at
+                self._max_queue_wait = max(self._max_queue_wait, queue_wait)
+
+            self.logger.debug("📥 信号出队 | %s | 排队耗时: %.3fs", symbol, queue_wait)
+            failed = False
+            try:
+                context.run(self._run, symbol, func, args, queue_wait)
+            except Exception as e:
+                failed = True
+                self.logger.error(f"❌ 后台任务执行失败 | {symbol}: {e}", exc_info=True)
+
+            SIGNALS_IN_FLIGHT.dec()
+            SIGNALS_TOTAL.labels("failed" if failed else "completed").inc()
+            with self._lock:
+                self._running -= 1
+                if failed:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+
+                # 每次只执行一个信号后重新排队，让不同标的之间公平轮转
+                if self._queues[symbol]:
+                    self._ready.put(symbol)
+                else:
+                    del self._queues[symbol]
+                    self._scheduled.discard(symbol)
+
+    def _run(self, symbol: str, func: Callable[..., Any], args: tuple, queue_wait: float):
+        record_stage(STAGE_QUEUE, queue_wait)
+        now_ns = time.time_ns()
+        tracing.record_span("signal.queue", now_ns - int(queue_wait * 1e9), now_ns, {"symbol": symbol})
+        with tracing.span("signal.execute", attributes={"symbol": symbol}), self.app.app_context():
+            func(*args)
@@ -0,0 +1,385 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from config import Config
+from services.signal_timing import current_timing
+
+
+# 事件类型
+EVENT_RECEIVED = "received"              # webhook 已接收信号
+EVENT_STARTED = "started"                # 开始执行
+EVENT_ORDER_SUBMITTED = "order_submitted"
+EVENT_ORDER_FINAL = "order_final"        # 订单成交、撤销或已被我们撤单
+EVENT_COMPLETED = "completed"
+EVENT_FAILED = "failed"
+EVENT_COALESCED = "coalesced"            # 被合并窗口丢弃
+EVENT_EXPIRED = "expired"                # 重启时已超过可重放时间
+EVENT_ABANDONED = "abandoned"            # 重启时执行中断且无法确认进度
+EVENT_RECOVERING = "recovering"          # 已被某个进程接管恢复
+
+TERMINAL_EVENTS = (EVENT_COMPLETED, EVENT_FAILED, EVENT_COALESCED, EVENT_EXPIRED, EVENT_ABANDONED)
+
+# 清理已结束信号的间隔（秒）
+PRUNE_INTERVAL = 3600
+
+# 当前正在执行的信号ID，下单、订单状态变化事件据此关联到信号
+current_signal_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_signal_id", default=None)
+# 当前正在跟踪的订单ID，用于日志关联
+current_order_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_order_id", default=None)
+
+
+@contextmanager
+def order_scope(order_id: str) -> Iterator[None]:
+    """跟踪订单期间关联订单ID"""
+    token = current_order_id.set(order_id)
+    try:
+        yield
+    finally:
+        current_order_id.reset(token)
+
+
+class SignalJournal:
+    """
+    信号日志：只追加的 SQLite（WAL）事件表，记录接收的信号和订单状态变化
+
+    - 写入只放入内存队列，由后台线程批量写入并提交（每批一次 fsync），不增加 webhook 响应延迟
+    - 每个进程有自己的 owner ID，写入的事件都带 owner，并定期在 leases 表中续约（心跳）；
+      未结束的信号归属于最后一条事件的 owner，只接管 owner 租约已过期（进程崩溃或已退出）的信号，
+      多个 gunicorn worker 共用一个信号日志时不会接管仍在运行的 worker 的信号
+    - 启动时和运行期间发现租约过期时扫描无主的未结束信号：还没开始执行的在可重放时间内重新提交，
+      已提交订单但没有最终状态的继续跟踪订单
+    - 已结束超过保留天数的信号定期删除
+    - path 为空时关闭，所有方法都是空操作
+    """
+
+    def __init__(
+        self,
+        path: str = Config.SIGNAL_JOURNAL_PATH,
+        logger: Optional[logging.Logger] = None,
+        flush_interval: float = Config.SIGNAL_JOURNAL_FLUSH_MS / 1000,
+        replay_max_age: float = Config.SIGNAL_REPLAY_MAX_AGE,
+        lease: float = Config.SIGNAL_JOURNAL_LEASE,
+        retention_days: float = Config.SIGNAL_JOURNAL_RETENTION_DAYS,
+    ):
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self.flush_interval = flush_interval
+        self.replay_max_age = replay_max_age
+        self.lease = lease
+        self.retention_days = retention_days
+        # 本进程的 owner ID，每次启动都不同
+        self.owner = uuid.uuid4().hex
+
+        self._queue: "queue.Queue[Optional[Tuple[str, str, Optional[str], Optional[str], float, str]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lease_thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._pruned_at = 0.0
+        # recover() 传入的回调，租约过期时后台线程用来接管信号
+        self._replay_signal: Optional[Callable[..., Any]] = None
+        self._resume_signal: Optional[Callable[..., Any]] = None
+
+        if self.enabled:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            try:
+                # 多个 worker 同时启动时串行建表和升级
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS events ("
+                    "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                    "signal_id TEXT NOT NULL, "
+                    "kind TEXT NOT NULL, "
+                    "symbol TEXT, "
+                    "data TEXT, "
+                    "ts REAL NOT NULL, "
+                    "owner TEXT)"
+                )
+                if "owner" not in {row[1] for row in conn.execute("PRAGMA table_info(events)")}:
+                    # 旧版本的信号日志没有 owner，其中未结束的信号视为无主
+                    conn.execute("ALTER TABLE events ADD COLUMN owner TEXT")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_events_signal ON events (signal_id)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_events_kind ON events (kind, ts)")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS leases (owner TEXT PRIMARY KEY, pid INTEGER, heartbeat REAL NOT NULL)"
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # 每次提交都 fsync；提交由后台线程按批进行
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def start(self):
+        """登记本进程的租约，启动后台写入线程和续约线程"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._heartbeat()
+        self._thread = threading.Thread(target=self._writer, name="signal-journal", daemon=True)
+        self._thread.start()
+        self._lease_thread = threading.Thread(target=self._lease_loop, name="signal-journal-lease", daemon=True)
+        self._lease_thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """写完队列中的事件后停止后台线程，并释放租约（未结束的信号可以立即被其他进程接管）"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._lease_thread.join()
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE leases SET heartbeat = 0 WHERE owner = ?", (self.owner,))
+        except sqlite3.Error as e:
+            self.logger.warning(f"⚠️ 信号日志释放租约失败: {e}")
+        finally:
+            conn.close()
+
+    def record(self, kind: str, signal_id: Optional[str], symbol: Optional[str] = None, data: Optional[Dict[str, Any]] = None):
+        """追加一条事件（只入队，不等待写盘）"""
+        if not self.enabled or not signal_id:
+            return
+        payload = json.dumps(data, separators=(",", ":"), default=str) if data else None
+        self._queue.put((signal_id, kind, symbol, payload, time.time(), self.owner))
+
+    def record_signal(self, ticker: str, action: str, sentiment: str, leverage: str, position_ratio: float) -> Optional[str]:
+        """记录新接收的信号，返回信号ID（关闭时返回 None）"""
+        if not self.enabled:
+            return None
+        signal_id = uuid.uuid4().hex
+        self.record(EVENT_RECEIVED, signal_id, ticker, {
+            "action": action,
+            "sentiment": sentiment,
+            "leverage": leverage,
+            "position_ratio": position_ratio,
+        })
+        return signal_id
+
+    def record_order(self, kind: str, symbol: str, order_id: str, **data: Any):
+        """记录当前信号的订单事件"""
+        self.record(kind, current_signal_id.get(), symbol, {"order_id": order_id, **data})
+
+    @contextmanager
+    def signal_scope(self, signal_id: Optional[str], symbol: str) -> Iterator[None]:
+        """执行信号期间关联信号ID，并记录开始、完成或失败（附带各阶段耗时）"""
+        token = current_signal_id.set(signal_id)
+        self.record(EVENT_STARTED, signal_id, symbol)
+        timing = current_timing.get()
+        try:
+            yield
+        except Exception as e:
+            data = {"error": str(e)}
+            if timing is not None:
+                data["timings"] = timing.to_dict()
+            self.record(EVENT_FAILED, signal_id, symbol, data)
+            raise
+        else:
+            self.record(EVENT_COMPLETED, signal_id, symbol, {"timings": timing.to_dict()} if timing is not None else None)
+        finally:
+            current_signal_id.reset(token)
+
+    def _writer(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            # 攒一小段时间内的事件，一次提交
+            deadline = time.monotonic() + self.flush_interval
+            batch = []
+            while item is not None:
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if item is None:
+                stopping = True
+
+            if batch:
+                try:
+                    conn.execute("BEGIN")
+                    conn.executemany(
+                        "INSERT INTO events (signal_id, kind, symbol, data, ts, owner) VALUES (?, ?, ?, ?, ?, ?)", batch
+                    )
+                    conn.execute("COMMIT")
+                except Exception as e:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    self.logger.error(f"❌ 信号日志写入失败 | {len(batch)} 条: {e}")
+        conn.close()
+
+    def _heartbeat(self):
+        """续约：更新本进程的心跳时间"""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (owner, pid, heartbeat) VALUES (?, ?, ?)",
+                (self.owner, os.getpid(), time.time()),
+            )
+        finally:
+            conn.close()
+
+    def _has_expired_leases(self) -> bool:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT 1 FROM leases WHERE heartbeat < ? LIMIT 1", (time.time() - self.lease,)).fetchone()
+        finally:
+            conn.close()
+        return row is not None
+
+    def _lease_loop(self):
+        # 每 1/3 租约时间续约一次，同时检查是否有其他进程的租约过期
+        while not self._stopping.wait(self.lease / 3):
+            try:
+                self._heartbeat()
+                if self._replay_signal is not None and self._has_expired_leases():
+                    self._recover()
+                if time.time() - self._pruned_at >= PRUNE_INTERVAL:
+                    self.prune()
+            except Exception as e:
+                self.logger.error(f"❌ 信号日志续约或接管失败: {e}")
+
+    def prune(self) -> int:
+        """删除结束时间早于保留天数的信号的全部事件，返回删除的事件数"""
+        self._pruned_at = time.time()
+        if not self.enabled or self.retention_days <= 0:
+            return 0
+        cutoff = time.time() - self.retention_days * 86400
+        conn = self._connect()
+        try:
+            deleted = conn.execute(
+                "DELETE FROM events WHERE signal_id IN ("
+                f"SELECT signal_id FROM events WHERE kind IN ({','.join('?' * len(TERMINAL_EVENTS))}) AND ts < ?)",
+                (*TERMINAL_EVENTS, cutoff),
+            ).rowcount
+        finally:
+            conn.close()
+        if deleted:
+            self.logger.info(f"🧹 已清理 {self.retention_days:g} 天前结束的信号 | {deleted} 条事件")
+        return deleted
+
+    def recover(
+        self,
+        replay_signal: Callable[[str, str, str, str, float, str], Any],
+        resume_signal: Callable[[str, str, str, str, float, str, List[str]], Any],
+    ):
+        """
+        接管无主的未结束信号：owner 租约已过期，或来自没有 owner 的旧版本日志
+
+        启动时调用一次；之后续约线程发现其他进程租约过期（崩溃或已退出）时，用同样的回调再次接管。
+
+        Args:
+            replay_signal: 重新提交还没开始执行的信号 (ticker, action, sentiment, leverage, position_ratio, signal_id)
+            resume_signal: 继续跟踪已提交的订单 (..., signal_id, 未结束的订单ID列表)
+            两者返回 False 表示信号执行引擎队列已满
+        """
+        if not self.enabled:
+            return
+        self._replay_signal, self._resume_signal = replay_signal, resume_signal
+        self.prune()
+        self._recover()
+
+    def _recover(self):
+        conn = self._connect()
+        try:
+            # 加写锁后读取并写入接管事件：同一时间只有一个进程在接管，接管后信号归属本进程
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            live = {row[0] for row in conn.execute("SELECT owner FROM leases WHERE heartbeat >= ?", (now - self.lease,))}
+            live.add(self.owner)
+            rows = conn.execute(
+                "SELECT signal_id, kind, symbol, data, ts, owner FROM events WHERE signal_id IN ("
+                "SELECT signal_id FROM events WHERE kind = ? "
+                f"EXCEPT SELECT signal_id FROM events WHERE kind IN ({','.join('?' * len(TERMINAL_EVENTS))})"
+                ") ORDER BY seq",
+                (EVENT_RECEIVED, *TERMINAL_EVENTS),
+            ).fetchall()
+
+            signals: Dict[str, Dict[str, Any]] = {}
+            for signal_id, kind, symbol, data, ts, owner in rows:
+                state = signals.setdefault(signal_id, {"symbol": symbol, "started": False, "orders": [], "signal": None})
+                # 最后一条事件的 owner 是信号当前的归属
+                state["owner"] = owner
+                data = json.loads(data) if data else {}
+                if kind == EVENT_RECEIVED:
+                    state["signal"], state["received_at"] = data, ts
+                elif kind == EVENT_STARTED:
+                    state["started"] = True
+                elif kind == EVENT_ORDER_SUBMITTED:
+                    state["orders"].append(data["order_id"])
+                elif kind == EVENT_ORDER_FINAL and data.get("order_id") in state["orders"]:
+                    state["orders"].remove(data["order_id"])
+
+            plans = []
+            for signal_id, state in signals.items():
+                signal = state["signal"]
+                if signal is None or state["owner"] in live:
+                    continue
+                if state["orders"]:
+                    kind = EVENT_RECOVERING
+                elif not state["started"] and now - state["received_at"] <= self.replay_max_age:
+                    kind = EVENT_RECOVERING
+                elif not state["started"]:
+                    kind = EVENT_EXPIRED
+                else:
+                    kind = EVENT_ABANDONED
+                conn.execute(
+                    "INSERT INTO events (signal_id, kind, symbol, data, ts, owner) VALUES (?, ?, ?, NULL, ?, ?)",
+                    (signal_id, kind, state["symbol"], now, self.owner),
+                )
+                plans.append((signal_id, kind, state))
+            # 过期租约的信号都已接管，租约不再需要
+            conn.execute("DELETE FROM leases WHERE heartbeat < ?", (now - self.lease,))
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        for signal_id, kind, state in plans:
+            symbol, signal = state["symbol"], state["signal"]
+            args = (symbol, signal["action"], signal["sentiment"], signal["leverage"], signal["position_ratio"], signal_id)
+            if kind == EVENT_EXPIRED:
+                self.logger.warning(f"⚠️ 未执行的信号已过期，不再重放 | {symbol} | {signal['action']} {signal['sentiment']}")
+                continue
+            if kind == EVENT_ABANDONED:
+                self.logger.warning(f"⚠️ 信号执行中断且无未结束订单，需人工确认 | {symbol} | {signal['action']} {signal['sentiment']}")
+                continue
+            if state["orders"]:
+                self.logger.info(f"🔁 恢复订单跟踪 | {symbol} | 订单ID: {', '.join(state['orders'])}")
+                accepted = self._resume_signal(*args, state["orders"])
+            else:
+                self.logger.info(f"🔁 重放未执行的信号 | {symbol} | {signal['action']} {signal['sentiment']}")
+                accepted = self._replay_signal(*args)
+            if accepted is False:
+                self.record(EVENT_FAILED, signal_id, symbol, {"error": "信号队列已满"})
+                self.logger.warning(f"⚠️ 信号队列已满，接管的信号被丢弃 | {symbol} | {signal['action']} {signal['sentiment']}")
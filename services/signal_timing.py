@@ -0,0 +1,67 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from utils.metrics import SIGNAL_STAGE_SECONDS
+
+
+# 信号处理各阶段（开仓前置阶段中价格、仓位计算、杠杆三者并发执行，耗时有重叠）
+STAGE_PARSE = "parse"              # webhook 解析、校验、去重、写入信号日志
+STAGE_QUEUE = "queue"              # 提交到信号执行引擎后等待工作线程
+STAGE_PRICE = "price"              # 获取 BBO 价格（本地盘口或深度接口）
+STAGE_SIZING = "sizing"            # 账户快照 + 可开数量
+STAGE_LEVERAGE = "leverage"        # 确认/设置杠杆
+STAGE_PLACE_ORDER = "place_order"  # 下单接口
+STAGE_FIRST_FILL = "first_fill"    # 订单提交后到首次查询到成交
+STAGES = (
+    STAGE_PARSE, STAGE_QUEUE, STAGE_PRICE, STAGE_SIZING, STAGE_LEVERAGE, STAGE_PLACE_ORDER, STAGE_FIRST_FILL,
+)
+
+
+class SignalTiming:
+    """单个信号各阶段的耗时（秒），同一阶段多次发生时累加（如限价单未成交后改市价单），每次发生都计入直方图"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        SIGNAL_STAGE_SECONDS.labels(stage).observe(seconds)
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_once(self, stage: str, seconds: float):
+        """只记录第一次（如首次成交）"""
+        if stage not in self.stages:
+            self.add(stage, seconds)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {stage: round(seconds, 6) for stage, seconds in self.stages.items()}
+
+
+# 当前信号的阶段耗时；信号执行引擎提交任务时复制上下文，webhook 线程中开始的计时在工作线程中继续
+current_timing: contextvars.ContextVar[Optional[SignalTiming]] = contextvars.ContextVar("current_timing", default=None)
+
+
+def start_timing() -> SignalTiming:
+    """为当前上下文中的信号开始计时"""
+    timing = SignalTiming()
+    current_timing.set(timing)
+    return timing
+
+
+def record_stage(stage: str, seconds: float):
+    """记录某阶段的耗时到直方图，以及当前信号的计时（如果有）"""
+    timing = current_timing.get()
+    if timing is not None:
+        timing.add(stage, seconds)
+    else:
+        SIGNAL_STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """记录代码块耗时到当前信号的某阶段"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
@@ -1,9 +1,22 @@
 from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
 import time
 from config import Config
 from utils.decorator import timed_api_call
 from utils.bitget_client import BitgetClient
-from lib.MyFlask import get_current_app
+from utils.async_bitget_client import BATCH_ORDER_LIMIT, BitgetAPIError, generate_client_oid
+from utils import tracing
+from utils.metrics import ORDERS_CANCELLED, ORDERS_MARKET_FALLBACK, ORDERS_REJECTED, ORDERS_SUBMITTED
+from services.contract_specs import ContractSpec
+from services.position_sizing import SIZING_MODE_LOCAL, SIZING_MODE_SHADOW
+from services.signal_journal import EVENT_ORDER_FINAL, EVENT_ORDER_SUBMITTED, order_scope
+from services.signal_timing import (
+    STAGE_FIRST_FILL, STAGE_LEVERAGE, STAGE_PLACE_ORDER, STAGE_PRICE, STAGE_SIZING,
+    current_timing, record_stage, timed_stage,
+)
+from utils.event_loop import run_coroutine
+from lib.MyFlask import MyFlask, get_current_app
 
 
 # Bitget 订单状态映射
@@ -11,6 +24,7 @@ ORDER_STATUS_FILLED = "filled"
 ORDER_STATUS_PARTIAL_FILLED = "partially_filled"
 ORDER_STATUS_NEW = "new"
 ORDER_STATUS_PENDING = "pending"
+ORDER_STATUS_CANCELED = "canceled"
 
 # 逐仓模式固定为 isolated
 MARGIN_MODE_ISOLATED = "isolated"
@@ -34,6 +48,9 @@ def get_current_position_quantity(symbol: str) -> Decimal:
     try:
         logger.info(f"📊 查询持仓 | {symbol}")
         positions = client.get_all_positions()
+        # 顺便刷新杠杆缓存
+        if isinstance(positions, list):
+            current_app.leverage_cache.update_from_positions(positions)
         
         if isinstance(positions, list):
             for pos in positions:
@@ -56,6 +73,65 @@ def get_current_position_quantity(symbol: str) -> Decimal:
         raise
 
 
+def _parse_available_margin(account_info: Any) -> Decimal:
+    """从账户信息中解析可用保证金"""
+    if isinstance(account_info, list) and len(account_info) > 0:
+        account_info = account_info[0]
+    
+    # Bitget API 可能返回 available、marginAvailable 或 equity 字段
+    return Decimal(str(
+        account_info.get("available") or 
+        account_info.get("marginAvailable") or 
+        account_info.get("equity") or 
+        "0"
+    ))
+
+
+def _parse_open_count(result: Any) -> Decimal:
+    """解析可开数量接口的返回值，格式: {"openCount": 2.975}"""
+    if isinstance(result, dict):
+        return Decimal(str(result.get("openCount", "0")))
+    elif isinstance(result, list) and len(result) > 0:
+        return Decimal(str(result[0].get("openCount", "0")))
+    return Decimal("0")
+
+
+def _parse_best_price(depth: Dict[str, Any], book_side: str) -> Decimal:
+    """
+    从深度快照中解析一档价格
+    
+    Args:
+        depth: 深度行情
+        book_side: "asks" 取卖一价，"bids" 取买一价
+    """
+    levels = depth.get(book_side, [])
+    if levels and len(levels) > 0:
+        return Decimal(str(levels[0][0]))  # [price, quantity]
+    raise ValueError("卖一价为空" if book_side == "asks" else "买一价为空")
+
+
+def _round_quantity(symbol: str, quantity: Decimal) -> Decimal:
+    """按合约数量步长向下取整，没有合约规格时按整数取整"""
+    spec = get_current_app().contract_specs.get(symbol)
+    if spec is None:
+        return Decimal(str(int(quantity)))
+    return spec.round_size(quantity)
+
+
+def _min_size(symbol: str) -> Decimal:
+    """合约最小下单数量，没有合约规格时为 1"""
+    spec = get_current_app().contract_specs.get(symbol)
+    return Decimal("1") if spec is None else spec.min_size
+
+
+def _round_price(symbol: str, price: Decimal) -> Decimal:
+    """按合约最小价格变动取整，没有合约规格时原样返回"""
+    spec = get_current_app().contract_specs.get(symbol)
+    if spec is None:
+        return price
+    return spec.round_price(price)
+
+
 @timed_api_call
 def estimate_max_purchase_quantity(
     symbol: str,
@@ -80,19 +156,8 @@ def estimate_max_purchase_quantity(
     try:
         logger.info(f"📊 计算可开数量 | {symbol} | 杠杆: {leverage}x | 逐仓比例: {position_ratio*100}%")
         
-        # 获取账户信息以获取可用余额
-        account_info = client.get_account_info()
-        if isinstance(account_info, list) and len(account_info) > 0:
-            account_info = account_info[0]
-        
-        # 获取可用余额（逐仓模式下的可用保证金）
-        # Bitget API 可能返回 available、marginAvailable 或 equity 字段
-        available_margin = Decimal(str(
-            account_info.get("available") or 
-            account_info.get("marginAvailable") or 
-            account_info.get("equity") or 
-            "0"
-        ))
+        # 获取账户信息以获取可用余额（逐仓模式下的可用保证金），使用共享的账户快照
+        available_margin = _parse_available_margin(run_coroutine(current_app.account_cache.get()))
         logger.info(f"💰 账户可用保证金: {available_margin} USDT")
         
         # 根据逐仓比例计算要使用的保证金数量
@@ -103,29 +168,16 @@ def estimate_max_purchase_quantity(
         current_price = get_best_ask_price(symbol)
         logger.info(f"💰 当前价格: {current_price} | {symbol}")
         
-        # 调用 Bitget API 获取可开数量
-        # 根据官方文档，API 返回格式: {"openCount": 2.975}
-        result = client.get_openable_size(
-            symbol=symbol,
-            margin_coin="USDT",  # 保证金币种
-            open_amount=str(margin_to_use),
-            open_price=str(current_price),
-            leverage=leverage
-        )
-        
-        # 解析 API 返回的可开数量
-        # API 返回格式: {"openCount": 2.975}
-        if isinstance(result, dict):
-            max_open_count = Decimal(str(result.get("openCount", "0")))
-        elif isinstance(result, list) and len(result) > 0:
-            max_open_count = Decimal(str(result[0].get("openCount", "0")))
-        else:
-            max_open_count = Decimal("0")
+        # 获取可开数量（交易所接口或本地计算，见 Config.SIZING_MODE）
+        max_open_count = run_coroutine(_resolve_open_count(
+            current_app._get_current_object(), symbol, margin_to_use, current_price, leverage,
+            current_app.contract_specs.get(symbol), {}
+        ))
         
-        logger.info(f"📊 API 返回最大可开数量: {max_open_count} | {symbol}")
+        logger.info(f"📊 最大可开数量: {max_open_count} | {symbol}")
         
-        # 向下取整
-        actual_quantity = Decimal(str(int(max_open_count)))
+        # 按合约数量步长向下取整
+        actual_quantity = _round_quantity(symbol, max_open_count)
         
         logger.info(f"✅ 计算后实际下单数量: {actual_quantity} | {symbol} | 比例: {position_ratio*100}%")
         
@@ -136,35 +188,286 @@ def estimate_max_purchase_quantity(
 
 
 @timed_api_call
-def set_leverage(symbol: str, leverage: str):
+def set_leverage(symbol: str, leverage: str, hold_side: str = "long"):
     """
-    设置合约杠杆倍数
+    设置合约杠杆倍数，已是目标杠杆时跳过
     
     Args:
         symbol: 合约交易对符号
         leverage: 杠杆倍数，如 "2", "5", "10"
+        hold_side: 持仓方向 "long" 或 "short"
     """
     current_app = get_current_app()
-    client = current_app.bitget_client
     logger = current_app.logger
     
     try:
-        logger.info(f"⚙️ 设置杠杆倍数 | {symbol} | {leverage}x")
-        client.set_leverage(
-            symbol=symbol,
-            leverage=leverage,
-            margin_mode=MARGIN_MODE_ISOLATED
-        )
-        logger.info(f"✅ 杠杆设置成功 | {symbol} | {leverage}x")
+        logger.info(f"⚙️ 设置杠杆倍数 | {symbol} | {hold_side} | {leverage}x")
+        if run_coroutine(current_app.leverage_cache.ensure(symbol, leverage, hold_side)):
+            logger.info(f"✅ 杠杆设置成功 | {symbol} | {leverage}x")
+        else:
+            logger.info(f"ℹ️ 杠杆已是 {leverage}x，无需设置 | {symbol}")
     except Exception as e:
         logger.error(f"❌ 设置杠杆失败 {symbol}: {e}")
         raise
 
 
+async def _timed(timings: Dict[str, float], name: str, coro):
+    """执行协程并记录耗时（秒）到 timings"""
+    start_time = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[name] = time.perf_counter() - start_time
+
+
+async def _resolve_open_count(
+    app: MyFlask,
+    symbol: str,
+    margin_to_use: Decimal,
+    price: Decimal,
+    leverage: str,
+    spec: Optional[ContractSpec],
+    timings: Dict[str, float],
+) -> Decimal:
+    """
+    计算最大可开数量（协程），按 Config.SIZING_MODE 选择本地计算或 open-count 接口
+    
+    shadow 模式下以接口结果为准，同时与本地计算结果对比。
+    """
+    sizer = app.position_sizer
+    local_count = sizer.openable_size(margin_to_use, price, leverage, spec)
+    if sizer.mode == SIZING_MODE_LOCAL:
+        return local_count
+    
+    # 根据官方文档，API 返回格式: {"openCount": 2.975}
+    result = await _timed(timings, "open_count", app.bitget_client.async_client.get_openable_size(
+        symbol=symbol,
+        margin_coin="USDT",  # 保证金币种
+        open_amount=str(margin_to_use),
+        open_price=str(price),
+        leverage=leverage
+    ))
+    remote_count = _parse_open_count(result)
+    if sizer.mode == SIZING_MODE_SHADOW:
+        sizer.compare(symbol, local_count, remote_count, spec)
+    return remote_count
+
+
+async def _prepare_open_order(
+    app: MyFlask,
+    symbol: str,
+    hold_side: str,
+    leverage: str,
+    position_ratio: float,
+    price: Optional[Decimal] = None,
+    spec: Optional[ContractSpec] = None,
+) -> Tuple[Decimal, Decimal, Dict[str, float]]:
+    """
+    开仓前置阶段（协程）：并发获取深度、账户、设置杠杆，再用同一份深度快照计算价格和可开数量
+    
+    协程运行在事件循环线程中，没有 Flask 应用上下文，需要传入应用对象。
+    已有本地盘口价格时传入 price，跳过深度请求。
+    
+    Returns:
+        Tuple[Decimal, Decimal, Dict[str, float]]: (下单价格, 最大可开数量, 各步骤耗时)
+    """
+    client = app.bitget_client.async_client
+    logger = app.logger
+    timings: Dict[str, float] = {}
+    
+    async def no_depth():
+        return None
+    
+    # 深度、账户、杠杆三者互不依赖，并发请求
+    depth, account_info, leverage_result = await asyncio.gather(
+        _timed(timings, "depth", client.get_depth(symbol, limit=1)) if price is None else no_depth(),  # 只需要第一档
+        _timed(timings, "account", app.account_cache.get()),
+        _timed(timings, "leverage", app.leverage_cache.ensure(symbol, leverage, hold_side)),
+        return_exceptions=True,
+    )
+    if isinstance(depth, BaseException):
+        raise depth
+    if isinstance(account_info, BaseException):
+        raise account_info
+    if isinstance(leverage_result, BaseException):
+        logger.warning(f"⚠️ 设置杠杆失败，将按当前杠杆下单: {leverage_result}")
+    
+    # 开多使用卖一价，开空使用买一价（BBO 对手价），价格与数量基于同一份深度快照
+    if price is None:
+        price = _parse_best_price(depth, "asks" if hold_side == "long" else "bids")
+    available_margin = _parse_available_margin(account_info)
+    margin_to_use = available_margin * Decimal(str(position_ratio))
+    logger.info(
+        f"💰 BBO 价格: {price} | 可用保证金: {available_margin} USDT | "
+        f"将使用: {margin_to_use} USDT | {symbol}"
+    )
+    
+    # 可开数量依赖价格和保证金，只能在上面完成后计算
+    max_open_count = await _resolve_open_count(app, symbol, margin_to_use, price, leverage, spec, timings)
+    return price, max_open_count, timings
+
+
+@timed_api_call
+def prepare_open_order(
+    symbol: str,
+    hold_side: str,
+    leverage: str = "2",
+    position_ratio: float = 0.1,
+) -> Tuple[Decimal, Decimal]:
+    """
+    开仓前置阶段：并发获取下单所需数据，计算 BBO 对手价和下单数量
+    
+    Args:
+        symbol: 合约交易对符号
+        hold_side: 开仓方向 "long" 或 "short"
+        leverage: 杠杆倍数，默认 2 倍
+        position_ratio: 逐仓比例，默认 0.1 (10%)
+    
+    Returns:
+        Tuple[Decimal, Decimal]: (下单价格, 下单数量)
+    """
+    current_app = get_current_app()
+    logger = current_app.logger
+    
+    # 本地盘口有效时直接使用，省去一次深度请求
+    bbo = current_app.market_data.get_bbo(symbol)
+    bbo_price = None if bbo is None else (bbo[1] if hold_side == "long" else bbo[0])
+    
+    try:
+        # 合约规格可能需要同步刷新，在进入事件循环前获取
+        spec = current_app.contract_specs.get(symbol)
+        price, max_open_count, timings = run_coroutine(_prepare_open_order(
+            current_app._get_current_object(), symbol, hold_side, leverage, position_ratio, bbo_price, spec
+        ))
+        # 按合约数量步长向下取整
+        quantity = _round_quantity(symbol, max_open_count)
+    except Exception as e:
+        logger.error(f"❌ 开仓前置数据获取失败 {symbol}: {e}")
+        raise
+    
+    record_stage(STAGE_PRICE, timings.get("depth", 0))
+    record_stage(STAGE_SIZING, timings.get("account", 0) + timings.get("open_count", 0))
+    record_stage(STAGE_LEVERAGE, timings.get("leverage", 0))
+    
+    # 关键路径 = 并发阶段中最慢的请求 + 可开数量请求
+    parallel_time = max(timings.get("depth", 0), timings.get("account", 0), timings.get("leverage", 0))
+    critical_path = parallel_time + timings.get("open_count", 0)
+    logger.info(
+        f"⏱️ 开仓前置阶段关键路径: {critical_path:.3f}s | 深度: {timings.get('depth', 0):.3f}s | "
+        f"账户: {timings.get('account', 0):.3f}s | 杠杆: {timings.get('leverage', 0):.3f}s | "
+        f"可开数量: {timings.get('open_count', 0):.3f}s | {symbol}"
+    )
+    logger.info(f"✅ 下单价格: {price} | 下单数量: {quantity} | {symbol} | 比例: {position_ratio*100}%")
+    return price, quantity
+
+
+def _chunks(items: List[Any], size: int) -> List[List[Any]]:
+    """按批量接口的上限切分"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+async def _gather_batches(coros: List[Any]) -> List[Any]:
+    """并发执行所有批次，单个批次失败不影响其他批次"""
+    return await asyncio.gather(*coros, return_exceptions=True)
+
+
+@timed_api_call
+def batch_cancel_orders(symbol: str, order_ids: List[str]) -> List[str]:
+    """
+    批量撤单，按接口上限分批后并发提交
+    
+    Args:
+        symbol: 合约交易对符号
+        order_ids: 待撤销的订单ID
+    
+    Returns:
+        List[str]: 撤单成功的订单ID
+    """
+    current_app = get_current_app()
+    client = current_app.bitget_client.async_client
+    logger = current_app.logger
+    
+    if not order_ids:
+        return []
+    
+    batches = _chunks(list(order_ids), BATCH_ORDER_LIMIT)
+    results = run_coroutine(_gather_batches([client.batch_cancel_orders(symbol, batch) for batch in batches]))
+    
+    canceled = []
+    for batch, result in zip(batches, results):
+        if isinstance(result, Exception):
+            logger.error(f"❌ 批量撤单失败 | {symbol} | {len(batch)} 笔: {result}")
+            continue
+        canceled.extend(result.get("order_ids") or [])
+        for fail in result.get("fail_infos") or []:
+            logger.warning(f"⚠️ 撤单失败 | 订单ID: {fail.get('order_id')} | {symbol} | {fail.get('err_msg')}")
+    
+    # 撤单会释放保证金，账户快照失效
+    current_app.account_cache.invalidate()
+    return canceled
+
+
+@timed_api_call
+def submit_batch_limit_orders(
+    symbol: str,
+    side: str,  # "open_long", "open_short", "close_long", "close_short"
+    orders: List[Tuple[Decimal, Decimal]],
+) -> List[str]:
+    """
+    批量提交限价单（如分批挂单），按接口上限分批后并发提交
+    
+    杠杆不随批量下单设置，需要先调用 set_leverage。
+    
+    Args:
+        symbol: 合约交易对符号
+        side: 交易方向
+        orders: (价格, 数量) 列表
+    
+    Returns:
+        List[str]: 提交成功的订单ID
+    """
+    current_app = get_current_app()
+    client = current_app.bitget_client.async_client
+    logger = current_app.logger
+    
+    order_data = [
+        {
+            "side": side,
+            "orderType": "limit",
+            "price": _round_price(symbol, price),
+            "size": _round_quantity(symbol, quantity),
+            "timeInForceValue": "normal",
+            "clientOid": generate_client_oid(),
+        }
+        for price, quantity in orders
+    ]
+    if not order_data:
+        return []
+    
+    logger.info(f"📝 批量提交限价单 | {symbol} | 方向: {side} | {len(order_data)} 笔")
+    batches = _chunks(order_data, BATCH_ORDER_LIMIT)
+    results = run_coroutine(_gather_batches([client.batch_place_orders(symbol, batch) for batch in batches]))
+    
+    order_ids = []
+    for batch, result in zip(batches, results):
+        if isinstance(result, Exception):
+            client_oids = ", ".join(item["clientOid"] for item in batch)
+            logger.error(f"❌ 批量下单失败 | {symbol} | {len(batch)} 笔 | clientOid: {client_oids}: {result}")
+            continue
+        order_ids.extend(info.get("orderId") for info in result.get("orderInfo") or [])
+        for fail in result.get("failure") or []:
+            logger.warning(f"⚠️ 下单失败 | clientOid: {fail.get('clientOid')} | {symbol} | {fail.get('errorMsg')}")
+    
+    # 下单会占用保证金，账户快照失效
+    current_app.account_cache.invalidate()
+    logger.info(f"✅ 批量限价单已提交 | {symbol} | 成功 {len(order_ids)}/{len(order_data)} 笔")
+    return order_ids
+
+
 @timed_api_call
 def cancel_all_pending_orders_for_symbol(symbol: str):
     """
-    取消该标的的所有挂单
+    取消该标的的所有挂单（批量撤单）
     
     Args:
         symbol: 合约交易对符号
@@ -177,21 +480,19 @@ def cancel_all_pending_orders_for_symbol(symbol: str):
         logger.info(f"🔄 查询待取消订单 | {symbol}")
         orders = client.get_current_orders(symbol)
         
+        order_ids = []
         if isinstance(orders, list):
-            cancel_count = 0
             for order in orders:
                 order_id = order.get("orderId")
                 status = order.get("status", "")
                 
                 if status in [ORDER_STATUS_NEW, ORDER_STATUS_PENDING, ORDER_STATUS_PARTIAL_FILLED]:
                     logger.info(f"🔄 取消挂单 | 订单ID: {order_id} | {symbol} | 状态: {status}")
-                    client.cancel_order(symbol, order_id)
-                    cancel_count += 1
-            
-            if cancel_count > 0:
-                logger.info(f"✅ 已取消 {cancel_count} 个挂单 | {symbol}")
-            else:
-                logger.info(f"ℹ️ 无待取消订单 | {symbol}")
+                    order_ids.append(order_id)
+        
+        if order_ids:
+            canceled = batch_cancel_orders(symbol, order_ids)
+            logger.info(f"✅ 已取消 {len(canceled)}/{len(order_ids)} 个挂单 | {symbol}")
         else:
             logger.info(f"ℹ️ 无待取消订单 | {symbol}")
     except Exception as e:
@@ -214,15 +515,18 @@ def get_best_ask_price(symbol: str) -> Decimal:
     logger = current_app.logger
     
     try:
-        logger.debug(f"📊 查询卖一价 | {symbol}")
+        # 优先使用 websocket 维护的本地盘口，过期时回退 REST
+        bbo = current_app.market_data.get_bbo(symbol)
+        if bbo is not None:
+            logger.debug("📊 本地盘口卖一价: %s | %s", bbo[1], symbol)
+            return bbo[1]
+        
+        logger.debug("📊 查询卖一价 | %s", symbol)
         depth = client.get_depth(symbol, limit=1)  # 只需要第一档
         
-        asks = depth.get("asks", [])
-        if asks and len(asks) > 0:
-            ask_price = Decimal(str(asks[0][0]))  # [price, quantity]
-            logger.info(f"✅ 卖一价: {ask_price} | {symbol}")
-            return ask_price
-        raise ValueError("卖一价为空")
+        ask_price = _parse_best_price(depth, "asks")
+        logger.info(f"✅ 卖一价: {ask_price} | {symbol}")
+        return ask_price
     except Exception as e:
         logger.error(f"❌ 获取卖一价失败 {symbol}: {e}")
         raise
@@ -244,15 +548,18 @@ def get_best_bid_price(symbol: str) -> Decimal:
     logger = current_app.logger
     
     try:
-        logger.debug(f"📊 查询买一价 | {symbol}")
+        # 优先使用 websocket 维护的本地盘口，过期时回退 REST
+        bbo = current_app.market_data.get_bbo(symbol)
+        if bbo is not None:
+            logger.debug("📊 本地盘口买一价: %s | %s", bbo[0], symbol)
+            return bbo[0]
+        
+        logger.debug("📊 查询买一价 | %s", symbol)
         depth = client.get_depth(symbol, limit=1)  # 只需要第一档
         
-        bids = depth.get("bids", [])
-        if bids and len(bids) > 0:
-            bid_price = Decimal(str(bids[0][0]))  # [price, quantity]
-            logger.info(f"✅ 买一价: {bid_price} | {symbol}")
-            return bid_price
-        raise ValueError("买一价为空")
+        bid_price = _parse_best_price(depth, "bids")
+        logger.info(f"✅ 买一价: {bid_price} | {symbol}")
+        return bid_price
     except Exception as e:
         logger.error(f"❌ 获取买一价失败 {symbol}: {e}")
         raise
@@ -283,30 +590,41 @@ def submit_limit_order(
     client = current_app.bitget_client
     logger = current_app.logger
     
+    # clientOid 在提交前生成，网络异常重试时交易所按它去重
+    client_oid = generate_client_oid()
+    
     try:
         logger.info(
             f"📝 提交限价单 | {symbol} | 方向: {side} | 数量: {submitted_quantity} | "
-            f"价格: {submitted_price} | 杠杆: {leverage}x"
+            f"价格: {submitted_price} | 杠杆: {leverage}x | clientOid: {client_oid}"
         )
         
-        result = client.place_order(
-            symbol=symbol,
-            side=side,
-            order_type="limit",
-            size=str(int(submitted_quantity)),
-            price=str(submitted_price),
-            margin_mode=MARGIN_MODE_ISOLATED,
-            leverage=leverage,
-        )
+        with timed_stage(STAGE_PLACE_ORDER):
+            result = client.place_order(
+                symbol=symbol,
+                side=side,
+                order_type="limit",
+                size=str(_round_quantity(symbol, submitted_quantity)),
+                price=str(_round_price(symbol, submitted_price)),
+                margin_mode=MARGIN_MODE_ISOLATED,
+                leverage=leverage,
+                client_oid=client_oid,
+            )
         
         order_id = result.get("orderId", "")
+        ORDERS_SUBMITTED.labels("limit").inc()
+        current_app.signal_journal.record_order(EVENT_ORDER_SUBMITTED, symbol, order_id, client_oid=client_oid, side=side)
+        # 下单会占用保证金，账户快照失效
+        current_app.account_cache.invalidate()
         logger.info(
             f"✅ 订单已提交 | 订单ID: {order_id} | {symbol} | {side} | "
             f"数量: {submitted_quantity} @ {submitted_price}"
         )
         return order_id
     except Exception as e:
-        logger.error(f"❌ 下单失败 {symbol}: {e}")
+        if isinstance(e, BitgetAPIError):
+            ORDERS_REJECTED.labels(str(e.code)).inc()
+        logger.error(f"❌ 下单失败 {symbol} | clientOid: {client_oid}: {e}")
         raise
 
 
@@ -333,29 +651,40 @@ def submit_market_order(
     client = current_app.bitget_client
     logger = current_app.logger
     
+    # clientOid 在提交前生成，网络异常重试时交易所按它去重
+    client_oid = generate_client_oid()
+    
     try:
         logger.info(
             f"📝 提交市价单 | {symbol} | 方向: {side} | 数量: {submitted_quantity} | "
-            f"杠杆: {leverage}x"
+            f"杠杆: {leverage}x | clientOid: {client_oid}"
         )
         
-        result = client.place_order(
-            symbol=symbol,
-            side=side,
-            order_type="market",
-            size=str(int(submitted_quantity)),
-            margin_mode=MARGIN_MODE_ISOLATED,
-            leverage=leverage,
-        )
+        with timed_stage(STAGE_PLACE_ORDER):
+            result = client.place_order(
+                symbol=symbol,
+                side=side,
+                order_type="market",
+                size=str(_round_quantity(symbol, submitted_quantity)),
+                margin_mode=MARGIN_MODE_ISOLATED,
+                leverage=leverage,
+                client_oid=client_oid,
+            )
         
         order_id = result.get("orderId", "")
+        ORDERS_SUBMITTED.labels("market").inc()
+        current_app.signal_journal.record_order(EVENT_ORDER_SUBMITTED, symbol, order_id, client_oid=client_oid, side=side)
+        # 下单会占用保证金，账户快照失效
+        current_app.account_cache.invalidate()
         logger.info(
             f"✅ 市价单已提交 | 订单ID: {order_id} | {symbol} | {side} | "
             f"数量: {submitted_quantity}"
         )
         return order_id
     except Exception as e:
-        logger.error(f"❌ 下单失败 {symbol}: {e}")
+        if isinstance(e, BitgetAPIError):
+            ORDERS_REJECTED.labels(str(e.code)).inc()
+        logger.error(f"❌ 下单失败 {symbol} | clientOid: {client_oid}: {e}")
         raise
 
 
@@ -376,24 +705,26 @@ def check_order_status(order_id: str, symbol: str) -> str:
     
     try:
         detail = client.get_order_detail(symbol, order_id)
-        status = detail.get("status", "")
-        logger.debug(f"📊 订单状态查询 | 订单ID: {order_id} | 状态: {status}")
+        # v1 接口返回 state 字段，兼容 status
+        status = detail.get("status") or detail.get("state") or ""
+        logger.debug("📊 订单状态查询 | 订单ID: %s | 状态: %s", order_id, status)
         return status
     except Exception as e:
         logger.error(f"❌ 检查订单状态失败 {order_id}: {e}")
         raise
 
 
-def validate_order_price_or_qty(price: Decimal, quantity: Decimal):
+def validate_order_price_or_qty(price: Decimal, quantity: Decimal, min_size: Decimal = Decimal("1")):
     """
     验证订单价格或数量
     
     Args:
         price: 订单价格
         quantity: 订单数量
+        min_size: 合约最小下单数量，默认 1
     """
     # 检查最小下单数量
-    if quantity < 1:
+    if quantity <= 0 or quantity < min_size:
         raise ValueError(f"可卖数量不足 | 数量: {quantity}")
 
     # 检查最小开仓金额
@@ -406,7 +737,10 @@ def validate_order_price_or_qty(price: Decimal, quantity: Decimal):
 
 def wait_and_check_order(order_id: str, symbol: str) -> bool:
     """
-    等待并检查订单状态，如果未成交则撤单
+    等待订单成交，如果超时仍未完全成交则撤单
+    
+    订单状态由 OrderTracker 在事件循环中跟踪，全部成交或被撤销时立即返回，
+    最长等待 Config.ORDER_CHECK_INTERVAL 秒。
     
     Args:
         order_id: 订单ID
@@ -415,26 +749,57 @@ def wait_and_check_order(order_id: str, symbol: str) -> bool:
     Returns:
         bool: True 表示订单已全部成交，False 表示订单未完全成交或已取消
     """
-    logger = get_current_app().logger
-    client = get_current_app().bitget_client
+    # 等待期间的日志和 span（包括事件循环中的订单跟踪）关联到该订单
+    with order_scope(order_id), tracing.span("wait_and_check_order", attributes={"order.id": order_id, "symbol": symbol}):
+        return _wait_and_check_order(order_id, symbol)
+
+
+def _wait_and_check_order(order_id: str, symbol: str) -> bool:
+    current_app = get_current_app()
+    logger = current_app.logger
+    client = current_app.bitget_client
+
+    logger.info(f"⏳ 等待订单成交 | 订单ID: {order_id} | 最长等待时间: {Config.ORDER_CHECK_INTERVAL}秒")
+
+    # 首次成交耗时从下单返回、开始等待时算起
+    timing = current_timing.get()
+    started = time.perf_counter()
 
-    logger.info(f"⏳ 等待订单成交 | 订单ID: {order_id} | 等待时间: {Config.ORDER_CHECK_INTERVAL}秒")
-    time.sleep(Config.ORDER_CHECK_INTERVAL)
+    def on_fill():
+        if timing is not None:
+            timing.add_once(STAGE_FIRST_FILL, time.perf_counter() - started)
 
     try:
-        status = check_order_status(order_id, symbol)
+        # 同步等待：本线程阻塞到订单终态或超时，保证同一标的的后续信号在撤单/市价补单之后才执行
+        status = run_coroutine(
+            current_app.order_tracker.wait_for_final_status(symbol, order_id, Config.ORDER_CHECK_INTERVAL, on_fill)
+        )
+
+        # 成交或撤单都会改变可用保证金，账户快照失效
+        current_app.account_cache.invalidate()
+        journal = current_app.signal_journal
 
         # 如果订单已全部成交
         if status == ORDER_STATUS_FILLED:
             logger.info(f"✅ 订单已全部成交 | 订单ID: {order_id} | {symbol}")
+            journal.record_order(EVENT_ORDER_FINAL, symbol, order_id, status=status)
             return True
 
+        # 如果订单已被撤销（如在交易所手动撤单），无需再撤
+        elif status == ORDER_STATUS_CANCELED:
+            logger.info(f"ℹ️ 订单已被撤销 | 订单ID: {order_id} | {symbol}")
+            ORDERS_CANCELLED.labels("external").inc()
+            journal.record_order(EVENT_ORDER_FINAL, symbol, order_id, status=status)
+            return False
+
         # 如果订单部分成交
         elif status == ORDER_STATUS_PARTIAL_FILLED:
             logger.info(f"🟡 订单部分成交 | 订单ID: {order_id} | {symbol}")
             # 取消未成交部分
             client.cancel_order(symbol, order_id)
             logger.info(f"🔄 已取消未成交部分 | 订单ID: {order_id} | {symbol}")
+            ORDERS_CANCELLED.labels("partial").inc()
+            journal.record_order(EVENT_ORDER_FINAL, symbol, order_id, status=status, canceled=True)
             return False
 
         # 如果订单未成交
@@ -442,6 +807,8 @@ def wait_and_check_order(order_id: str, symbol: str) -> bool:
             # 取消订单
             client.cancel_order(symbol, order_id)
             logger.info(f"🔄 已取消未成交订单 | 订单ID: {order_id} | 状态: {status} | {symbol}")
+            ORDERS_CANCELLED.labels("timeout").inc()
+            journal.record_order(EVENT_ORDER_FINAL, symbol, order_id, status=status, canceled=True)
             return False
 
     except Exception as e:
@@ -465,21 +832,12 @@ def do_contract_long(
     logger = get_current_app().logger
     logger.info(f"🚀 开始做多（开多仓） | {symbol} | 杠杆: {leverage}x | 逐仓比例: {position_ratio*100}%")
 
-    # 使用 BBO 卖一价（对手价）
-    ask_price = get_best_ask_price(symbol)
+    # 并发获取深度、账户并设置杠杆，使用 BBO 卖一价（对手价）计算可开数量
+    ask_price, quantity = prepare_open_order(symbol, "long", leverage, position_ratio)
     logger.info(f"💰 使用 BBO 卖一价: {ask_price} | {symbol}")
-
-    # 通过 API 获取可开数量，并根据逐仓比例计算
-    quantity = estimate_max_purchase_quantity(symbol, leverage, position_ratio)
     
     # 验证订单
-    validate_order_price_or_qty(ask_price, quantity)
-
-    # 设置杠杆（如果需要）
-    try:
-        set_leverage(symbol, leverage)
-    except Exception as e:
-        logger.warning(f"⚠️ 设置杠杆失败，可能已设置: {e}")
+    validate_order_price_or_qty(ask_price, quantity, _min_size(symbol))
 
     # 提交订单（开多仓）
     order_id = submit_limit_order(symbol, "open_long", quantity, ask_price, leverage)
@@ -505,21 +863,12 @@ def do_contract_short(
     logger = get_current_app().logger
     logger.info(f"🚀 开始做空（开空仓） | {symbol} | 杠杆: {leverage}x | 逐仓比例: {position_ratio*100}%")
 
-    # 使用 BBO 买一价（对手价）
-    bid_price = get_best_bid_price(symbol)
+    # 并发获取深度、账户并设置杠杆，使用 BBO 买一价（对手价）计算可开数量
+    bid_price, quantity = prepare_open_order(symbol, "short", leverage, position_ratio)
     logger.info(f"💰 使用 BBO 买一价: {bid_price} | {symbol}")
-
-    # 通过 API 获取可开数量，并根据逐仓比例计算
-    quantity = estimate_max_purchase_quantity(symbol, leverage, position_ratio)
     
     # 验证订单
-    validate_order_price_or_qty(bid_price, quantity)
-
-    # 设置杠杆（如果需要）
-    try:
-        set_leverage(symbol, leverage)
-    except Exception as e:
-        logger.warning(f"⚠️ 设置杠杆失败，可能已设置: {e}")
+    validate_order_price_or_qty(bid_price, quantity, _min_size(symbol))
 
     # 提交订单（开空仓）
     order_id = submit_limit_order(symbol, "open_short", quantity, bid_price, leverage)
@@ -547,12 +896,14 @@ def do_contract_close(symbol: str, side: str, quantity: Decimal, leverage: str =
     if side.lower() == "long":
         close_side = "close_long"
         # 平多仓，使用 BBO 买一价（对手价）
-        target_price = get_best_bid_price(symbol)
+        with timed_stage(STAGE_PRICE):
+            target_price = get_best_bid_price(symbol)
         logger.info(f"💰 平多仓使用 BBO 买一价: {target_price} | {symbol}")
     elif side.lower() == "short":
         close_side = "close_short"
         # 平空仓，使用 BBO 卖一价（对手价）
-        target_price = get_best_ask_price(symbol)
+        with timed_stage(STAGE_PRICE):
+            target_price = get_best_ask_price(symbol)
         logger.info(f"💰 平空仓使用 BBO 卖一价: {target_price} | {symbol}")
     else:
         raise ValueError(f"无效的平仓方向: {side}")
@@ -565,6 +916,7 @@ def do_contract_close(symbol: str, side: str, quantity: Decimal, leverage: str =
     if not wait_and_check_order(order_id, symbol):
         # 如果限价单未成交，改用市价单
         logger.warning(f"⚠️ 限价单未完全成交，改用市价单平仓 | {symbol}")
+        ORDERS_MARKET_FALLBACK.inc()
         market_order_id = submit_market_order(symbol, close_side, quantity, leverage)
         logger.info(f"✅ 市价平仓单已提交 | 订单ID: {market_order_id} | {symbol}")
 
@@ -575,6 +927,7 @@ def handle_contract_signal(
     sentiment: str,
     leverage: str = "2",
     position_ratio: float = 0.1,
+    signal_id: Optional[str] = None,
 ):
     """
     主入口：处理合约信号
@@ -585,7 +938,43 @@ def handle_contract_signal(
         sentiment: 市场观点 "long", "short", "flat"
         leverage: 杠杆倍数，默认 2 倍
         position_ratio: 逐仓比例，默认 0.1 (10%)
+        signal_id: 信号日志中的信号ID，执行过程和订单状态变化记录到该信号下
+    """
+    current_app = get_current_app()
+    with current_app.signal_journal.signal_scope(signal_id, symbol):
+        _handle_contract_signal(symbol, action, sentiment, leverage, position_ratio)
+
+
+def resume_contract_signal(
+    symbol: str,
+    action: str,
+    sentiment: str,
+    leverage: str,
+    position_ratio: float,
+    signal_id: str,
+    order_ids: List[str],
+):
     """
+    重启后恢复中断的信号：继续跟踪已提交但没有最终状态的订单
+    
+    平仓信号在订单结束后重新执行一次平仓流程（按当前持仓，已平完时不再下单），
+    开仓信号只跟踪订单，不会重新开仓。
+    """
+    current_app = get_current_app()
+    with current_app.signal_journal.signal_scope(signal_id, symbol):
+        for order_id in order_ids:
+            wait_and_check_order(order_id, symbol)
+        if sentiment == "flat":
+            _handle_contract_signal(symbol, action, sentiment, leverage, position_ratio)
+
+
+def _handle_contract_signal(
+    symbol: str,
+    action: str,
+    sentiment: str,
+    leverage: str,
+    position_ratio: float,
+):
     logger = get_current_app().logger
     logger.info(
         f"📨 收到合约交易信号 | {symbol} | 动作: {action} | 观点: {sentiment} | "
@@ -603,8 +992,9 @@ def handle_contract_signal(
     elif sentiment == "flat":
         # 平仓
         logger.info(f"🔄 执行平仓操作 | {symbol}")
-        # 获取当前持仓
-        current_position = get_current_position_quantity(symbol)
+        # 获取当前持仓（平仓数量）
+        with timed_stage(STAGE_SIZING):
+            current_position = get_current_position_quantity(symbol)
         
         if current_position > 0:
             logger.info(f"📊 当前持仓: 多仓 {current_position} | {symbol}")
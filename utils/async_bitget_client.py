@@ -0,0 +1,601 @@
+import hmac
+import hashlib
+import base64
+import time
+import json
+import logging
+import random
+import uuid
+import asyncio
+import httpx
+from typing import Optional, Dict, Any, List, Tuple
+from config import Config
+from utils.rate_limiter import TokenBucket, PRIORITY_ORDER, PRIORITY_NORMAL, PRIORITY_LOW
+from utils import tracing
+from utils.metrics import (
+    BITGET_POOL_SIZE,
+    BITGET_RATE_LIMIT_WAIT_SECONDS,
+    BITGET_REQUEST_ERRORS,
+    BITGET_REQUEST_SECONDS,
+    BITGET_REQUESTS_IN_FLIGHT,
+)
+
+
+# 接口分组（按路径前缀匹配），每组独立限流：行情按 IP 限频，账户和交易按 UID 限频
+ENDPOINT_GROUPS = (
+    ("/api/mix/v1/market/", "market"),
+    ("/api/mix/v1/order/", "trade"),
+    ("/api/mix/v1/", "account"),
+)
+
+# 批量下单、批量撤单每次请求的最大订单数
+BATCH_ORDER_LIMIT = 50
+
+# 非 GET 但可以安全重试的接口（重复执行结果相同）；下单由 place_order 通过 clientOid 单独处理
+IDEMPOTENT_POST_ENDPOINTS = {
+    "/api/mix/v1/order/cancel-order",
+    "/api/mix/v1/order/cancel-batch-orders",
+    "/api/mix/v1/account/open-count",
+    "/api/mix/v1/account/setLeverage",
+}
+
+# 接口优先级，未列出的为 PRIORITY_NORMAL；令牌不足时下单、撤单优先于信息类查询
+ENDPOINT_PRIORITIES = {
+    "/api/mix/v1/order/placeOrder": PRIORITY_ORDER,
+    "/api/mix/v1/order/cancel-order": PRIORITY_ORDER,
+    "/api/mix/v1/order/batch-orders": PRIORITY_ORDER,
+    "/api/mix/v1/order/cancel-batch-orders": PRIORITY_ORDER,
+    "/api/mix/v1/order/current": PRIORITY_LOW,
+    "/api/mix/v1/position/allPosition-v2": PRIORITY_LOW,
+    "/api/mix/v1/market/contracts": PRIORITY_LOW,
+    "/api/mix/v1/market/candles": PRIORITY_LOW,
+}
+
+
+class BitgetAPIError(Exception):
+    """Bitget 返回的业务错误（code 不为 00000）"""
+    
+    def __init__(self, code: Optional[str], msg: str):
+        super().__init__(f"Bitget API 错误: {msg}")
+        self.code = code
+        self.msg = msg
+
+
+def is_retryable_error(e: Exception) -> bool:
+    """网络错误、超时、5xx 和 429 可以重试"""
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500 or e.response.status_code == 429
+    return isinstance(e, httpx.TransportError)
+
+
+def is_local_url(url: str) -> bool:
+    """地址是否指向本机（如模拟交易所）"""
+    return httpx.URL(url).host in ("127.0.0.1", "localhost", "::1")
+
+
+def generate_client_oid() -> str:
+    """生成客户端订单ID，用于幂等下单和结果未知时查询订单"""
+    return f"tb{uuid.uuid4().hex}"
+
+
+class AsyncBitgetClient:
+    """
+    Bitget API 异步客户端，处理签名和请求
+    
+    所有接口都是协程，需要在同一个事件循环中使用（见 utils.event_loop），
+    多个交易流程共享同一个连接池，无需为每个信号占用一个线程。
+    """
+    
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.api_key = Config.BITGET_API_KEY
+        self.secret_key = Config.BITGET_SECRET_KEY
+        self.passphrase = Config.BITGET_PASSPHRASE
+        self.base_url = Config.BITGET_BASE_URL
+        # 协程运行在事件循环线程中，没有 Flask 应用上下文，因此日志对象由外部传入
+        self.logger = logger or logging.getLogger(__name__)
+        
+        if not all([self.api_key, self.secret_key, self.passphrase]):
+            if not is_local_url(self.base_url):
+                raise ValueError("Bitget API 配置不完整，请设置 BITGET_API_KEY, BITGET_SECRET_KEY, BITGET_PASSPHRASE")
+            # 指向本机的模拟交易所（mock_exchange）不校验签名
+            self.api_key = self.api_key or "mock"
+            self.secret_key = self.secret_key or "mock"
+            self.passphrase = self.passphrase or "mock"
+        
+        # 复用同一个连接池（keep-alive），避免每次请求都重新进行 TCP + TLS 握手
+        self._session = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=Config.BITGET_HTTP2,
+            limits=httpx.Limits(
+                max_connections=Config.BITGET_POOL_SIZE,
+                max_keepalive_connections=Config.BITGET_POOL_KEEPALIVE,
+                keepalive_expiry=Config.BITGET_KEEPALIVE_EXPIRY,
+            ),
+            timeout=self._build_timeout(),
+        )
+        BITGET_POOL_SIZE.set(Config.BITGET_POOL_SIZE)
+        
+        # 客户端限流，速率 <= 0 表示该组不限流
+        self._rate_limiters = {
+            group: TokenBucket(rate)
+            for group, rate in (
+                ("market", Config.BITGET_RATE_LIMIT_MARKET),
+                ("account", Config.BITGET_RATE_LIMIT_ACCOUNT),
+                ("trade", Config.BITGET_RATE_LIMIT_TRADE),
+            )
+            if rate > 0
+        }
+    
+    @staticmethod
+    def _endpoint_group(endpoint: str) -> str:
+        """接口所属的限流分组"""
+        for prefix, group in ENDPOINT_GROUPS:
+            if endpoint.startswith(prefix):
+                return group
+        return "account"
+    
+    @staticmethod
+    def _build_timeout(timeout: Optional[Tuple[float, float]] = None) -> httpx.Timeout:
+        """构建超时配置，timeout 为 (连接超时, 读取超时)，默认取 Config"""
+        connect_timeout, read_timeout = timeout or (Config.BITGET_CONNECT_TIMEOUT, Config.BITGET_READ_TIMEOUT)
+        return httpx.Timeout(read_timeout, connect=connect_timeout)
+    
+    async def close(self):
+        """关闭连接池"""
+        await self._session.aclose()
+    
+    def _sign(self, timestamp: str, method: str, request_path: str, body: str = "") -> str:
+        """生成 HMAC SHA256 签名"""
+        message = timestamp + method + request_path + body
+        mac = hmac.new(
+            bytes(self.secret_key, encoding='utf8'),
+            bytes(message, encoding='utf8'),
+            digestmod=hashlib.sha256
+        )
+        return base64.b64encode(mac.digest()).decode()
+    
+    def _get_headers(self, method: str, request_path: str, body: str = "") -> Dict[str, str]:
+        """获取请求头"""
+        timestamp = str(int(time.time() * 1000))
+        sign = self._sign(timestamp, method, request_path, body)        
+        
+        return {
+            "ACCESS-KEY": self.api_key,
+            "ACCESS-SIGN": sign,
+            "ACCESS-TIMESTAMP": timestamp,
+            "ACCESS-PASSPHRASE": self.passphrase,
+            "Content-Type": "application/json",
+            "locale": "en-US"
+        }
+    
+    async def _backoff(self, attempt: int):
+        """带随机抖动的指数退避（full jitter）"""
+        delay = min(Config.BITGET_RETRY_MAX_DELAY, Config.BITGET_RETRY_BASE_DELAY * (2 ** attempt))
+        await asyncio.sleep(random.uniform(0, delay))
+    
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        timeout: Optional[Tuple[float, float]] = None,
+        priority: Optional[int] = None,
+        retries: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        发送请求，网络错误和 5xx 时按退避策略重试
+        
+        Args:
+            timeout: 本次请求的 (连接超时, 读取超时)，单位秒，不传则使用 Config 默认值
+            priority: 限流排队优先级，不传则按 ENDPOINT_PRIORITIES 取值
+            retries: 最大重试次数，不传时 GET 和幂等接口取 Config.BITGET_MAX_RETRIES，其余不重试
+        """
+        if method not in ["GET", "POST", "PUT", "DELETE"]:
+            raise ValueError(f"不支持的 HTTP 方法: {method}")
+        
+        if retries is None:
+            idempotent = method == "GET" or endpoint in IDEMPOTENT_POST_ENDPOINTS
+            retries = Config.BITGET_MAX_RETRIES if idempotent else 0
+        
+        attempt = 0
+        while True:
+            try:
+                return await self._send(method, endpoint, params, data, timeout, priority)
+            except httpx.HTTPError as e:
+                if attempt >= retries or not is_retryable_error(e):
+                    self.logger.error(f"Bitget API 请求失败: {e}")
+                    raise
+                self.logger.warning(f"⚠️ Bitget API 请求失败，准备重试 ({attempt + 1}/{retries}) | {endpoint} | {e}")
+                await self._backoff(attempt)
+                attempt += 1
+    
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        timeout: Optional[Tuple[float, float]] = None,
+        priority: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """发送一次请求（不重试）"""
+        request_path = endpoint
+        body = ""
+        
+        # 构建查询字符串
+        if method == "GET" and params:
+            query_string = "&".join([f"{k}={v}" for k, v in sorted(params.items())])
+            request_path = f"{endpoint}?{query_string}"
+        elif method in ["POST", "PUT"] and data:
+            body = json.dumps(data, separators=(',', ':'))
+        
+        # 每次请求（包括重试）一个子 span，挂在当前信号的链路下，限流排队也计入
+        with tracing.span(f"{method} {endpoint}", tracing.SPAN_KIND_CLIENT, {
+            "http.request.method": method,
+            "url.path": endpoint,
+            "server.address": self._session.base_url.host,
+        }) as span:
+            # 先排队获取令牌再签名，避免时间戳在排队期间过期
+            group = self._endpoint_group(endpoint)
+            rate_limiter = self._rate_limiters.get(group)
+            if rate_limiter is not None:
+                if priority is None:
+                    priority = ENDPOINT_PRIORITIES.get(endpoint, PRIORITY_NORMAL)
+                with BITGET_RATE_LIMIT_WAIT_SECONDS.labels(group).time() as timer:
+                    await rate_limiter.acquire(priority)
+                if span is not None:
+                    span.set_attribute("bitget.rate_limit_wait_ms", round(timer.duration * 1000, 3))
+            
+            # 签名时使用完整路径（包含查询参数）
+            url = f"{self.base_url}{request_path}"
+            headers = self._get_headers(method, request_path, body)
+            return await self._send_request(method, endpoint, url, headers, body, timeout, span)
+    
+    async def _send_request(
+        self,
+        method: str,
+        endpoint: str,
+        url: str,
+        headers: Dict[str, str],
+        body: str,
+        timeout: Optional[Tuple[float, float]],
+        span: Optional[tracing.Span],
+    ) -> Dict[str, Any]:
+        """发送已签名的请求并解析响应"""
+        # 发送与签名完全一致的请求体
+        try:
+            with BITGET_REQUESTS_IN_FLIGHT.track_inprogress(), BITGET_REQUEST_SECONDS.labels(endpoint).time():
+                response = await self._session.request(
+                    method,
+                    url,
+                    headers=headers,
+                    content=body or None,
+                    timeout=self._build_timeout(timeout) if timeout else httpx.USE_CLIENT_DEFAULT,
+                )
+        except httpx.HTTPError as e:
+            BITGET_REQUEST_ERRORS.labels(endpoint, type(e).__name__).inc()
+            raise
+        if span is not None:
+            span.set_attribute("http.response.status_code", response.status_code)
+        if response.status_code == 400:
+            # 业务错误（如余额不足、订单不存在）以 HTTP 400 返回，响应体带 Bitget 错误码
+            try:
+                error = response.json()
+            except ValueError:
+                error = None
+            if isinstance(error, dict) and error.get("code"):
+                BITGET_REQUEST_ERRORS.labels(endpoint, str(error.get("code"))).inc()
+                if span is not None:
+                    span.set_attribute("bitget.code", str(error.get("code")))
+                raise BitgetAPIError(error.get("code"), error.get("msg", "未知错误"))
+        if response.is_error:
+            BITGET_REQUEST_ERRORS.labels(endpoint, str(response.status_code)).inc()
+        response.raise_for_status()
+        result = response.json()
+        if isinstance(result, list):
+            # K线等部分行情接口直接返回数组，没有 code/data 包装
+            return result
+        
+        if result.get("code") != "00000":
+            BITGET_REQUEST_ERRORS.labels(endpoint, str(result.get("code"))).inc()
+            if span is not None:
+                span.set_attribute("bitget.code", str(result.get("code")))
+            raise BitgetAPIError(result.get("code"), result.get("msg", "未知错误"))
+        
+        return result.get("data", result)
+    
+    async def get_account_info(self, product_type: str = "umcbl") -> Dict[str, Any]:
+        """
+        获取账户信息
+        
+        Args:
+            product_type: 产品线类型，可选值：
+                - umcbl: USDT专业合约（默认）
+                - dmcbl: 混合合约
+                - cmcbl: USDC专业合约
+                - sumcbl: USDT专业合约模拟盘
+                - sdmcbl: 混合合约模拟盘
+                - scmcbl: USDC专业合约模拟盘
+        """
+        return await self._request("GET", "/api/mix/v1/account/accounts", params={
+            "productType": product_type
+        })
+    
+    async def get_single_account(self, symbol: str, margin_coin: str = "USDT") -> Dict[str, Any]:
+        """获取单个合约的账户信息（包含保证金模式和多空杠杆倍数）"""
+        return await self._request("GET", "/api/mix/v1/account/account", params={
+            "symbol": symbol,
+            "marginCoin": margin_coin
+        })
+    
+    async def get_position(self, symbol: str, margin_coin: str = "USDT") -> Dict[str, Any]:
+        """获取单个合约仓位信息"""
+        return await self._request("GET", f"/api/mix/v1/position/singlePosition-v2", params={
+            "symbol": symbol,
+            "marginCoin": margin_coin
+        })
+    
+    async def get_all_positions(self, product_type: str = "umcbl", margin_coin: str = "USDT") -> Dict[str, Any]:
+        """获取全部合约仓位信息"""
+        return await self._request("GET", f"/api/mix/v1/position/allPosition-v2", params={
+            "productType": product_type,
+            "marginCoin": margin_coin
+        })
+    
+    async def get_ticker(self, symbol: str) -> Dict[str, Any]:
+        """获取单个Ticker行情"""
+        return await self._request("GET", f"/api/mix/v1/market/ticker", params={
+            "symbol": symbol
+        })
+    
+    async def get_contracts(self, product_type: str = "umcbl") -> Dict[str, Any]:
+        """获取全部合约信息（价格精度、数量步长、最小下单数量、手续费率等）"""
+        return await self._request("GET", "/api/mix/v1/market/contracts", params={
+            "productType": product_type
+        })
+    
+    async def get_depth(self, symbol: str, limit: int = 5) -> Dict[str, Any]:
+        """获取深度行情"""
+        return await self._request("GET", f"/api/mix/v1/market/depth", params={
+            "symbol": symbol,
+            "limit": limit
+        })
+    
+    async def get_candles(
+        self,
+        symbol: str,
+        granularity: str,
+        start_time: int,
+        end_time: int,
+        limit: int = 1000,
+    ) -> List[List[str]]:
+        """
+        获取K线（按开盘时间升序）
+
+        Args:
+            granularity: K线周期，如 "1m", "5m", "1H"
+            start_time / end_time: 开盘时间范围（毫秒时间戳）
+
+        Returns:
+            List[List[str]]: [开盘时间, 开, 高, 低, 收, 成交量（币）, 成交额（USDT）]
+        """
+        return await self._request("GET", "/api/mix/v1/market/candles", params={
+            "symbol": symbol,
+            "granularity": granularity,
+            "startTime": start_time,
+            "endTime": end_time,
+            "limit": limit,
+        })
+    
+    async def place_order(
+        self,
+        symbol: str,
+        side: str,  # "open_long", "open_short", "close_long", "close_short"
+        order_type: str,  # "limit", "market"
+        size: str,
+        price: Optional[str] = None,
+        product_type: str = "umcbl",
+        margin_coin: str = "USDT",
+        margin_mode: str = "isolated",  # "isolated" or "crossed"
+        leverage: Optional[str] = None,
+        client_oid: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        下单（幂等）
+        
+        每笔订单带 clientOid（不传则自动生成）。网络错误或 5xx 导致结果未知时，
+        先按 clientOid 查询订单是否已经存在，存在则直接返回，不存在再带同一个 clientOid 重试，
+        不会重复下单。
+        
+        Returns:
+            Dict: 包含 orderId 和 clientOid
+        """
+        client_oid = client_oid or generate_client_oid()
+        data = {
+            "symbol": symbol,
+            "marginCoin": margin_coin,
+            "clientOid": client_oid,
+            "side": side,
+            "orderType": order_type,
+            "size": str(size),
+        }
+        
+        if order_type == "limit" and price:
+            data["price"] = str(price)
+        
+        # 如果指定了杠杆，添加到请求中
+        if leverage:
+            data["leverage"] = leverage
+        
+        attempt = 0
+        while True:
+            try:
+                return await self._request("POST", "/api/mix/v1/order/placeOrder", data=data, retries=0)
+            except (httpx.HTTPError, BitgetAPIError) as e:
+                # 首次提交的业务错误（如余额不足）是确定的拒单，直接抛出
+                if attempt == 0 and not (isinstance(e, httpx.HTTPError) and is_retryable_error(e)):
+                    raise
+                # 结果未知（或重试时被拒，如 clientOid 重复）：按 clientOid 确认订单是否已经存在
+                existing = await self.get_order_by_client_oid(symbol, client_oid)
+                if existing is not None:
+                    self.logger.info(f"✅ 按 clientOid 确认订单已存在 | {client_oid} | 订单ID: {existing.get('orderId')}")
+                    return {"orderId": existing.get("orderId"), "clientOid": client_oid}
+                if attempt >= Config.BITGET_MAX_RETRIES or not (isinstance(e, httpx.HTTPError) and is_retryable_error(e)):
+                    raise
+                self.logger.warning(f"⚠️ 下单结果未知且订单不存在，准备重试 ({attempt + 1}/{Config.BITGET_MAX_RETRIES}) | {client_oid} | {e}")
+                await self._backoff(attempt)
+                attempt += 1
+    
+    async def cancel_order(self, symbol: str, order_id: str, product_type: str = "USDT-FUTURES") -> Dict[str, Any]:
+        """撤单"""
+        return await self._request("POST", "/api/mix/v1/order/cancel-order", data={
+            "symbol": symbol,
+            "orderId": order_id,
+            "productType": product_type
+        })
+    
+    async def batch_place_orders(
+        self,
+        symbol: str,
+        orders: List[Dict[str, Any]],
+        margin_coin: str = "USDT",
+    ) -> Dict[str, Any]:
+        """
+        批量下单（同一标的，最多 BATCH_ORDER_LIMIT 笔）
+        
+        Args:
+            orders: 订单列表，每项包含 side、orderType、size，限价单带 price；
+                    未带 clientOid 的自动生成
+        
+        Returns:
+            Dict: orderInfo 为成功的订单（orderId、clientOid），failure 为失败的订单
+        """
+        if len(orders) > BATCH_ORDER_LIMIT:
+            raise ValueError(f"批量下单每次最多 {BATCH_ORDER_LIMIT} 笔，当前 {len(orders)} 笔")
+        
+        order_data_list = []
+        for order in orders:
+            item = {k: str(v) for k, v in order.items() if v is not None}
+            item.setdefault("clientOid", generate_client_oid())
+            order_data_list.append(item)
+        
+        # 部分订单可能已经成功，重试会重复下单，因此不自动重试
+        return await self._request("POST", "/api/mix/v1/order/batch-orders", data={
+            "symbol": symbol,
+            "marginCoin": margin_coin,
+            "orderDataList": order_data_list,
+        }, retries=0)
+    
+    async def batch_cancel_orders(
+        self,
+        symbol: str,
+        order_ids: List[str],
+        margin_coin: str = "USDT",
+    ) -> Dict[str, Any]:
+        """
+        批量撤单（同一标的，最多 BATCH_ORDER_LIMIT 笔）
+        
+        Returns:
+            Dict: order_ids 为撤单成功的订单ID，fail_infos 为失败的订单
+        """
+        if len(order_ids) > BATCH_ORDER_LIMIT:
+            raise ValueError(f"批量撤单每次最多 {BATCH_ORDER_LIMIT} 笔，当前 {len(order_ids)} 笔")
+        
+        return await self._request("POST", "/api/mix/v1/order/cancel-batch-orders", data={
+            "symbol": symbol,
+            "marginCoin": margin_coin,
+            "orderIds": list(order_ids),
+        })
+    
+    async def get_current_orders(self, symbol: str, product_type: str = "USDT-FUTURES") -> Dict[str, Any]:
+        """获取当前委托"""
+        return await self._request("GET", "/api/mix/v1/order/current", params={
+            "symbol": symbol,
+            "productType": product_type
+        })
+    
+    async def get_order_detail(
+        self,
+        symbol: str,
+        order_id: Optional[str] = None,
+        product_type: str = "USDT-FUTURES",
+        client_oid: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """获取订单详情，按 orderId 或 clientOid 查询"""
+        params = {
+            "symbol": symbol,
+            "productType": product_type
+        }
+        
+        if order_id:
+            params["orderId"] = order_id
+        if client_oid:
+            params["clientOid"] = client_oid
+        
+        return await self._request("GET", "/api/mix/v1/order/detail", params=params)
+    
+    async def get_order_by_client_oid(self, symbol: str, client_oid: str) -> Optional[Dict[str, Any]]:
+        """按 clientOid 查询订单，订单不存在时返回 None"""
+        try:
+            detail = await self.get_order_detail(symbol, client_oid=client_oid)
+        except BitgetAPIError:
+            return None
+        return detail if detail and detail.get("orderId") else None
+    
+    async def get_openable_size(
+        self, 
+        symbol: str,
+        margin_coin: str,
+        open_price: str,
+        open_amount: str,
+        leverage: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        获取可开数量
+        
+        Args:
+            symbol: 产品ID，必须大写，如 "SBTCSUSDT_SUMCBL"
+            margin_coin: 保证金币种，如 "SUSDT" 或 "USDT"
+            open_price: 开仓价格
+            open_amount: 开仓金额
+            leverage: 杠杆倍数（可选，默认20）
+        
+        Returns:
+            Dict: 包含 openCount 的响应数据
+        """
+        data = {
+            "symbol": symbol.upper(),  # 确保大写
+            "marginCoin": margin_coin,
+            "openPrice": open_price,
+            "openAmount": open_amount
+        }
+        
+        if leverage:
+            data["leverage"] = leverage
+        
+        return await self._request("POST", "/api/mix/v1/account/open-count", data=data)
+    
+    async def set_leverage(
+        self,
+        symbol: str,
+        leverage: str,
+        margin_coin: str = "USDT",
+        hold_side: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        设置杠杆倍数
+        
+        Args:
+            hold_side: 持仓方向 "long" 或 "short"，逐仓模式下分别设置，全仓模式不传
+        """
+        data = {
+            "symbol": symbol,
+            "marginCoin": margin_coin,
+            "leverage": leverage,
+        }
+        
+        if hold_side:
+            data["holdSide"] = hold_side
+        
+        return await self._request("POST", "/api/mix/v1/account/setLeverage", data=data)
\ No newline at end of file
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import threading
+from typing import Any, Coroutine, Optional
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    获取进程内共享的事件循环（在后台守护线程中运行）
+
+    gunicorn fork 出的子进程会重新创建自己的事件循环。
+    """
+    global _loop, _loop_thread, _loop_pid
+
+    with _lock:
+        if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="bitget-event-loop", daemon=True)
+            thread.start()
+            _loop, _loop_thread, _loop_pid = loop, thread, os.getpid()
+        return _loop
+
+
+def in_event_loop_thread() -> bool:
+    """当前线程是否为共享事件循环所在线程"""
+    return _loop_thread is not None and threading.current_thread() is _loop_thread
+
+
+def run_coroutine(coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+    """
+    在共享事件循环中执行协程，并阻塞当前线程等待结果（供同步代码调用）
+
+    Args:
+        coro: 要执行的协程
+        timeout: 最长等待时间（秒），不传则一直等待
+    """
+    loop = get_event_loop()
+    if in_event_loop_thread():
+        coro.close()
+        raise RuntimeError("不能在事件循环线程中同步等待协程，请直接 await")
+
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    return future.result(timeout)
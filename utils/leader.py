@@ -0,0 +1,104 @@
+"""
+进程间选主
+
+gunicorn 多个 worker 都会执行 create_app，服务端策略、背离扫描这类自己产生信号的后台任务只能有一份在运行，
+否则同一根K线的信号会被每个 worker 各提交一次（每个 worker 的去重记录互不相通）。
+拿到文件锁（fcntl.flock，非阻塞）的进程是主进程；进程退出（包括崩溃）时操作系统自动释放锁，
+其他进程在后台定期重试，拿到锁后接着运行这些任务。
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows 只能单进程运行，总是主进程
+    fcntl = None
+
+
+class LeaderLock:
+    """
+    文件锁选主：on_elected 注册的回调只在拿到锁的进程中执行一次
+
+    Args:
+        path: 锁文件路径（同一台机器上的进程共用）
+        retry_interval: 没拿到锁时重试的间隔（秒）
+    """
+
+    def __init__(
+        self,
+        path: str = Config.LEADER_LOCK_PATH,
+        logger: Optional[logging.Logger] = None,
+        retry_interval: float = 5.0,
+    ):
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self.retry_interval = retry_interval
+
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self._is_leader = False
+        self._thread: Optional[threading.Thread] = None
+        # 持有锁期间保持打开，进程退出时关闭即释放
+        self._fd: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def on_elected(self, callback: Callable[[], None]):
+        """注册成为主进程后执行的回调；已经是主进程时立即执行，第一次注册时开始选主"""
+        with self._lock:
+            if not self._is_leader:
+                self._callbacks.append(callback)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._elect, name="leader-lock", daemon=True)
+                    self._thread.start()
+                return
+        callback()
+
+    def _try_acquire(self) -> bool:
+        if fcntl is None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        # 写入 pid 方便排查是哪个进程在运行后台任务
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    def _elect(self):
+        waiting_logged = False
+        while True:
+            try:
+                acquired = self._try_acquire()
+            except OSError as e:
+                self.logger.error(f"❌ 获取主进程锁失败 | {self.path} | {e}")
+                acquired = False
+            if acquired:
+                break
+            if not waiting_logged:
+                self.logger.info(f"ℹ️ 后台任务由其他进程运行，本进程待命 | 锁文件: {self.path}")
+                waiting_logged = True
+            time.sleep(self.retry_interval)
+
+        with self._lock:
+            self._is_leader = True
+            callbacks, self._callbacks = self._callbacks, []
+        self.logger.info(f"👑 本进程成为主进程，运行后台任务 | pid: {os.getpid()}")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                self.logger.error(f"❌ 后台任务启动失败: {e}")
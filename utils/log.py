@@ -0,0 +1,92 @@
+"""
+非阻塞日志
+
+业务线程只把日志记录放入内存队列（QueueHandler），由后台线程（QueueListener）格式化并写入输出，
+写 stdout/stderr 变慢（管道堵塞、日志采集端背压）时不会阻塞下单流程；队列满时丢弃并计数。
+日志记录在调用线程附加当前信号ID、订单ID、链路追踪 ID（上下文变量），格式化推迟到后台线程，可以输出为每行一个 JSON。
+"""
+import json
+import logging
+import queue
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from services.signal_journal import current_order_id, current_signal_id
+from utils.metrics import LOG_RECORDS_DROPPED
+from utils.tracing import current_span
+
+
+LOG_FORMAT_JSON = "json"
+
+
+class CorrelationFilter(logging.Filter):
+    """在调用线程中附加信号ID、订单ID和链路追踪 ID（后台线程中已经拿不到上下文变量）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.signal_id = current_signal_id.get()
+        record.order_id = current_order_id.get()
+        span = current_span.get()
+        record.trace_id = span.trace_id if span is not None else None
+        record.span_id = span.span_id if span is not None else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志一行 JSON，没有关联的信号或订单时省略对应字段"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).astimezone().isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        signal_id = getattr(record, "signal_id", None)
+        if signal_id:
+            entry["signal_id"] = signal_id
+        order_id = getattr(record, "order_id", None)
+        if order_id:
+            entry["order_id"] = order_id
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+            entry["span_id"] = record.span_id
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    只入队不格式化的 QueueHandler
+
+    标准 QueueHandler 在调用线程中格式化消息（合并 % 参数、渲染异常堆栈），这里原样入队，
+    全部推迟到后台线程；队列满时丢弃，不阻塞调用方。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def create_queue_logging(handler: logging.Handler, max_size: int = 0):
+    """
+    创建入队用的 handler 和写出日志的后台线程（需要调用 listener.start()）
+
+    Args:
+        handler: 实际写出日志的 handler，在后台线程中调用
+        max_size: 队列最多缓存的日志条数，0 为不限制
+
+    Returns:
+        (QueueHandler, QueueListener)
+    """
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(max_size)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationFilter())
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    return queue_handler, listener
@@ -0,0 +1,58 @@
+"""
+Prometheus 指标
+
+设置了 PROMETHEUS_MULTIPROC_DIR 时（见 gunicorn.conf.py）使用多进程模式：每个 worker 把指标写入该目录下的 mmap 文件，
+/metrics 汇总所有 worker 的数据；没有设置时（python app.py 单进程运行）使用进程内的默认注册表。
+记录指标只更新内存中的数值（多进程模式下是 mmap 映射的内存），开销在微秒级，可以放在请求热路径上。
+"""
+import os
+from typing import Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+
+# 接口和阶段耗时的分桶（秒）：本机模拟交易所的毫秒级到订单等待的分钟级
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# ==================== Bitget 接口 ====================
+BITGET_REQUEST_SECONDS = Histogram(
+    "bitget_request_seconds", "Bitget 接口单次 HTTP 请求耗时（不含限流排队和重试退避）",
+    ["endpoint"], buckets=LATENCY_BUCKETS,
+)
+BITGET_RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "bitget_rate_limit_wait_seconds", "客户端限流排队耗时", ["group"], buckets=LATENCY_BUCKETS,
+)
+BITGET_REQUEST_ERRORS = Counter(
+    "bitget_request_errors_total", "Bitget 接口请求失败次数（每次尝试）", ["endpoint", "reason"],
+)
+BITGET_REQUESTS_IN_FLIGHT = Gauge(
+    "bitget_requests_in_flight", "正在进行的 HTTP 请求数（即占用的连接数，包括等待空闲连接的请求）",
+    multiprocess_mode="livesum",
+)
+BITGET_POOL_SIZE = Gauge("bitget_pool_size", "连接池最大连接数", multiprocess_mode="livesum")
+
+# ==================== 交易流程 ====================
+TRADE_CALL_SECONDS = Histogram(
+    "trade_call_seconds", "交易流程函数耗时（@timed_api_call）", ["function", "status"], buckets=LATENCY_BUCKETS,
+)
+SIGNAL_STAGE_SECONDS = Histogram(
+    "signal_stage_seconds", "信号处理各阶段耗时（见 services.signal_timing）", ["stage"], buckets=LATENCY_BUCKETS,
+)
+SIGNALS_TOTAL = Counter("signals_total", "信号执行引擎处理的信号数", ["result"])
+SIGNALS_IN_FLIGHT = Gauge("signals_in_flight", "排队中和执行中的信号数", multiprocess_mode="livesum")
+ORDERS_SUBMITTED = Counter("orders_submitted_total", "已提交的订单数", ["type"])
+ORDERS_REJECTED = Counter("orders_rejected_total", "交易所拒绝的下单（业务错误码）", ["code"])
+ORDERS_CANCELLED = Counter("orders_cancelled_total", "已撤销的订单：等待超时由我们撤单或在交易所被撤", ["reason"])
+ORDERS_MARKET_FALLBACK = Counter("orders_market_fallback_total", "限价平仓未完全成交后改用市价单的次数")
+
+# ==================== 日志 ====================
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "日志队列已满被丢弃的日志条数")
+
+
+def render() -> Tuple[bytes, str]:
+    """生成 /metrics 响应体和 Content-Type"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
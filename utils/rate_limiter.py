@@ -0,0 +1,78 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import List, Optional, Tuple
+
+
+# 优先级：数值越小越先获得令牌
+PRIORITY_ORDER = 0    # 下单、撤单
+PRIORITY_NORMAL = 1   # 交易流程中的查询（深度、账户、订单状态等）
+PRIORITY_LOW = 2      # 信息类查询（全部持仓、当前委托等）
+
+
+class TokenBucket:
+    """
+    异步令牌桶限流器（只能在同一个事件循环中使用）
+
+    令牌按 rate 每秒匀速补充，最多积累 capacity 个（默认 max(1, rate)，每次请求消耗 1 个，容量不能小于 1）；
+    令牌不足时调用方按 (优先级, 到达顺序) 排队，补充的令牌优先分配给高优先级请求。
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"令牌补充速率必须大于 0: {rate}")
+        if capacity is None:
+            capacity = max(1.0, rate)
+        elif capacity < 1:
+            raise ValueError(f"令牌桶容量不能小于 1: {capacity}")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def queued(self) -> int:
+        """排队等待令牌的请求数"""
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL):
+        """获取一个令牌，令牌不足时按优先级排队等待"""
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        self._schedule()
+        await future
+
+    def _schedule(self):
+        if self._timer is not None or not self._waiters:
+            return
+        delay = max(0.0, (1 - self._tokens) / self.rate)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self):
+        self._timer = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # 调用方已取消
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+        # 清理队首已取消的等待者
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        self._schedule()
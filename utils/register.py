@@ -1,10 +1,14 @@
+import atexit
 import logging
 from logging import Formatter
-from flask import jsonify, send_from_directory
+from flask import Response, jsonify, send_from_directory
 from flask_cors import CORS
+from config import Config
 from lib.MyFlask import MyFlask
 from routes.webhook import webhook_bp
 from routes.test_bitget_client import test_bitget_bp
+from utils import metrics
+from utils.log import LOG_FORMAT_JSON, JsonFormatter, create_queue_logging
 
 
 def setup_logging(app: MyFlask) -> None:
@@ -19,19 +23,28 @@ def setup_logging(app: MyFlask) -> None:
     # --- 清除默认的 handler（避免重复日志）---
     app.logger.handlers.clear()
 
-    # --- 创建一个控制台 handler ---
+    # --- 创建一个控制台 handler（在后台线程中写出）---
     handler = logging.StreamHandler()
     handler.setLevel(log_level)
 
-    # --- 定义格式：包含时间、日志级别、文件名/函数名、消息 ---
+    # --- 定义格式：文本包含时间、日志级别、消息；JSON 另外带线程、信号ID、订单ID ---
     # in %(module)s.%(funcName)s:%(lineno)d
-    formatter = Formatter(
-        "[%(asctime)s] %(levelname)s : %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+    if Config.LOG_FORMAT == LOG_FORMAT_JSON:
+        formatter = JsonFormatter()
+    else:
+        formatter = Formatter(
+            "[%(asctime)s] %(levelname)s : %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
     handler.setFormatter(formatter)
 
-    app.logger.addHandler(handler)
+    # --- 业务线程只入队，格式化和写出由后台线程完成 ---
+    queue_handler, listener = create_queue_logging(handler, Config.LOG_QUEUE_SIZE)
+    listener.start()
+    # 退出时写完队列中剩余的日志
+    atexit.register(listener.stop)
+
+    app.logger.addHandler(queue_handler)
     app.logger.setLevel(log_level)
 
 
@@ -45,6 +58,13 @@ def setup_home(app: MyFlask):
         return send_from_directory("static", "index.html")
 
 
+def setup_metrics(app: MyFlask):
+    @app.route("/metrics")
+    def serve_metrics():
+        body, content_type = metrics.render()
+        return Response(body, content_type=content_type)
+
+
 def setup_error_handlers(app: MyFlask):
     @app.errorhandler(404)
     def not_found(e):
@@ -0,0 +1,310 @@
+"""
+链路追踪：与 OpenTelemetry 兼容的 span（W3C trace ID / span ID），按 OTLP/JSON 格式导出
+
+- 每个 webhook 请求一个根 span，信号排队、执行、交易流程函数、每次 Bitget HTTP 请求都是它的子 span
+- 当前 span 保存在上下文变量中：信号执行引擎提交任务时复制上下文，run_coroutine 创建的协程任务也会复制调用方的上下文，
+  所以工作线程和事件循环中的 span 都能挂到同一条链路下
+- 结束的 span 放入内存队列，由后台线程批量导出：写入文件（每行一个 OTLP ExportTraceServiceRequest，
+  可以用 OpenTelemetry Collector 的 otlpjsonfile receiver 读取）或 POST 到 OTLP/HTTP 地址（如 http://127.0.0.1:4318/v1/traces）
+- 两者都没有配置时关闭，span() 直接返回 None，几乎没有开销
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+import httpx
+from config import Config
+
+
+# span 类型（OTLP SpanKind）
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# span 状态（OTLP StatusCode）
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+
+class Span:
+    """一个 span；只在创建它的上下文中修改，结束后交给导出线程"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "status", "message")
+
+    def __init__(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        trace_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        start_ns: Optional[int] = None,
+    ):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.status = STATUS_UNSET
+        self.message = ""
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, message: str):
+        self.status = STATUS_ERROR
+        self.message = message
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status, "message": self.message} if self.status else {},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Span]:
+    """
+    解析 W3C traceparent 请求头（00-<trace-id>-<parent-id>-<flags>），返回代表上游 span 的占位对象
+
+    格式不对时返回 None，当作新链路处理。
+    """
+    parts = (header or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    remote = Span("remote", trace_id=parts[1])
+    remote.span_id = parts[2]
+    return remote
+
+
+class SpanExporter:
+    """
+    后台线程批量导出结束的 span
+
+    Args:
+        path: 导出文件路径（追加写入，多个 gunicorn worker 可以写同一个文件）
+        url: OTLP/HTTP 地址
+        flush_interval: 攒批时间（秒）
+        max_queue: 队列最多缓存的 span 数，超过则丢弃
+    """
+
+    def __init__(
+        self,
+        path: str = "",
+        url: str = "",
+        service_name: str = "trading-bitget",
+        flush_interval: float = 1.0,
+        max_queue: int = 10000,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.path = path
+        self.url = url
+        self.service_name = service_name
+        self.flush_interval = flush_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue)
+        self._dropped = 0
+        self._thread = threading.Thread(target=self._writer, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self._dropped += 1
+
+    def close(self):
+        """导出队列中剩余的 span 后停止后台线程"""
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+    def _payload(self, spans: List[Span]) -> bytes:
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({
+                    "service.name": self.service_name,
+                    "process.pid": os.getpid(),
+                })},
+                "scopeSpans": [{
+                    "scope": {"name": "trading-bitget"},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }],
+        }
+        return json.dumps(request, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def _writer(self):
+        client = httpx.Client(timeout=5) if self.url else None
+        fd = None
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            batch: List[Span] = []
+            while item is not None:
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if item is None:
+                stopping = True
+            if not batch:
+                continue
+
+            payload = self._payload(batch)
+            if fd is not None:
+                try:
+                    # 一次 write 写入整行，多个进程追加同一个文件时不会交错
+                    os.write(fd, payload + b"\n")
+                except OSError as e:
+                    self.logger.error(f"❌ 链路追踪写入文件失败 | {len(batch)} 个 span: {e}")
+            if client is not None:
+                try:
+                    client.post(self.url, content=payload, headers={"Content-Type": "application/json"}).raise_for_status()
+                except httpx.HTTPError as e:
+                    self.logger.warning(f"⚠️ 链路追踪导出失败 | {len(batch)} 个 span: {e}")
+            if self._dropped:
+                self.logger.warning(f"⚠️ 链路追踪队列已满，丢弃 {self._dropped} 个 span")
+                self._dropped = 0
+
+        if fd is not None:
+            os.close(fd)
+        if client is not None:
+            client.close()
+
+
+# 当前 span，子 span 以它为父
+current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+_exporter: Optional[SpanExporter] = None
+
+
+def configure(logger: Optional[logging.Logger] = None) -> Optional[SpanExporter]:
+    """按 Config 启动导出线程，没有配置导出目标时保持关闭"""
+    global _exporter
+    if _exporter is None and (Config.TRACE_EXPORT_PATH or Config.TRACE_EXPORT_URL):
+        _exporter = SpanExporter(
+            path=Config.TRACE_EXPORT_PATH,
+            url=Config.TRACE_EXPORT_URL,
+            service_name=Config.TRACE_SERVICE_NAME,
+            flush_interval=Config.TRACE_FLUSH_MS / 1000,
+            logger=logger,
+        )
+        atexit.register(shutdown)
+    return _exporter
+
+
+def shutdown():
+    """导出剩余的 span 并关闭"""
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+        _exporter = None
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+@contextmanager
+def span(
+    name: str,
+    kind: int = SPAN_KIND_INTERNAL,
+    attributes: Optional[Dict[str, Any]] = None,
+    parent: Optional[Span] = None,
+) -> Iterator[Optional[Span]]:
+    """
+    在代码块期间创建子 span 并设为当前 span；代码块抛出异常时标记为错误
+
+    Args:
+        parent: 父 span，不传则取当前 span（上游通过 traceparent 传入时见 parse_traceparent）
+
+    Yields:
+        Span，追踪关闭时为 None
+    """
+    if _exporter is None:
+        yield None
+        return
+
+    parent = parent or current_span.get()
+    current = Span(name, kind, parent.trace_id if parent else None, parent.span_id if parent else None)
+    if attributes:
+        for key, value in attributes.items():
+            current.set_attribute(key, value)
+    token = current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.set_error(str(e) or type(e).__name__)
+        current.set_attribute("exception.type", type(e).__name__)
+        raise
+    finally:
+        current_span.reset(token)
+        current.end_ns = time.time_ns()
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(current)
+
+
+def record_span(name: str, start_ns: int, end_ns: int, attributes: Optional[Dict[str, Any]] = None):
+    """补记一段已经结束的子 span（如信号排队等待）"""
+    exporter = _exporter
+    if exporter is None:
+        return
+    parent = current_span.get()
+    done = Span(name, SPAN_KIND_INTERNAL, parent.trace_id if parent else None, parent.span_id if parent else None, start_ns)
+    done.end_ns = end_ns
+    for key, value in (attributes or {}).items():
+        done.set_attribute(key, value)
+    exporter.export(done)
+
+
+def set_attribute(key: str, value: Any):
+    """给当前 span 添加属性，没有当前 span 时为空操作"""
+    current = current_span.get()
+    if current is not None:
+        current.set_attribute(key, value)